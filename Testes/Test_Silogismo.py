@@ -2,36 +2,23 @@
 #pip install sympy
 #pip install --upgrade pip
 
-import sympy as sp
+import os
+import sys
 
-# Verifique a versão instalada
-print(sp.__version__)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sympy import symbols, Implies, And, Or, Not, simplify_logic
+from logica import entails
 
 def deduzir_silogismo(premissa1, premissa2, conclusao):
-    # Definindo os símbolos
-    # Extraindo os nomes das proposições
-    p1, p2 = symbols(premissa1), symbols(premissa2)
-    c = symbols(conclusao)
-
-    # Definindo as premissas
-    # A primeira premissa é uma implicação
-    premissa1_logica = Implies(p1, c)  # Se P1, então C
-    premissa2_logica = p2  # P2 é verdadeiro (ex: Socrates é Homem)
-
-    # Representando a dedução
-    conclusao_logica = simplify_logic(And(premissa1_logica, premissa2_logica))
-
-    # Verificando se a conclusão se segue das premissas
-    # Aqui, queremos verificar se a conclusão é verdadeira
-    return conclusao_logica
+    # A conclusão se segue se "premissas ∧ ¬conclusão" for insatisfatível
+    # (tabela-verdade em bitset para poucas variáveis, SAT do sympy acima disso)
+    return entails([premissa1, premissa2], conclusao)
 
 # Exemplo de uso
 if __name__ == "__main__":
     # Entradas do usuário
     premissa1 = input("Digite a primeira premissa (ex: 'Homem -> Mortal'): ")
-    premissa2 = input("Digite a segunda premissa (ex: 'Socrates'): ")
+    premissa2 = input("Digite a segunda premissa (ex: 'Homem'): ")
     conclusao = input("Digite a conclusão (ex: 'Mortal'): ")
 
     # Deduza o silogismo
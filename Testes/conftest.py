@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+from stubs import start_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def serve():
+    # Sobe um servidor local com o handler dado (ver stubs.py) e devolve a URL base; derruba
+    # tudo no fim do teste
+    servers = []
+
+    def start(handler, path='/'):
+        server, url = start_server(handler, path)
+        servers.append(server)
+        return url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,153 @@
+import gzip
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def start_server(handler, path='/'):
+    # Sobe um servidor local em segundo plano com o handler dado; devolve (servidor, URL base)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}{path}'
+
+
+def stub_feed(n_entries=100, words_per_summary=150):
+    words = random.Random(0)
+    entries = (b'<entry><title>Paper %d</title><summary>%s</summary></entry>'
+               % (i, b' '.join(b'w%d' % words.randrange(5000) for _ in range(words_per_summary)))
+               for i in range(n_entries))
+    return b'<feed xmlns="http://www.w3.org/2005/Atom">' + b''.join(entries) + b'</feed>'
+
+
+class StubFeedHandler(BaseHTTPRequestHandler):
+    # Servidor local que imita um feed Atom grande, com keep-alive e gzip; simula o
+    # custo de abrir conexão (handshakes TCP/TLS) e uma banda limitada
+    protocol_version = 'HTTP/1.1'
+    # Evita o atraso de Nagle + ACK atrasado entre cabeçalhos e corpo
+    disable_nagle_algorithm = True
+    payload = stub_feed()
+    compressed = gzip.compress(payload)
+    handshake_delay = 0.0
+    bandwidth = None  # bytes/s
+    connections = 0
+    bytes_sent = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+        time.sleep(self.handshake_delay)
+
+    def do_GET(self):
+        body = self.payload
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/atom+xml')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = self.compressed
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.bandwidth:
+            time.sleep(len(body) / self.bandwidth)
+        self.wfile.write(body)
+        type(self).bytes_sent += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubArxivHandler(BaseHTTPRequestHandler):
+    # API do arXiv simulada: 20 artigos por consulta, com ids derivados do termo buscado
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    delay = 0.0
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        time.sleep(self.delay)
+        params = parse_qs(urlparse(self.path).query)
+        term = params.get('search_query', ['all:'])[0].split(':', 1)[-1]
+        count = min(int(params.get('max_results', ['20'])[0]), 20)
+        base = sum(map(ord, term)) % 9000
+        entries = ''.join(
+            f'<entry><id>http://arxiv.org/abs/2401.{base + i:05d}v1</id>'
+            f'<published>2024-01-{i % 28 + 1:02d}T00:00:00Z</published>'
+            f'<title>Recent advances in {term} part {i}</title>'
+            f'<summary>We study {term} with new methods for {term} and related problems, item {i}.</summary>'
+            f'<author><name>Author {i}</name></author></entry>'
+            for i in range(count))
+        body = f'<feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/atom+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def stub_record(i, set_spec, datestamp):
+    return (f'<record><header><identifier>oai:arXiv.org:2401.{i:05d}</identifier>'
+            f'<datestamp>{datestamp}</datestamp><setSpec>{set_spec}</setSpec></header>'
+            f'<metadata><arXiv xmlns="http://arxiv.org/OAI/arXiv/"><id>2401.{i:05d}</id>'
+            f'<created>{datestamp}</created><authors><author><keyname>Author</keyname>'
+            f'<forenames>A{i % 97}</forenames></author></authors>'
+            f'<title>Synthetic paper {i}\n  on {set_spec}</title><categories>{set_spec}</categories>'
+            f'<abstract>We study problem {i % 1000} in {set_spec} with method {i % 37}.</abstract>'
+            f'</arXiv></metadata></record>')
+
+
+class StubOAIHandler(BaseHTTPRequestHandler):
+    # Repositório OAI-PMH simulado: `n_records` registros distribuídos entre três conjuntos
+    # e ao longo de 2024, páginas de `page_size` e tokens "conjunto|de|até|cursor|requisição"
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    n_records = 20000
+    page_size = 1000
+    sets = ('cs', 'math', 'physics')
+    expired_tokens = set()
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        params = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+        if 'resumptionToken' in params:
+            if params['resumptionToken'] in self.expired_tokens:
+                self._send('<error code="badResumptionToken">expired</error>')
+                return
+            set_spec, from_date, until_date, cursor, _ = params['resumptionToken'].split('|')
+            cursor = int(cursor)
+        else:
+            set_spec, from_date, until_date = params.get('set', ''), params.get('from', ''), params.get('until', '')
+            cursor = 0
+        start = date(2024, 1, 1)
+        matches = [(i, self.sets[i % len(self.sets)], (start + timedelta(days=i % 366)).isoformat())
+                   for i in range(self.n_records)]
+        matches = [(i, s, d) for i, s, d in matches
+                   if (not set_spec or s == set_spec) and (not from_date or d >= from_date)
+                   and (not until_date or d <= until_date)]
+        if not matches:
+            self._send('<error code="noRecordsMatch">no records</error>')
+            return
+        page = matches[cursor:cursor + self.page_size]
+        next_cursor = cursor + len(page)
+        token = f'{set_spec}|{from_date}|{until_date}|{next_cursor}|{self.requests}' if next_cursor < len(matches) else ''
+        self._send('<ListRecords>' + ''.join(stub_record(*match) for match in page) +
+                   f'<resumptionToken completeListSize="{len(matches)}" cursor="{cursor}">{token}'
+                   '</resumptionToken></ListRecords>')
+
+    def _send(self, body):
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                f'<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">{body}</OAI-PMH>').encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
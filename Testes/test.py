@@ -2,8 +2,11 @@ import nltk
 from nltk.corpus import stopwords
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-import requests
-from bs4 import BeautifulSoup
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from content_fetcher import ContentCache, PageFetcher
 
 # Baixando as stopwords apenas uma vez
 nltk.download('stopwords')
@@ -28,28 +31,28 @@ consulta = input("Digite sua consulta: ")
 # Definindo palavras-chave relevantes para filtragem de relevância
 palavras_chave = ["filosofia", "filósofo", "ética", "existencialismo", "aristóteles", "platonismo", "filosófico"]
 
-# Extraindo textos das páginas para análise de relevância
+# Extraindo textos das páginas para análise de relevância (busca concorrente com cache)
+fetcher = PageFetcher(cache=ContentCache())
+textos = fetcher.fetch_many([item["url"] for item in historico_navegacao])
+fetcher.cache.close()
+
 resultados_analise = []
 for item in historico_navegacao:
-    try:
-        response = requests.get(item["url"])
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            texto = soup.get_text(separator=" ", strip=True)
-            
-            # Filtra páginas com pouco conteúdo
-            if len(texto) < 200:
-                continue  # Ignora páginas com menos de 200 caracteres
-            
-            texto_limpo = limpa_texto(texto)
-            
-            # Filtra páginas que não contenham palavras-chave relevantes
-            if not any(palavra in texto_limpo for palavra in palavras_chave):
-                continue
-            
-            resultados_analise.append({"titulo": item["titulo"], "url": item["url"], "texto_limpo": texto_limpo})
-    except requests.exceptions.RequestException:
-        print(f"Erro ao acessar {item['url']}")
+    texto = textos.get(item["url"])
+    if texto is None:
+        continue
+
+    # Filtra páginas com pouco conteúdo
+    if len(texto) < 200:
+        continue  # Ignora páginas com menos de 200 caracteres
+
+    texto_limpo = limpa_texto(texto)
+
+    # Filtra páginas que não contenham palavras-chave relevantes
+    if not any(palavra in texto_limpo for palavra in palavras_chave):
+        continue
+
+    resultados_analise.append({"titulo": item["titulo"], "url": item["url"], "texto_limpo": texto_limpo})
 
 # Vetorizando e calculando similaridade
 documentos = [consulta] + [res["texto_limpo"] for res in resultados_analise]
@@ -0,0 +1,110 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+from content_fetcher import ContentCache, PageFetcher, fetch_history_pages, top_visited
+
+
+class _StubPageHandler(BaseHTTPRequestHandler):
+    # Páginas HTML com ETag; conta as conexões simultâneas e as respostas 304
+    protocol_version = 'HTTP/1.1'
+    delay = 0.05
+    active = peak = not_modified = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            time.sleep(self.delay)
+            if self.path == '/quebrada':
+                # Charset que o Python não conhece: a decodificação falha fora de requests
+                body = b'<html><body>???</body></html>'
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=nao-existe')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            etag = f'"{self.path}"'
+            if self.headers.get('If-None-Match') == etag:
+                cls.not_modified += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = (f'<html><head><script>var x;</script></head>'
+                    f'<body><p>conteudo da pagina {self.path.strip("/")}</p></body></html>').encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def _reset():
+    _StubPageHandler.active = _StubPageHandler.peak = _StubPageHandler.not_modified = 0
+
+
+def test_fetch_history_pages_top_n_and_per_host_limit(serve, tmp_path):
+    _reset()
+    base = serve(_StubPageHandler)
+    rows = [(f'{base}{i}', f'titulo {i}', i, 0) for i in range(20)] + [('chrome://settings', 'x', 999, 0)]
+    fetcher = PageFetcher(cache=ContentCache(str(tmp_path / 'pages.sqlite')), max_workers=8,
+                          connections_per_host=2)
+    try:
+        pages = fetch_history_pages(rows, top_n=5, fetcher=fetcher)
+    finally:
+        fetcher.close()
+        fetcher.cache.close()
+    assert [page['visit_count'] for page in pages] == [19, 18, 17, 16, 15]
+    assert pages[0]['text'] == 'conteudo da pagina 19'
+    assert 1 <= _StubPageHandler.peak <= 2
+
+
+def test_cached_pages_are_revalidated_with_etag(serve, tmp_path):
+    _reset()
+    url = serve(_StubPageHandler, '/artigo')
+    cache = ContentCache(str(tmp_path / 'pages.sqlite'))
+    try:
+        assert PageFetcher(cache=cache).fetch(url) == 'conteudo da pagina artigo'
+        # Sem revalidação, o cache responde sem rede
+        assert PageFetcher(cache=cache).fetch(url) == 'conteudo da pagina artigo'
+        assert _StubPageHandler.not_modified == 0
+        assert PageFetcher(cache=cache, revalidate=True).fetch(url) == 'conteudo da pagina artigo'
+        assert _StubPageHandler.not_modified == 1
+    finally:
+        cache.close()
+
+
+def test_bad_page_is_skipped_without_aborting_the_batch(serve, tmp_path):
+    _reset()
+    base = serve(_StubPageHandler)
+    urls = [f'{base}{i}' for i in range(4)] + [f'{base}quebrada']
+    fetcher = PageFetcher(cache=ContentCache(str(tmp_path / 'pages.sqlite')))
+    try:
+        texts = fetcher.fetch_many(urls)
+    finally:
+        fetcher.close()
+        fetcher.cache.close()
+    assert texts == {f'{base}{i}': f'conteudo da pagina {i}' for i in range(4)}
+
+
+def test_top_visited_by_chunks_matches_full_sort():
+    rows = [(f'https://site{i % 7}.org/{i}', '', (i * 37) % 101, 0) for i in range(500)]
+    rows += [('file:///tmp/x', '', 1000, 0)]
+    top = []
+    for start in range(0, len(rows), 64):
+        top = top_visited(rows[start:start + 64], 10, top)
+    expected = sorted((row for row in rows if row[0].startswith('https')), key=lambda row: row[2], reverse=True)
+    assert [row[2] for row in top] == [row[2] for row in expected[:10]]
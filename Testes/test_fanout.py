@@ -0,0 +1,81 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from sources import ArxivSource, fetch_all_papers, iter_source_results
+from stubs import StubArxivHandler
+from transport import HttpTransport
+
+
+class _SlowArxivHandler(StubArxivHandler):
+    delay = 1.5
+    requests = 0
+
+
+class _OverloadedHandler(BaseHTTPRequestHandler):
+    # Sempre 503 pedindo para voltar daqui a dois minutos
+    protocol_version = 'HTTP/1.1'
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        self.send_response(503)
+        self.send_header('Retry-After', '120')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _source(url, name, timeout):
+    source = ArxivSource(base_url=url, timeout=timeout, min_interval=0.0, transport=HttpTransport())
+    source.name = name
+    return source
+
+
+def test_slow_source_is_abandoned_after_its_timeout(serve):
+    fast = _source(serve(StubArxivHandler, '/api/query'), 'rapida', timeout=5.0)
+    slow = _source(serve(_SlowArxivHandler, '/api/query'), 'lenta', timeout=0.3)
+    start = time.monotonic()
+    results = list(iter_source_results('grafos', [fast, slow], max_results=20))
+    elapsed = time.monotonic() - start
+    assert [name for name, _ in results] == ['rapida']
+    assert len(results[0][1]) == 20
+    # Não espera a fonte lenta responder
+    assert elapsed < _SlowArxivHandler.delay
+
+
+def test_each_page_resets_the_deadline(serve):
+    source = _source(serve(StubArxivHandler, '/api/query'), 'paginada', timeout=2.0)
+    source.page_size = 5
+    pages = [page for _, page in iter_source_results('grafos', [source], max_results=15)]
+    assert [len(page) for page in pages] == [5, 5, 5]
+
+
+def test_overloaded_source_does_not_retry_past_its_deadline(serve):
+    _OverloadedHandler.requests = 0
+    source = _source(serve(_OverloadedHandler, '/api/query'), 'sobrecarregada', timeout=1.0)
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.HTTPError):
+        source.search('grafos', 10)
+    # Retry-After de 120 s passaria do prazo: devolve a resposta sem dormir
+    assert time.monotonic() - start < 1.0
+    assert _OverloadedHandler.requests == 1
+
+
+def test_abandoned_sources_do_not_hold_worker_threads(serve):
+    _OverloadedHandler.requests = 0
+    fast = _source(serve(StubArxivHandler, '/api/query'), 'rapida', timeout=5.0)
+    overloaded = _source(serve(_OverloadedHandler, '/api/query'), 'sobrecarregada', timeout=0.5)
+    before = set(threading.enumerate())
+    papers = fetch_all_papers('grafos', [fast, overloaded], max_results=20)
+    assert len(papers) == 20
+    deadline = time.monotonic() + 3.0
+    while time.monotonic() < deadline and set(threading.enumerate()) - before:
+        time.sleep(0.05)
+    # As threads das fontes terminam sozinhas; main() não fica preso esperando no fim
+    assert not {thread for thread in set(threading.enumerate()) - before if 'ThreadPoolExecutor' in thread.name}
@@ -0,0 +1,36 @@
+import pytest
+
+from corpus import CorpusStore
+from filters import PaperFilter
+from paper_batch import PaperBatch
+
+DATES = ['2024-01-15T10:00:00Z', '2024-02-29T23:59:59Z', '2024-03-01T00:00:00Z', '', '2023-12-31T12:00:00Z']
+CATEGORIES = [('cs.LG',), ('stat.ML', 'cs.LG'), ('math.CO',), (), ('cs.AI',)]
+AUTHORS = [['Geoffrey E. Hinton'], ['Yann LeCun', 'Ada Lovelace'], ['Lovelace, Ada'], [], ['Alan Turing']]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    store = CorpusStore(str(tmp_path / 'corpus.sqlite'))
+    batch = PaperBatch(store=store)
+    for i in range(40):
+        batch.append(f'graph paper {i}', f'resumo {i}', AUTHORS[i % 5], f'http://arxiv.org/abs/2401.{i:05d}v1',
+                     DATES[i % 5], 'arXiv', CATEGORIES[(i // 5) % 5])
+    batch.offload_abstracts()
+    return store, batch
+
+
+@pytest.mark.parametrize('filters', [
+    PaperFilter(date_from='2024-02-01'),
+    PaperFilter(date_to='2024-02-29'),
+    PaperFilter(date_from='2024-01-01', date_to='2024-02-29'),
+    PaperFilter(categories=['cs.LG', 'math.CO']),
+    PaperFilter(authors=['A. Lovelace']),
+    PaperFilter(date_from='2024-01-01', categories=['cs.LG'], authors=['Hinton', 'LeCun']),
+])
+def test_sql_and_mask_select_the_same_papers(corpus, filters):
+    store, batch = corpus
+    expected = {link for link, keep in zip(batch.links, filters.mask(batch)) if keep}
+    assert expected
+    assert {record[0] for record in store.search('graph', 1000, filters)} == expected
+    assert store.count_matches('graph', filters) == len(expected)
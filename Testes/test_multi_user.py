@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from main import BraveHistoryClassifier
+from multi_user import MultiUserScorer
+
+HISTORIES = {
+    'ana': [('https://quantum.org/a', 'quantum error correction codes', 12, 0),
+            ('https://quantum.org/b', 'quantum annealing hardware', 5, 0),
+            ('https://news.site.com/x', 'weekly science news', 2, 0)],
+    'bruno': [('https://proteins.net/1', 'protein folding with deep learning', 9, 0),
+              ('https://proteins.net/2', 'molecular dynamics of protein folding', 4, 0),
+              ('https://robots.io/r', 'robotics grasping benchmark', 3, 0)],
+}
+
+PAPERS = [
+    {'title': 'Quantum error correction at scale', 'abstract': 'Surface codes on quantum hardware.'},
+    {'title': 'Protein folding', 'abstract': 'Deep learning for protein structure, see proteins.net.'},
+    {'title': 'Robotics', 'abstract': 'A grasping benchmark hosted at robots.io.'},
+    {'title': 'Unrelated', 'abstract': 'Nothing in common with either history.'},
+]
+
+
+@pytest.fixture
+def classifiers():
+    instances = {}
+    for user_id, rows in HISTORIES.items():
+        instance = BraveHistoryClassifier()
+        instance.interest_weight, instance.domain_weight = 0.6, 0.4
+        instance.analyze_user_interests(rows)
+        instances[user_id] = instance
+    return instances
+
+
+def test_empty_batch_scores_to_an_empty_matrix(classifiers):
+    scorer = MultiUserScorer().fit(HISTORIES, classifiers)
+    scores = scorer.score([])
+    assert scores.shape == (0, len(HISTORIES))
+    assert scores.dtype == scorer.dtype
+    assert scorer.top_k([]) == {user_id: [] for user_id in HISTORIES}
+
+
+@pytest.mark.parametrize('user_id', list(HISTORIES))
+def test_single_user_matches_score_papers(classifiers, user_id):
+    # Com o TF-IDF ajustado só no histórico do usuário, o vocabulário é o mesmo do classificador dele
+    scorer = MultiUserScorer(dtype=np.float64).fit({user_id: HISTORIES[user_id]}, classifiers)
+    expected = classifiers[user_id].score_papers(PAPERS)
+    np.testing.assert_allclose(scorer.score(PAPERS)[:, 0], expected, atol=1e-12)
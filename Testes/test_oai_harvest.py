@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+
+import pytest
+
+from corpus import CorpusStore
+from oai_harvest import OAIError, OAIHarvester
+from stubs import StubOAIHandler
+from transport import HttpTransport
+
+N_RECORDS = 300
+PAGE_SIZE = 50
+N_PAGES = N_RECORDS // PAGE_SIZE
+
+
+@pytest.fixture
+def base_url(serve, monkeypatch):
+    monkeypatch.setattr(StubOAIHandler, 'n_records', N_RECORDS)
+    monkeypatch.setattr(StubOAIHandler, 'page_size', PAGE_SIZE)
+    monkeypatch.setattr(StubOAIHandler, 'expired_tokens', set())
+    monkeypatch.setattr(StubOAIHandler, 'requests', 0)
+    return serve(StubOAIHandler, '/oai')
+
+
+def _harvester(base_url, path, batch_size=PAGE_SIZE):
+    return OAIHarvester(CorpusStore(str(path)), base_url=base_url, batch_size=batch_size, min_interval=0.0,
+                        transport=HttpTransport())
+
+
+def test_full_harvest_is_recorded_as_complete(base_url, tmp_path):
+    harvester = _harvester(base_url, tmp_path / 'corpus.sqlite', batch_size=10000)
+    assert harvester.harvest() == N_RECORDS
+    assert len(harvester.store) == N_RECORDS
+    assert harvester.requests_made == N_PAGES
+    token, total, complete = harvester.store.get_harvest_progress(harvester.progress_key())
+    assert (token, total, complete) == (None, N_RECORDS, 1)
+    # Lista concluída: nada a buscar
+    assert harvester.harvest() == 0
+    assert harvester.requests_made == N_PAGES
+
+
+def test_interrupted_harvest_resumes_from_the_last_token(base_url, tmp_path):
+    path = tmp_path / 'corpus.sqlite'
+    assert _harvester(base_url, path).harvest(max_pages=2) == 2 * PAGE_SIZE
+    token, total, complete = CorpusStore(str(path)).get_harvest_progress(
+        _harvester(base_url, path).progress_key())
+    assert token is not None and total == 2 * PAGE_SIZE and not complete
+
+    # Outro processo continua da página seguinte, sem repetir as já gravadas
+    resumed = _harvester(base_url, path)
+    assert resumed.harvest() == N_RECORDS - 2 * PAGE_SIZE
+    assert resumed.requests_made == N_PAGES - 2
+    assert len(resumed.store) == N_RECORDS
+    assert StubOAIHandler.requests == N_PAGES
+
+
+def test_expired_token_restarts_the_list(base_url, tmp_path):
+    harvester = _harvester(base_url, tmp_path / 'corpus.sqlite')
+    harvester.harvest(max_pages=2)
+    token = harvester.store.get_harvest_progress(harvester.progress_key())[0]
+    StubOAIHandler.expired_tokens.add(token)
+
+    assert harvester.harvest() == N_RECORDS
+    # A recusa custa uma requisição; a lista é recomeçada inteira e o upsert evita duplicatas
+    assert harvester.requests_made == 2 + 1 + N_PAGES
+    assert len(harvester.store) == N_RECORDS
+    assert harvester.store.get_harvest_progress(harvester.progress_key())[2] == 1
+
+
+def test_bad_token_during_a_fresh_harvest_is_an_error(base_url, tmp_path):
+    # Token da primeira página ("conjunto|de|até|cursor|requisição"): recusado no meio da coleta
+    StubOAIHandler.expired_tokens.add(f'|||{PAGE_SIZE}|1')
+    harvester = _harvester(base_url, tmp_path / 'corpus.sqlite')
+    with pytest.raises(OAIError) as error:
+        harvester.harvest()
+    assert error.value.code == 'badResumptionToken'
+
+
+def test_set_and_dates_restrict_the_list(base_url, tmp_path):
+    harvester = _harvester(base_url, tmp_path / 'corpus.sqlite')
+    start = date(2024, 1, 1)
+    expected = sum(1 for i in range(N_RECORDS)
+                   if i % 3 == 0 and '2024-03-01' <= (start + timedelta(days=i % 366)).isoformat() <= '2024-03-31')
+    assert harvester.harvest('cs', '2024-03-01', '2024-03-31') == expected
+    assert harvester.requests_made == 1
+    # Outra restrição tem o próprio progresso
+    assert harvester.harvest('math', '2024-03-01', '2024-03-31') > 0
+
+
+def test_no_records_match_completes_the_list(base_url, tmp_path):
+    harvester = _harvester(base_url, tmp_path / 'corpus.sqlite')
+    assert harvester.harvest('cs', '2030-01-01') == 0
+    assert harvester.store.get_harvest_progress(harvester.progress_key('cs', '2030-01-01'))[2] == 1
+    assert harvester.harvest('cs', '2030-01-01') == 0
+    assert harvester.requests_made == 1
@@ -0,0 +1,104 @@
+import socket
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from corpus import CorpusStore
+from main import BraveHistoryClassifier
+from prefetch import FakeClock, PrefetchScheduler
+from sources import ArxivSource
+from stubs import StubArxivHandler
+from transport import HttpTransport
+
+# Tópicos do perfil, do mais forte para o mais fraco
+TOPICS = ['quantum', 'protein', 'robotics', 'topology', 'galaxies']
+INTERVAL = 3600.0
+
+
+@pytest.fixture
+def classifier():
+    # Perfil publicado direto, com pesos decrescentes para os tópicos
+    instance = BraveHistoryClassifier()
+    tfidf = instance.new_vectorizer().fit([' '.join(TOPICS)])
+    interests = np.zeros(len(tfidf.vocabulary_))
+    for rank, topic in enumerate(TOPICS):
+        interests[tfidf.vocabulary_[topic]] = len(TOPICS) - rank
+    instance.publish(tfidf, interests, Counter())
+    return instance
+
+
+@pytest.fixture
+def stub_source(serve):
+    StubArxivHandler.requests = 0
+    return ArxivSource(base_url=serve(StubArxivHandler, '/api/query'), min_interval=0.0,
+                       sort_by='submittedDate', transport=HttpTransport())
+
+
+def _scheduler(classifier, store, source, clock, budget=2):
+    return PrefetchScheduler(classifier, store, source, budget=budget, interval=INTERVAL,
+                             max_results=20, clock=clock)
+
+
+def test_budget_limits_requests_per_round(classifier, stub_source, tmp_path):
+    store = CorpusStore(str(tmp_path / 'corpus.sqlite'))
+    clock = FakeClock(1000.0)
+    scheduler = _scheduler(classifier, store, stub_source, clock)
+
+    assert scheduler.due_topics() == TOPICS[:2]
+    assert scheduler.run_once() == 40
+    assert StubArxivHandler.requests == 2
+    # Na mesma janela, só os que faltam, ainda dentro do orçamento
+    assert scheduler.due_topics() == TOPICS[2:4]
+    scheduler.run_once()
+    scheduler.run_once()
+    assert StubArxivHandler.requests == len(TOPICS)
+    assert scheduler.requests_made == len(TOPICS)
+    assert scheduler.due_topics() == []
+    assert scheduler.run_once() == 0
+    assert StubArxivHandler.requests == len(TOPICS)
+
+
+def test_topics_are_refetched_after_the_interval(classifier, stub_source, tmp_path):
+    store = CorpusStore(str(tmp_path / 'corpus.sqlite'))
+    clock = FakeClock(1000.0)
+    scheduler = _scheduler(classifier, store, stub_source, clock, budget=len(TOPICS))
+    scheduler.run_once()
+    clock.advance(60)
+    scheduler.last_fetched['galaxies'] = clock()
+
+    clock.advance(INTERVAL - 61)
+    assert scheduler.due_topics() == []
+    assert all(store.is_fresh(topic, clock()) for topic in TOPICS)
+    clock.advance(1)
+    # Vencidos, dos mais antigos para os mais novos; 'galaxies' ainda está no intervalo
+    assert scheduler.due_topics() == TOPICS[:4]
+    assert not store.is_fresh('quantum', clock())
+    scheduler.run_once()
+    assert store.is_fresh('quantum', clock())
+    assert StubArxivHandler.requests == 2 * len(TOPICS) - 1
+
+
+def test_fetch_times_survive_a_new_scheduler(classifier, stub_source, tmp_path):
+    path = str(tmp_path / 'corpus.sqlite')
+    clock = FakeClock(1000.0)
+    _scheduler(classifier, CorpusStore(path), stub_source, clock, budget=len(TOPICS)).run_once()
+    store = CorpusStore(path)
+    assert len(store) > 0
+    # Outro processo (outro agendador) não repete as buscas dentro do intervalo
+    assert _scheduler(classifier, store, stub_source, clock).due_topics() == []
+
+
+def test_failed_topics_are_not_marked_fresh(classifier, tmp_path):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    source = ArxivSource(base_url=f'http://127.0.0.1:{port}/', min_interval=0.0,
+                         transport=HttpTransport(max_retries=0))
+    store = CorpusStore(str(tmp_path / 'corpus.sqlite'))
+    clock = FakeClock(1000.0)
+    scheduler = _scheduler(classifier, store, source, clock)
+    assert scheduler.run_once() == 0
+    assert scheduler.requests_made == 2
+    assert not store.is_fresh('quantum', clock())
+    assert scheduler.due_topics() == TOPICS[:2]
@@ -0,0 +1,123 @@
+import socket
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from prefetch import FakeClock
+from stubs import StubFeedHandler
+from transport import HttpTransport, parse_retry_after
+
+
+class _FlakyHandler(StubFeedHandler):
+    # As primeiras `failures` requisições recebem `status` (com Retry-After, se dado); depois, o feed
+    failures = 0
+    status = 503
+    retry_after = None
+    requests = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests += 1
+        if cls.requests <= cls.failures:
+            self.send_response(cls.status)
+            if cls.retry_after is not None:
+                self.send_header('Retry-After', cls.retry_after)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+@pytest.fixture
+def flaky(serve):
+    def start(failures, status=503, retry_after=None):
+        _FlakyHandler.failures, _FlakyHandler.status, _FlakyHandler.retry_after = failures, status, retry_after
+        _FlakyHandler.requests = _FlakyHandler.connections = 0
+        return serve(_FlakyHandler, '/api/query')
+    return start
+
+
+def _transport(delays, **kwargs):
+    # Sem esperas de verdade; o jitter sempre no máximo, para que os atrasos sejam previsíveis
+    return HttpTransport(sleep=delays.append, rng=lambda: 1.0, **kwargs)
+
+
+def test_exponential_backoff_then_success(flaky):
+    url = flaky(3)
+    delays = []
+    response = _transport(delays, backoff_base=0.5).get(url)
+    assert response.status_code == 200
+    assert response.content == StubFeedHandler.payload
+    assert delays == [0.5, 1.0, 2.0]
+    assert _FlakyHandler.requests == 4
+    # Todas as tentativas na mesma conexão keep-alive
+    assert _FlakyHandler.connections == 1
+
+
+def test_backoff_is_capped(flaky):
+    url = flaky(4, status=502)
+    delays = []
+    _transport(delays, backoff_base=1.0, backoff_max=3.0).get(url)
+    assert delays == [1.0, 2.0, 3.0, 3.0]
+
+
+def test_retry_after_is_honoured_and_capped(flaky):
+    delays = []
+    transport = _transport(delays, retry_after_max=120.0)
+    assert transport.get(flaky(1, status=429, retry_after='7')).status_code == 200
+    assert transport.get(flaky(1, retry_after='600')).status_code == 200
+    assert delays == [7.0, 120.0]
+
+
+def test_retry_after_http_date():
+    assert parse_retry_after('30') == 30.0
+    assert 0 < parse_retry_after(formatdate(usegmt=True, timeval=time.time() + 60)) <= 60
+    assert parse_retry_after('amanhã') is None
+    assert parse_retry_after(None) is None
+
+
+def test_gives_up_after_max_retries(flaky):
+    url = flaky(10)
+    delays = []
+    response = _transport(delays, max_retries=2).get(url)
+    assert response.status_code == 503
+    assert len(delays) == 2
+    assert _FlakyHandler.requests == 3
+
+
+def test_client_errors_are_not_retried(flaky):
+    url = flaky(1, status=404)
+    delays = []
+    assert _transport(delays).get(url).status_code == 404
+    assert delays == []
+
+
+def test_connection_errors_are_retried_then_raised():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    delays = []
+    with pytest.raises(requests.exceptions.ConnectionError):
+        _transport(delays, max_retries=3).get(f'http://127.0.0.1:{port}/')
+    assert len(delays) == 3
+
+
+def test_retries_stop_at_the_deadline(flaky):
+    url = flaky(10, retry_after='4')
+    clock = FakeClock(100.0)
+    delays = []
+
+    def sleep(seconds):
+        delays.append(seconds)
+        clock.advance(seconds)
+
+    transport = HttpTransport(sleep=sleep, clock=clock, rng=lambda: 1.0)
+    response = transport.get(url, deadline=110.0)
+    # Esperas em 100 e 104; a de 108 passaria do prazo
+    assert response.status_code == 503
+    assert delays == [4.0, 4.0]
+    assert _FlakyHandler.requests == 3
+    with pytest.raises(requests.exceptions.Timeout):
+        transport.get(url, deadline=clock())
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from corpus import CorpusStore
+from paper_batch import PaperBatch, content_digest
+from vector_cache import VectorCache
+
+N_PAPERS = 200
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    words = np.array([f'termo{i}' for i in range(500)])
+    texts = [' '.join(words[rng.integers(0, len(words), 40)]) for _ in range(N_PAPERS)]
+    links = [f'http://arxiv.org/abs/2401.{i:05d}v1' for i in range(N_PAPERS)]
+    return links, texts
+
+
+def _batch(link, title, abstract, store):
+    batch = PaperBatch(store=store)
+    batch.append(title, abstract, ['Autor'], link, '2024-01-01T00:00:00Z', 'arXiv')
+    return batch
+
+
+def test_rows_match_transform_after_a_refit(corpus, tmp_path):
+    links, texts = corpus
+    cache = VectorCache(CorpusStore(str(tmp_path / 'corpus.sqlite')))
+    first = TfidfVectorizer().fit(texts[:N_PAPERS // 2])
+    assert abs(cache.rows(first, 'perfil 1', links, texts) - first.transform(texts)).max() < 1e-12
+    assert cache.misses == N_PAPERS
+
+    # Outro vocabulário e outro IDF: as mesmas contagens, sem tokenizar de novo
+    second = TfidfVectorizer(sublinear_tf=True, max_features=300).fit(texts[N_PAPERS // 3:])
+    rows = cache.rows(second, 'perfil 2', links[::-1], lambda missing: pytest.fail('não deveria tokenizar'),
+                      [content_digest(text) for text in texts[::-1]])
+    assert abs(rows - second.transform(texts[::-1])).max() < 1e-12
+    assert (cache.hits, cache.misses) == (N_PAPERS, N_PAPERS)
+
+
+def test_revised_abstract_is_counted_again(tmp_path):
+    store = CorpusStore(str(tmp_path / 'corpus.sqlite'))
+    cache = VectorCache(store)
+    vectorizer = TfidfVectorizer().fit(['grafos aleatórios', 'redes neurais profundas'])
+    link = 'http://arxiv.org/abs/2401.00001v1'
+
+    original = _batch(link, 'Título', 'grafos aleatórios', store)
+    cache.rows(vectorizer, 'perfil', original.links, original.texts, original.digests)
+    # Nova versão no arXiv: mesmo id normalizado, outro resumo
+    revised = _batch('http://arxiv.org/abs/2401.00001v2', 'Título', 'redes neurais profundas', store)
+    rows = cache.rows(vectorizer, 'perfil', revised.links, revised.texts, revised.digests)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert abs(rows - vectorizer.transform(revised.texts())).max() < 1e-12
+
+    # A contagem revista substituiu a antiga
+    cache.rows(vectorizer, 'perfil', revised.links, revised.texts, revised.digests)
+    assert cache.hits == 1
+    cache.rows(vectorizer, 'perfil', original.links, original.texts, original.digests)
+    assert cache.misses == 3
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import time
+from collections import Counter
+from types import MappingProxyType
+
+import numpy as np
+
+from dedup import normalize_arxiv_id
+from filters import author_surname
+from paper_batch import PaperBatch
+
+
+def visited_arxiv_id(url):
+    # Id normalizado de uma página abs/pdf do arXiv visitada; None para as demais URLs
+    if not url or 'arxiv.org/' not in url:
+        return None
+    return normalize_arxiv_id(url)
+
+
+def count_arxiv_visits(rows, visits=None):
+    # Visitas por artigo do arXiv em linhas (url, title, visit_count, last_visit_time) do
+    # histórico; abs e pdf do mesmo artigo somam no mesmo id. Acumula em `visits`, se dado
+    visits = Counter() if visits is None else visits
+    for url, _, visit_count, _ in rows:
+        key = visited_arxiv_id(url)
+        if key:
+            visits[key] += visit_count or 1
+    return visits
+
+
+def _top(counter, n):
+    # As n entradas mais fortes, com peso relativo à maior (0..1]
+    top = counter.most_common(n)
+    if not top:
+        return MappingProxyType({})
+    return MappingProxyType({key: weight / top[0][1] for key, weight in top})
+
+
+class AffinityIndex:
+    # Afinidades do usuário por categoria do arXiv e por autor (sobrenome), ponderadas pelas
+    # visitas às páginas abs/pdf dos artigos e resolvidas em lote no corpus local. As tabelas
+    # guardam só as entradas mais fortes, então o reforço de cada artigo é uma consulta O(1)
+    # por categoria e autor, sem comparar textos. Imutável, como o ProfileSnapshot que o leva
+    __slots__ = ('categories', 'authors', 'n_visited', 'n_resolved', 'version')
+
+    def __init__(self, categories=None, authors=None, n_visited=0, n_resolved=0):
+        categories = MappingProxyType(dict(categories or {}))
+        authors = MappingProxyType(dict(authors or {}))
+        digest = hashlib.sha256(json.dumps([sorted(categories.items()), sorted(authors.items())]).encode())
+        for name, value in (('categories', categories), ('authors', authors), ('n_visited', n_visited),
+                            ('n_resolved', n_resolved), ('version', digest.hexdigest())):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AffinityIndex é imutável; construa outro")
+
+    def __bool__(self):
+        return bool(self.categories or self.authors)
+
+    @classmethod
+    def build(cls, visits, store, max_categories=200, max_authors=2000):
+        # `visits`: {id do arXiv: visitas} (ver count_arxiv_visits); `store`: CorpusStore.
+        # Artigos visitados que não estão no corpus ficam de fora (ver n_resolved)
+        metadata = store.get_paper_metadata(list(visits))
+        categories, authors = Counter(), Counter()
+        for key, (paper_categories, surnames) in metadata.items():
+            for category in paper_categories:
+                categories[category] += visits[key]
+            for surname in surnames:
+                authors[surname] += visits[key]
+        return cls(_top(categories, max_categories), _top(authors, max_authors), len(visits), len(metadata))
+
+    def boost(self, categories, authors):
+        # Média da maior afinidade entre as categorias e da maior entre os autores (0..1)
+        category = max((self.categories.get(name, 0.0) for name in categories), default=0.0)
+        author = max((self.authors.get(author_surname(name), 0.0) for name in authors), default=0.0)
+        return 0.5 * (category + author)
+
+    def boosts(self, papers):
+        # Reforço de cada artigo de um lote (PaperBatch ou lista de dicionários)
+        if isinstance(papers, PaperBatch):
+            items = ((papers.categories[i], papers.authors(i)) for i in range(len(papers)))
+        else:
+            items = ((paper.get('categories', ()), paper.get('authors', [])) for paper in papers)
+        return np.fromiter((self.boost(categories, authors) for categories, authors in items),
+                           dtype=np.float64, count=len(papers))
+
+
+def benchmark(n_corpus=80000, n_visited=5000, n_papers=80000, path=':memory:', seed=0):
+    # Montagem das tabelas a partir de um histórico com páginas do arXiv e custo do reforço
+    # por artigo na pontuação
+    from corpus import CorpusStore
+
+    rng = np.random.default_rng(seed)
+    categories = [f'cs.{chr(65 + a)}{chr(65 + b)}' for a in range(10) for b in range(10)]
+    surnames = [f'author{i}' for i in range(20000)]
+
+    def record(i):
+        return (f'http://arxiv.org/abs/2301.{i:05d}v1', f'paper {i}', '',
+                [f'A. {surnames[j]}' for j in rng.integers(0, len(surnames), 4)], 0, 'sintetico',
+                [categories[j] for j in rng.integers(0, len(categories), 2)])
+
+    store = CorpusStore(path)
+    store.add_papers(record(i) for i in range(n_corpus))
+    # Histórico: visitas a abs/pdf de artigos do corpus e de fora dele, misturadas a outros sites
+    rows = [(f'https://arxiv.org/{"abs" if i % 2 else "pdf"}/2301.{j:05d}', '', int(rng.integers(1, 10)), 0)
+            for i, j in enumerate(rng.integers(0, int(n_corpus * 1.1), n_visited))]
+    rows += [(f'https://site{i}.org/page', 'outro site', 1, 0) for i in range(n_visited * 10)]
+
+    start = time.perf_counter()
+    visits = count_arxiv_visits(rows)
+    extract_time = time.perf_counter() - start
+    start = time.perf_counter()
+    index = AffinityIndex.build(visits, store)
+    build_time = time.perf_counter() - start
+    print(f"{len(rows)} linhas do histórico: {len(visits)} artigos do arXiv extraídos em "
+          f"{extract_time * 1000:.0f} ms; {index.n_resolved} resolvidos no corpus em {build_time * 1000:.0f} ms "
+          f"({len(index.categories)} categorias, {len(index.authors)} autores)")
+
+    papers = PaperBatch()
+    for i in range(n_papers):
+        link, title, abstract, authors, published, source, paper_categories = record(i)
+        papers.append(title, abstract, authors, link, published, source, paper_categories)
+    start = time.perf_counter()
+    boosts = index.boosts(papers)
+    boost_time = time.perf_counter() - start
+    print(f"Reforço de {n_papers} artigos: {boost_time * 1000:.0f} ms "
+          f"({boost_time / n_papers * 1e6:.2f} µs por artigo), média {boosts.mean():.3f}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,244 @@
+import argparse
+import importlib.util
+import os
+import time
+
+import numpy as np
+
+from corpus import CorpusStore
+from paper_batch import paper_digests, paper_links, paper_texts, take_papers
+from vector_cache import VectorCache
+
+CHROME_MODULE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'navegadores', 'chrome.py')
+
+
+def load_arxiv_classifier(path=None, n_jobs=None):
+    # ArxivClassifier de navegadores/chrome.py (o diretório não é um pacote); com `path`,
+    # carrega o modelo salvo por ArxivClassifier.save, senão devolve a classe
+    spec = importlib.util.spec_from_file_location('navegadores_chrome', CHROME_MODULE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if path is None:
+        return module.ArxivClassifier
+    return module.ArxivClassifier.load(path, n_jobs=n_jobs)
+
+
+class BM25Index:
+    # BM25 dos candidatos a partir das contagens de termos guardadas de cada um (VectorCache,
+    # tabela term_counts): artigos já vistos não são tokenizados de novo, e as mesmas contagens
+    # montam as linhas TF-IDF da etapa 2. `rows`: [(ids de termo, contagens)] por artigo
+    def __init__(self, rows, k1=1.2, b=0.75):
+        lengths = np.fromiter((len(terms) for terms, _ in rows), dtype=np.int64, count=len(rows))
+        terms = np.concatenate([terms for terms, _ in rows]) if rows else np.empty(0, dtype=np.int32)
+        tf = np.concatenate([counts for _, counts in rows]).astype(np.float64) if rows else np.empty(0)
+        self.n_docs = len(rows)
+        self.row_index = np.repeat(np.arange(len(rows)), lengths)
+        # Termos presentes nos candidatos; cada termo aparece uma vez por artigo
+        self.terms, self.columns = np.unique(terms, return_inverse=True)
+        df = np.bincount(self.columns, minlength=len(self.terms))
+        idf = np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+        doc_length = np.bincount(self.row_index, weights=tf, minlength=self.n_docs)
+        average = doc_length.mean() if self.n_docs and doc_length.mean() else 1.0
+        norm = k1 * (1 - b + b * doc_length[self.row_index] / average)
+        self.weights = idf[self.columns] * tf * (k1 + 1) / (tf + norm)
+
+    def __len__(self):
+        return self.n_docs
+
+    def score(self, term_weights):
+        # Score BM25 de todos os artigos para {id de termo: peso}; termos ausentes são ignorados
+        weights = np.zeros(len(self.terms))
+        ids = np.fromiter(term_weights, dtype=np.int64, count=len(term_weights))
+        positions = np.searchsorted(self.terms, ids)
+        valid = positions < len(self.terms)
+        valid[valid] = self.terms[positions[valid]] == ids[valid]
+        weights[positions[valid]] = np.fromiter(term_weights.values(), dtype=np.float64,
+                                                count=len(term_weights))[valid]
+        return np.bincount(self.row_index, weights=self.weights * weights[self.columns], minlength=self.n_docs)
+
+
+def profile_terms(snapshot, n_terms=50):
+    # Termos de maior peso no perfil de interesses, com peso relativo ao maior (0..1]
+    interests = np.asarray(snapshot.user_interests)
+    n_terms = min(n_terms, np.count_nonzero(interests))
+    if not n_terms:
+        return {}
+    top = np.argpartition(-interests, n_terms - 1)[:n_terms]
+    terms = snapshot.tfidf.get_feature_names_out()
+    return {terms[i]: interests[i] / interests[top].max() for i in top}
+
+
+def top_indices(scores, n):
+    # Posições dos n maiores scores, em ordem decrescente
+    if n >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    top = np.argpartition(-scores, n - 1)[:n]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def as_records(papers):
+    # Registros com título e resumo, como ArxivClassifier.predict espera
+    return [{'title': text, 'abstract': ''} for text in paper_texts(papers)]
+
+
+class CascadeRanker:
+    # Ranking em cascata: (1) BM25 de todos os candidatos contra a consulta e os termos mais
+    # fortes do perfil, sobre as contagens de termos guardadas no cache de vetores do
+    # classificador (ou, sem ele, em um cache em memória); (2) só os `rerank_size`
+    # melhores recebem o score completo (cosseno TF-IDF + domínios); (3) só os `model_size`
+    # melhores destes passam pelo ArxivClassifier opcional, somado com `model_weight`.
+    # Os demais ficam abaixo de todos os promovidos, na ordem da etapa anterior
+    def __init__(self, classifier, rerank_size=200, model_size=None, n_profile_terms=50,
+                 query_weight=1.0, profile_weight=1.0, model=None, model_weight=0.5):
+        self.classifier = classifier
+        self.rerank_size = rerank_size
+        self.model_size = model_size or rerank_size
+        self.n_profile_terms = n_profile_terms
+        self.query_weight = query_weight
+        self.profile_weight = profile_weight
+        self.model = model
+        self.model_weight = model_weight
+        # Latência (s) de cada etapa na última chamada a score
+        self.timings = {}
+        self._memory_cache = None
+
+    @property
+    def vector_cache(self):
+        # O do classificador, para que a etapa 2 reaproveite as contagens lidas na etapa 1
+        if self.classifier.vector_cache is not None:
+            return self.classifier.vector_cache
+        if self._memory_cache is None:
+            self._memory_cache = VectorCache(CorpusStore(':memory:'))
+        return self._memory_cache
+
+    def term_weights(self, query, snapshot):
+        # {termo: peso} da consulta e dos termos mais fortes do perfil
+        weights = {term: self.profile_weight * weight
+                   for term, weight in profile_terms(snapshot, self.n_profile_terms).items()}
+        for term in snapshot.tfidf.build_analyzer()(query or ''):
+            weights[term] = weights.get(term, 0.0) + self.query_weight
+        return weights
+
+    def score(self, query, papers):
+        # Scores de todos os candidatos, com a mesma ordem que o ranking exaustivo daria aos promovidos
+        timings = {}
+        snapshot = self.classifier.snapshot
+        cache = self.vector_cache
+        start = time.perf_counter()
+        # Contagens guardadas; só os artigos nunca vistos são tokenizados (e gravados)
+        rows = cache.counts(snapshot.tfidf, paper_links(papers),
+                            lambda missing: paper_texts(take_papers(papers, missing)), paper_digests(papers))
+        index = BM25Index(rows)
+        timings['etapa 1 (contagens)'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        weights = self.term_weights(query, snapshot)
+        term_ids = cache.store.get_term_ids(weights)
+        stage1 = index.score({term_ids[term]: weight for term, weight in weights.items() if term in term_ids})
+        promoted = top_indices(stage1, self.rerank_size)
+        timings['etapa 1 (BM25)'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stage2 = self.classifier.score_papers(take_papers(papers, promoted.tolist()))
+        timings['etapa 2 (perfil)'] = time.perf_counter() - start
+        ranked, final = promoted, stage2
+
+        if self.model is not None:
+            start = time.perf_counter()
+            order = top_indices(stage2, self.model_size)
+            selected = promoted[order]
+            proba = self.model.predict(as_records(take_papers(papers, selected.tolist())))
+            final = stage2[order] + self.model_weight * np.asarray(proba)
+            # Promovidos sem classificador ficam abaixo dos classificados
+            rest = np.setdiff1d(np.arange(len(promoted)), order, assume_unique=True)
+            if len(rest):
+                final = np.concatenate([final, _below(stage2[rest], final)])
+                selected = np.concatenate([selected, promoted[rest]])
+            ranked = selected
+            timings['etapa 3 (classificador)'] = time.perf_counter() - start
+
+        scores = _below(stage1, final) if len(ranked) < len(stage1) else np.zeros(len(stage1))
+        scores[ranked] = final
+        self.timings = timings
+        return scores
+
+    def score_exhaustive(self, papers):
+        # Referência: score completo (e classificador) em todos os candidatos
+        scores = self.classifier.score_papers(papers)
+        if self.model is not None:
+            scores = scores + self.model_weight * np.asarray(self.model.predict(as_records(papers)))
+        return scores
+
+    def compare(self, query, papers, k=10):
+        # Latência por etapa e recall@k da cascata em relação ao ranking exaustivo
+        start = time.perf_counter()
+        exhaustive = self.score_exhaustive(papers)
+        exhaustive_time = time.perf_counter() - start
+        start = time.perf_counter()
+        cascade = self.score(query, papers)
+        cascade_time = time.perf_counter() - start
+        expected = set(top_indices(exhaustive, k).tolist())
+        found = set(top_indices(cascade, k).tolist())
+        return {'exaustivo': exhaustive_time, 'cascata': cascade_time, **self.timings,
+                f'recall@{k}': len(expected & found) / len(expected) if expected else 1.0}
+
+
+def _below(values, reference):
+    # Reescala `values` para ficar abaixo do menor valor de `reference`, mantendo a ordem
+    floor = reference.min() if len(reference) else 0.0
+    span = values.max() - values.min() if len(values) else 0.0
+    scaled = (values - values.min()) / span if span else np.zeros(len(values))
+    return floor - 2.0 + scaled
+
+
+def benchmark(n_papers=20000, n_train=2000, rerank_sizes=(100, 500, 2000), k=10, seed=0, tmpdir=None):
+    # Cascata x ranking exaustivo com o ArxivClassifier (floresta de 100 árvores) em um corpus
+    # sintético rotulado pelos tópicos de interesse do usuário. A primeira rodada parte do
+    # cache de vetores vazio (todos os candidatos são tokenizados); as comparações o encontram cheio
+    import tempfile
+    from evaluation import make_corpus, make_user_history, make_vocabulary
+    from main import BraveHistoryClassifier
+
+    rng = np.random.default_rng(seed)
+    topic_words, shared = make_vocabulary()
+    papers, topics = make_corpus(rng, topic_words, shared, n_papers)
+    tmpdir = tmpdir or tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmpdir)  # a análise do histórico cria uma cópia temporária no diretório atual
+    try:
+        path = os.path.join(tmpdir, 'History')
+        if os.path.exists(path):
+            os.remove(path)
+        interests = make_user_history(rng, path, topic_words, shared)
+        classifier = BraveHistoryClassifier()
+        classifier.brave_history_path = path
+        classifier.analyze_history_streaming(days_back=1)
+    finally:
+        os.chdir(cwd)
+
+    model = load_arxiv_classifier()()
+    model.train(papers[:n_train], np.isin(topics[:n_train], interests).astype(int))
+    classifier.vector_cache = VectorCache(CorpusStore(':memory:'))
+    query = ' '.join(topic_words[interests[0]][:3])
+    print(f"{n_papers} candidatos, consulta '{query}'")
+    ranker = CascadeRanker(classifier, rerank_size=rerank_sizes[0], model=model)
+    start = time.perf_counter()
+    ranker.score(query, papers)
+    print(f"N={rerank_sizes[0]}, cache frio: cascata {(time.perf_counter() - start) * 1000:.0f} ms (" +
+          ', '.join(f"{name} {value * 1000:.0f} ms" for name, value in ranker.timings.items()) + ")")
+    for rerank_size in rerank_sizes:
+        ranker = CascadeRanker(classifier, rerank_size=rerank_size, model=model)
+        result = ranker.compare(query, papers, k)
+        timings = ', '.join(f"{name} {value * 1000:.0f} ms" for name, value in result.items()
+                            if name not in ('exaustivo', 'cascata') and not name.startswith('recall'))
+        print(f"N={rerank_size}, cache quente: exaustivo {result['exaustivo'] * 1000:.0f} ms, cascata "
+              f"{result['cascata'] * 1000:.0f} ms ({timings}), recall@{k} {result[f'recall@{k}']:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark do ranking em cascata")
+    parser.add_argument('--papers', type=int, default=20000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 2000], metavar='N')
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+    benchmark(args.papers, rerank_sizes=args.sizes, k=args.k)
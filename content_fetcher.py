@@ -0,0 +1,219 @@
+import heapq
+import itertools
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+import requests
+
+from transport import HttpTransport
+
+try:  # Extrator rápido baseado em Lexbor, se estiver instalado
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+IGNORED_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head'}
+
+
+class _TextExtractor(HTMLParser):
+    # Coleta apenas os nós de texto visíveis, sem montar a árvore do documento
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in IGNORED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in IGNORED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            data = data.strip()
+            if data:
+                self.parts.append(data)
+
+
+def extract_text(html):
+    # Extrai o texto visível de uma página HTML
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(html)
+        tree.strip_tags(list(IGNORED_TAGS))
+        root = tree.body or tree.root
+        return root.text(separator=' ', strip=True) if root is not None else ''
+
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return ' '.join(parser.parts)
+
+
+class ContentCache:
+    # Cache em disco (SQLite) do texto extraído, indexado por URL e validadores HTTP
+    def __init__(self, path='page_cache.sqlite'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                text TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, text FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'text': row[2]}
+
+    def put(self, url, text, etag=None, last_modified=None):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)',
+                (url, etag, last_modified, text, time.time())
+            )
+            self._conn.commit()
+
+    def touch(self, url):
+        with self._lock:
+            self._conn.execute('UPDATE pages SET fetched_at = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PageFetcher:
+    # Busca concorrente de páginas com paralelismo limitado. Sem `transport`, usa um próprio,
+    # separado do das fontes de artigos: um pool por host com no máximo `connections_per_host`
+    # conexões abertas (as demais threads esperam), para não sobrecarregar um mesmo site
+    def __init__(self, cache=None, max_workers=8, connections_per_host=2, timeout=(3.05, 10),
+                 max_bytes=2 * 1024 * 1024, revalidate=False, transport=None):
+        self.cache = cache
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.revalidate = revalidate
+        self._owns_transport = transport is None
+        self.transport = transport or HttpTransport(pool_connections=max_workers,
+                                                    pool_maxsize=connections_per_host, pool_block=True)
+
+    def _read_capped(self, response):
+        # Lê o corpo até `max_bytes`, descartando o restante
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                break
+        return b''.join(chunks)[:self.max_bytes]
+
+    def fetch(self, url):
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None and not self.revalidate:
+            return cached['text']
+
+        headers = {'Accept': 'text/html,application/xhtml+xml'}
+        if cached is not None:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        try:
+            with self.transport.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached is not None:
+                    self.cache.touch(url)
+                    return cached['text']
+                if response.status_code != 200:
+                    return None
+
+                content_type = response.headers.get('Content-Type', '')
+                if content_type and 'html' not in content_type:
+                    return None
+
+                body = self._read_capped(response)
+                encoding = response.encoding or 'utf-8'
+                text = extract_text(body.decode(encoding, errors='replace'))
+
+                if self.cache is not None:
+                    self.cache.put(url, text,
+                                   etag=response.headers.get('ETag'),
+                                   last_modified=response.headers.get('Last-Modified'))
+                return text
+        except requests.exceptions.RequestException as e:
+            print(f"Erro ao acessar {url}: {e}")
+            return cached['text'] if cached is not None else None
+
+    def fetch_many(self, urls):
+        # Retorna {url: texto} para as páginas obtidas com sucesso
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch, url): url for url in urls}
+            for future in as_completed(futures):
+                # Uma página com erro inesperado (ex.: charset desconhecido) não derruba as demais
+                try:
+                    text = future.result()
+                except Exception as e:
+                    print(f"Erro ao processar {futures[future]}: {e}")
+                    continue
+                if text:
+                    results[futures[future]] = text
+        return results
+
+    def close(self):
+        # Fecha o transporte próprio; o cache é de quem o passou
+        if self._owns_transport:
+            self.transport.close()
+
+
+def top_visited(rows, top_n, top=()):
+    # As `top_n` linhas http(s) mais visitadas entre `rows` e `top` (resultado anterior), para
+    # acompanhar o histórico bloco a bloco com memória O(top_n)
+    return heapq.nlargest(top_n, itertools.chain(
+        top, (row for row in rows if urlparse(row[0]).scheme in ('http', 'https'))), key=lambda row: row[2] or 0)
+
+
+def fetch_history_pages(history_data, top_n=50, fetcher=None):
+    # Etapa da construção do perfil: texto das `top_n` URLs mais visitadas do histórico
+    best = {}
+    for url, title, visit_count, _ in history_data:
+        if urlparse(url).scheme not in ('http', 'https'):
+            continue
+        if url not in best or visit_count > best[url][1]:
+            best[url] = (title, visit_count)
+
+    top = sorted(best.items(), key=lambda item: item[1][1], reverse=True)[:top_n]
+
+    owns_fetcher = fetcher is None
+    if owns_fetcher:
+        fetcher = PageFetcher(cache=ContentCache())
+    try:
+        texts = fetcher.fetch_many([url for url, _ in top])
+    finally:
+        if owns_fetcher:
+            fetcher.close()
+            fetcher.cache.close()
+
+    return [
+        {'url': url, 'title': title, 'visit_count': visit_count, 'text': texts[url]}
+        for url, (title, visit_count) in top
+        if url in texts
+    ]
@@ -0,0 +1,327 @@
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+from dedup import normalize_arxiv_id
+from filters import author_surname
+
+# Limite seguro de parâmetros por consulta no SQLite
+MAX_SQL_PARAMS = 900
+TOKEN_RE = re.compile(r'\w+')
+
+
+def paper_id(link):
+    # Chave do corpus: id normalizado do arXiv ou, para outras fontes, o próprio link
+    return normalize_arxiv_id(link) or link
+
+
+class CorpusStore:
+    # Corpus local de artigos em SQLite; guarda os resumos fora da memória do processo
+    def __init__(self, path='corpus.sqlite'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(term_counts)')]
+        if columns and 'digest' not in columns:
+            # Contagens sem impressão digital do texto não podem ser conferidas: o cache recomeça
+            self._conn.execute('DROP TABLE term_counts')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                id TEXT PRIMARY KEY,
+                link TEXT NOT NULL,
+                title TEXT NOT NULL,
+                abstract TEXT NOT NULL,
+                authors TEXT NOT NULL,
+                published INTEGER NOT NULL,
+                source TEXT NOT NULL
+            );
+            -- Contagens de termos de cada artigo, independentes do vocabulário ajustado: ids de
+            -- cache_terms e contagens (int32), pela impressão digital do analisador e com a do
+            -- texto contado (content_digest), para que um título ou resumo revisto (ex.: v2)
+            -- não use as contagens antigas. A ordem do rowid é a de gravação, usada para
+            -- descartar as mais antigas
+            CREATE TABLE IF NOT EXISTS term_counts (
+                id TEXT PRIMARY KEY,
+                analyzer TEXT NOT NULL,
+                digest INTEGER NOT NULL,
+                terms BLOB NOT NULL,
+                counts BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_terms (
+                term_id INTEGER PRIMARY KEY,
+                term TEXT NOT NULL UNIQUE
+            );
+            -- Cache anterior, preso ao vocabulário de um perfil
+            DROP TABLE IF EXISTS vectors;
+            -- Categorias do arXiv de cada artigo, indexadas para os filtros
+            CREATE TABLE IF NOT EXISTS paper_categories (
+                category TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (category, id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS paper_categories_id ON paper_categories (id);
+            CREATE INDEX IF NOT EXISTS papers_published ON papers (published);
+            -- Última busca de cada tópico pela pré-busca (segundos desde a época) e intervalo
+            -- em que ela ainda vale; só tópicos frescos são servidos sem acessar a rede
+            CREATE TABLE IF NOT EXISTS prefetch_topics (
+                topic TEXT PRIMARY KEY,
+                fetched_at REAL NOT NULL,
+                interval REAL NOT NULL
+            );
+            -- Progresso das coletas OAI-PMH: último token de retomada confirmado
+            CREATE TABLE IF NOT EXISTS harvest_progress (
+                key TEXT PRIMARY KEY,
+                token TEXT,
+                records INTEGER NOT NULL,
+                complete INTEGER NOT NULL
+            );
+        """)
+        self._create_search_index()
+        self._create_author_index()
+        self._conn.commit()
+
+    def _create_search_index(self):
+        # Índice de texto completo (FTS5) sobre título e resumo, mantido por gatilhos
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'papers_fts'").fetchone()
+        if exists:
+            return
+        self._conn.executescript("""
+            CREATE VIRTUAL TABLE papers_fts USING fts5(title, abstract, content='papers');
+            CREATE TRIGGER papers_ai AFTER INSERT ON papers BEGIN
+                INSERT INTO papers_fts (rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+            END;
+            CREATE TRIGGER papers_ad AFTER DELETE ON papers BEGIN
+                INSERT INTO papers_fts (papers_fts, rowid, title, abstract)
+                VALUES ('delete', old.rowid, old.title, old.abstract);
+            END;
+            CREATE TRIGGER papers_au AFTER UPDATE ON papers BEGIN
+                INSERT INTO papers_fts (papers_fts, rowid, title, abstract)
+                VALUES ('delete', old.rowid, old.title, old.abstract);
+                INSERT INTO papers_fts (rowid, title, abstract) VALUES (new.rowid, new.title, new.abstract);
+            END;
+            INSERT INTO papers_fts (papers_fts) VALUES ('rebuild');
+        """)
+
+    def _create_author_index(self):
+        # Sobrenomes dos autores, indexados para os filtros; preenchida a partir da coluna
+        # `authors` quando a tabela é criada em um corpus existente
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'paper_authors'").fetchone()
+        if exists:
+            return
+        self._conn.executescript("""
+            CREATE TABLE paper_authors (
+                surname TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (surname, id)
+            ) WITHOUT ROWID;
+            CREATE INDEX paper_authors_id ON paper_authors (id);
+        """)
+        rows = self._conn.execute('SELECT id, authors FROM papers').fetchall()
+        self._conn.executemany('INSERT OR IGNORE INTO paper_authors VALUES (?, ?)', (
+            (author_surname(name), key) for key, authors in rows for name in authors.split('\x1f') if name.strip()))
+
+    def add_papers(self, records, progress=None):
+        # records: (link, title, abstract, authors, published, source[, categories]); uma única
+        # transação. Categorias só substituem as guardadas quando o registro traz alguma.
+        # progress: (key, token, records, complete) gravado na mesma transação,
+        # para que uma coleta interrompida retome exatamente do último lote confirmado
+        rows, surnames, categories = [], [], []
+        for record in records:
+            link, title, abstract, authors, published, source = record[:6]
+            key = paper_id(link)
+            rows.append((key, link, title, abstract or '', '\x1f'.join(authors), int(published), source))
+            surnames.extend((author_surname(name), key) for name in authors if name.strip())
+            if len(record) > 6 and record[6]:
+                categories.append((key, record[6]))
+        with self._lock, self._conn:
+            if progress is not None:
+                self._conn.execute('INSERT OR REPLACE INTO harvest_progress VALUES (?, ?, ?, ?)', progress)
+            # Upsert (e não REPLACE) para que os gatilhos do índice de texto vejam a atualização
+            self._conn.executemany("""
+                INSERT INTO papers VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET link = excluded.link, title = excluded.title,
+                    abstract = excluded.abstract, authors = excluded.authors,
+                    published = excluded.published, source = excluded.source
+            """, rows)
+            self._conn.executemany('DELETE FROM paper_authors WHERE id = ?', ((row[0],) for row in rows))
+            self._conn.executemany('INSERT OR IGNORE INTO paper_authors VALUES (?, ?)', surnames)
+            if categories:
+                self._conn.executemany('DELETE FROM paper_categories WHERE id = ?', ((key,) for key, _ in categories))
+                self._conn.executemany('INSERT OR IGNORE INTO paper_categories VALUES (?, ?)',
+                                       ((category, key) for key, names in categories for category in names))
+
+    def get_harvest_progress(self, key):
+        # (token, records, complete) ou None
+        with self._lock:
+            return self._conn.execute(
+                'SELECT token, records, complete FROM harvest_progress WHERE key = ?',
+                (key,)).fetchone()
+
+    def mark_prefetched(self, topic, fetched_at, interval):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO prefetch_topics VALUES (?, ?, ?)',
+                               (topic, fetched_at, interval))
+
+    def prefetch_times(self):
+        # {tópico: instante da última busca}
+        with self._lock:
+            return dict(self._conn.execute('SELECT topic, fetched_at FROM prefetch_topics'))
+
+    def is_fresh(self, topic, now):
+        # O tópico foi buscado pela pré-busca dentro do seu intervalo?
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM prefetch_topics WHERE topic = ? AND fetched_at + interval > ?',
+                (topic, now)).fetchone() is not None
+
+    def get_abstracts(self, links):
+        # {link: resumo} para os links presentes no corpus
+        ids = {paper_id(link): link for link in links}
+        keys = list(ids)
+        result = {}
+        with self._lock:
+            for start in range(0, len(keys), MAX_SQL_PARAMS):
+                chunk = keys[start:start + MAX_SQL_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                for key, abstract in self._conn.execute(
+                        f'SELECT id, abstract FROM papers WHERE id IN ({placeholders})', chunk):
+                    result[ids[key]] = abstract
+        return result
+
+    @staticmethod
+    def _match_expression(query):
+        # Todos os termos da consulta, cada um entre aspas (sem operadores do FTS5)
+        return ' '.join(f'"{term}"' for term in TOKEN_RE.findall(query.lower()))
+
+    @staticmethod
+    def _filter_sql(filters):
+        # Predicados extras do WHERE para um PaperFilter (datas, categorias, autores)
+        if not filters:
+            return '', []
+        clauses, params = filters.sql('p')
+        return ''.join(f' AND {clause}' for clause in clauses), params
+
+    def get_paper_metadata(self, ids):
+        # {id: (categorias, sobrenomes dos autores)} dos ids do arXiv presentes no corpus,
+        # em poucas consultas por bloco de ids
+        keys = list(dict.fromkeys(ids))
+        result = {}
+        with self._lock:
+            for start in range(0, len(keys), MAX_SQL_PARAMS):
+                chunk = keys[start:start + MAX_SQL_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                for (key,) in self._conn.execute(f'SELECT id FROM papers WHERE id IN ({placeholders})', chunk):
+                    result[key] = ([], [])
+                for category, key in self._conn.execute(
+                        f'SELECT category, id FROM paper_categories WHERE id IN ({placeholders})', chunk):
+                    result[key][0].append(category)
+                for surname, key in self._conn.execute(
+                        f'SELECT surname, id FROM paper_authors WHERE id IN ({placeholders})', chunk):
+                    result[key][1].append(surname)
+        return result
+
+    def search(self, query, limit=100, filters=None):
+        # Registros (link, title, abstract, authors, published, source, categories) por relevância
+        # BM25; com `filters` (PaperFilter), os excluídos ficam de fora já na consulta
+        expression = self._match_expression(query)
+        if not expression:
+            return []
+        where, params = self._filter_sql(filters)
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT p.link, p.title, p.abstract, p.authors, p.published, p.source,
+                    (SELECT group_concat(category, '\x1f') FROM paper_categories c WHERE c.id = p.id)
+                FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid
+                WHERE papers_fts MATCH ?{where} ORDER BY bm25(papers_fts) LIMIT ?
+            """, [expression, *params, limit]).fetchall()
+        return [(link, title, abstract, authors.split('\x1f') if authors else [], published, source,
+                 categories.split('\x1f') if categories else [])
+                for link, title, abstract, authors, published, source, categories in rows]
+
+    def count_matches(self, query, filters=None):
+        expression = self._match_expression(query)
+        if not expression:
+            return 0
+        where, params = self._filter_sql(filters)
+        with self._lock:
+            return self._conn.execute(f"""
+                SELECT COUNT(*) FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid
+                WHERE papers_fts MATCH ?{where}
+            """, [expression, *params]).fetchone()[0]
+
+    def _term_ids(self, terms):
+        result = {}
+        for start in range(0, len(terms), MAX_SQL_PARAMS):
+            chunk = terms[start:start + MAX_SQL_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            result.update(self._conn.execute(
+                f'SELECT term, term_id FROM cache_terms WHERE term IN ({placeholders})', chunk))
+        return result
+
+    def add_terms(self, terms):
+        # {termo: id} para `terms`, criando os ids que faltam
+        terms = list(terms)
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR IGNORE INTO cache_terms (term) VALUES (?)', ((term,) for term in terms))
+            return self._term_ids(terms)
+
+    def get_term_ids(self, terms):
+        # {termo: id} só dos termos já conhecidos
+        with self._lock:
+            return self._term_ids(list(terms))
+
+    def get_terms(self, after=0):
+        # [(id, termo)] com id > `after`, em ordem de id
+        with self._lock:
+            return self._conn.execute(
+                'SELECT term_id, term FROM cache_terms WHERE term_id > ? ORDER BY term_id', (after,)).fetchall()
+
+    def put_term_counts(self, analyzer, links, digests, rows, max_rows=None):
+        # Guarda as contagens (ids de termo, contagens) dos artigos de `links`, com a impressão
+        # digital do texto contado; com `max_rows`, descarta as gravadas há mais tempo quando a
+        # tabela passa desse tamanho
+        records = ((paper_id(link), analyzer, digest, np.asarray(terms, dtype=np.int32).tobytes(),
+                    np.asarray(counts, dtype=np.int32).tobytes())
+                   for link, digest, (terms, counts) in zip(links, digests, rows) if link)
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO term_counts VALUES (?, ?, ?, ?, ?)', records)
+            if max_rows is not None:
+                excess = self._conn.execute('SELECT COUNT(*) FROM term_counts').fetchone()[0] - max_rows
+                if excess > 0:
+                    self._conn.execute('DELETE FROM term_counts WHERE rowid IN '
+                                       '(SELECT rowid FROM term_counts ORDER BY rowid LIMIT ?)', (excess,))
+
+    def get_term_counts(self, analyzer, links, digests):
+        # (posições encontradas em `links`, [(ids de termo, contagens)] dessas posições); contagens
+        # de outro texto (impressão digital diferente da de `digests`) contam como ausentes
+        positions = {}
+        for i, link in enumerate(links):
+            if link:
+                positions.setdefault(paper_id(link), []).append(i)
+        keys = list(positions)
+        found, rows = [], []
+        with self._lock:
+            for start in range(0, len(keys), MAX_SQL_PARAMS):
+                chunk = keys[start:start + MAX_SQL_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                for key, digest, terms, counts in self._conn.execute(
+                        f'SELECT id, digest, terms, counts FROM term_counts '
+                        f'WHERE analyzer = ? AND id IN ({placeholders})', [analyzer] + chunk):
+                    row = (np.frombuffer(terms, dtype=np.int32), np.frombuffer(counts, dtype=np.int32))
+                    for position in positions[key]:
+                        if digests[position] == digest:
+                            found.append(position)
+                            rows.append(row)
+        return found, rows
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM papers').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
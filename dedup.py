@@ -0,0 +1,190 @@
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from paper_batch import paper_links, paper_texts, take_papers
+
+# Identificadores novos (2101.00001v2) e antigos (hep-th/9901001v1), em links ou puros
+ARXIV_ID_RE = re.compile(
+    r'(?:arxiv\.org/(?:abs|pdf)/|arxiv:|^)'
+    r'(\d{4}\.\d{4,5}|[a-z][a-z\-]*(?:\.[a-z]{2})?/\d{7})'
+    r'(?:v\d+)?',
+    re.IGNORECASE,
+)
+TOKEN_RE = re.compile(r'\w+')
+
+# Multiplicador usado para combinar os hashes das palavras de um shingle
+SHINGLE_MULTIPLIER = np.uint64(1000003)
+
+
+def normalize_arxiv_id(link):
+    # 'http://arxiv.org/abs/2101.00001v2' -> '2101.00001'; None se não for do arXiv
+    if not link:
+        return None
+    match = ARXIV_ID_RE.search(link.strip())
+    return match.group(1).lower() if match else None
+
+
+def _shingle_hashes(text, k=3):
+    # Hashes dos k-gramas de palavras, combinados a partir dos hashes de cada palavra
+    tokens = TOKEN_RE.findall(text.lower())
+    hashes = np.fromiter((zlib.crc32(token.encode()) for token in tokens), dtype=np.uint64, count=len(tokens))
+    if len(tokens) >= k:
+        combined = hashes[:len(tokens) - k + 1].copy()
+        for offset in range(1, k):
+            combined = combined * SHINGLE_MULTIPLIER + hashes[offset:len(tokens) - k + 1 + offset]
+        hashes = combined
+    return np.unique(hashes)
+
+
+class MinHasher:
+    # Assinaturas MinHash com `num_perm` funções de hash multiply-shift:
+    # ((a * x + b) mod 2**64) >> 32, com a ímpar; o overflow de uint64 faz o módulo
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def _permute(self, hashes):
+        return (self.a[:, None] * hashes[None, :] + self.b[:, None]) >> np.uint64(32)
+
+    def signature(self, hashes):
+        return self._permute(hashes).min(axis=1)
+
+    def signatures(self, hash_sets, chunk_size=65536):
+        # Assinaturas de vários documentos de uma vez: concatena os shingles e reduz
+        # cada segmento com np.minimum.reduceat, em blocos de ~`chunk_size` shingles
+        result = np.empty((len(hash_sets), self.num_perm), dtype=np.uint64)
+        start = 0
+        while start < len(hash_sets):
+            end, total = start, 0
+            while end < len(hash_sets) and (total == 0 or total + hash_sets[end].size <= chunk_size):
+                total += hash_sets[end].size
+                end += 1
+            block = hash_sets[start:end]
+            offsets = np.cumsum([0] + [h.size for h in block[:-1]])
+            permuted = self._permute(np.concatenate(block))
+            result[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+            start = end
+        return result
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Mantém como representante o artigo que apareceu primeiro
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def find_duplicate_groups(papers, threshold=0.8, num_perm=128, bands=32):
+    # Agrupa artigos duplicados: mesmo id do arXiv (qualquer versão) ou título+resumo
+    # quase idênticos (Jaccard estimado >= threshold) encontrados por LSH
+    groups = _UnionFind(len(papers))
+
+    # 1. Normalização exata do identificador
+    first_by_id = {}
+    for i, link in enumerate(paper_links(papers)):
+        paper_id = normalize_arxiv_id(link)
+        if paper_id is None:
+            continue
+        if paper_id in first_by_id:
+            groups.union(first_by_id[paper_id], i)
+        else:
+            first_by_id[paper_id] = i
+
+    # 2. MinHash + bandas LSH; só pares que caem no mesmo balde são comparados
+    hasher = MinHasher(num_perm)
+    rows = num_perm // bands
+    hash_sets = [_shingle_hashes(text) for text in paper_texts(papers)]
+    with_text = [i for i, hashes in enumerate(hash_sets) if hashes.size]
+    signatures = dict(zip(with_text, hasher.signatures([hash_sets[i] for i in with_text])))
+
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, signature in signatures.items():
+            buckets[signature[band * rows:(band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            anchor = members[0]
+            for other in members[1:]:
+                if groups.find(anchor) == groups.find(other):
+                    continue
+                if np.mean(signatures[anchor] == signatures[other]) >= threshold:
+                    groups.union(anchor, other)
+
+    clusters = defaultdict(list)
+    for i in range(len(papers)):
+        clusters[groups.find(i)].append(i)
+    return list(clusters.values())
+
+
+class StreamingDeduplicator:
+    # Mesma deduplicação de find_duplicate_groups, mas página a página: os ids normalizados,
+    # as assinaturas e os baldes LSH das páginas anteriores são mantidos, então cada artigo
+    # é comparado com tudo o que já chegou e as duplicatas saem antes de ser pontuadas
+    def __init__(self, threshold=0.8, num_perm=128, bands=32):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ids = set()
+        self.signatures = []
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+
+    def _is_near_duplicate(self, signature):
+        compared = set()
+        for band, buckets in enumerate(self.buckets):
+            for j in buckets.get(signature[band * self.rows:(band + 1) * self.rows].tobytes(), ()):
+                if j in compared:
+                    continue
+                compared.add(j)
+                if np.mean(self.signatures[j] == signature) >= self.threshold:
+                    return True
+        return False
+
+    def _add_signature(self, signature):
+        j = len(self.signatures)
+        self.signatures.append(signature)
+        for band, buckets in enumerate(self.buckets):
+            buckets[signature[band * self.rows:(band + 1) * self.rows].tobytes()].append(j)
+
+    def filter(self, papers):
+        # Posições dos artigos de `papers` que não duplicam nenhum artigo já visto
+        # (nem um anterior da mesma página), na ordem original
+        hash_sets = [_shingle_hashes(text) for text in paper_texts(papers)]
+        with_text = [i for i, hashes in enumerate(hash_sets) if hashes.size]
+        signatures = dict(zip(with_text, self.hasher.signatures([hash_sets[i] for i in with_text])))
+        keep = []
+        for i, link in enumerate(paper_links(papers)):
+            paper_id = normalize_arxiv_id(link)
+            duplicate = paper_id is not None and paper_id in self.ids
+            if paper_id is not None:
+                self.ids.add(paper_id)
+            signature = signatures.get(i)
+            if signature is not None:
+                # Duplicatas também entram nos baldes: quase-duplicatas delas são agrupadas,
+                # como na união transitiva de find_duplicate_groups
+                duplicate = duplicate or self._is_near_duplicate(signature)
+                self._add_signature(signature)
+            if not duplicate:
+                keep.append(i)
+        return keep
+
+
+def deduplicate_papers(papers, threshold=0.8, num_perm=128, bands=32):
+    # Mantém um artigo por grupo de duplicatas, na ordem original
+    groups = find_duplicate_groups(papers, threshold, num_perm, bands)
+    keep = sorted(group[0] for group in groups)
+    return take_papers(papers, keep)
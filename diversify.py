@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+
+
+def mmr(relevance, vectors, k=10, lambda_=0.7):
+    # Maximal Marginal Relevance: escolhe, a cada passo, o candidato que maximiza
+    # lambda * relevância - (1 - lambda) * maior similaridade com os já escolhidos.
+    # vectors: (n, d) com linhas de norma unitária (ex.: TF-IDF); devolve os índices escolhidos
+    relevance = np.asarray(relevance, dtype=np.float64)
+    n = relevance.shape[0]
+    k = min(k, n)
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Bloco de similaridades candidato x candidato calculado de uma vez
+    similarity = vectors @ vectors.T
+    similarity = similarity.toarray() if hasattr(similarity, 'toarray') else np.asarray(similarity)
+
+    selected = np.empty(k, dtype=np.intp)
+    max_similarity = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    for step in range(k):
+        marginal = lambda_ * relevance - (1 - lambda_) * max_similarity
+        marginal[~available] = -np.inf
+        chosen = int(np.argmax(marginal))
+        selected[step] = chosen
+        available[chosen] = False
+        # Atualização incremental: só a linha do último escolhido entra no máximo
+        np.maximum(max_similarity, similarity[chosen], out=max_similarity)
+    return selected
+
+
+def diversify_order(order, scores, vectors, k=10, lambda_=0.7):
+    # Reordena o início de `order` (índices por score decrescente) com MMR.
+    # vectors: vetores dos candidatos da lista curta, na mesma ordem de order[:len(vectors)]
+    order = np.asarray(order)
+    shortlist = order[:vectors.shape[0]]
+    picked = shortlist[mmr(np.asarray(scores)[shortlist], vectors, k, lambda_)]
+    rest = order[~np.isin(order, picked)]
+    return np.concatenate([picked, rest])
+
+
+def _mmr_loop(relevance, vectors, k=10, lambda_=0.7):
+    # Versão direta, candidato a candidato, usada só para comparação
+    selected = []
+    candidates = list(range(len(relevance)))
+    while candidates and len(selected) < k:
+        best, best_score = None, -np.inf
+        for i in candidates:
+            redundancy = max((float(vectors[i].multiply(vectors[j]).sum()) for j in selected), default=0.0)
+            score = lambda_ * relevance[i] - (1 - lambda_) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+        candidates.remove(best)
+    return np.array(selected)
+
+
+def benchmark(n_candidates=1000, k=10, seed=0):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    rng = np.random.default_rng(seed)
+    words = np.array([f'term{i}' for i in range(5000)])
+    # Grupos de quase-duplicatas: vários artigos sobre o mesmo subtema
+    topics = [rng.choice(len(words), 60) for _ in range(n_candidates // 20)]
+    texts = [' '.join(words[np.concatenate([topics[i % len(topics)], rng.choice(len(words), 20)])])
+             for i in range(n_candidates)]
+    vectors = TfidfVectorizer().fit_transform(texts)
+    relevance = rng.random(n_candidates)
+
+    start = time.perf_counter()
+    fast = mmr(relevance, vectors, k)
+    vectorized = time.perf_counter() - start
+    start = time.perf_counter()
+    slow = _mmr_loop(relevance, vectors, k)
+    loop = time.perf_counter() - start
+    top = np.argsort(-relevance)[:k]
+    print(f"MMR em {n_candidates} candidatos (top-{k}): vetorizado {vectorized * 1000:.1f} ms, "
+          f"laço {loop * 1000:.0f} ms; mesma seleção: {np.array_equal(fast, slow)}")
+    print(f"Subtemas distintos no top-{k}: só score {len({i % len(topics) for i in top})}, "
+          f"MMR {len({i % len(topics) for i in fast})}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,158 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from main import BraveHistoryClassifier
+
+# Tópicos sintéticos: cada um tem vocabulário e domínio próprios
+N_TOPICS = 20
+WORDS_PER_TOPIC = 40
+SHARED_WORDS = 400
+
+
+def make_vocabulary():
+    topic_words = [[f't{t}w{i}' for i in range(WORDS_PER_TOPIC)] for t in range(N_TOPICS)]
+    shared = [f'common{i}' for i in range(SHARED_WORDS)]
+    return topic_words, shared
+
+
+def make_corpus(rng, topic_words, shared, n_papers=2000, noise=0.7, overlap=0.3, domain_mentions=0.2):
+    # Artigos rotulados com um tópico; `noise` é a fração de palavras genéricas no texto,
+    # `overlap` a fração das palavras do tópico que vêm do tópico vizinho e `domain_mentions`
+    # a fração de artigos que citam o domínio do próprio tópico
+    topics = rng.integers(0, N_TOPICS, n_papers)
+    papers = []
+    for i, topic in enumerate(topics):
+        words = []
+        for j in rng.integers(0, WORDS_PER_TOPIC, 120):
+            if rng.random() < noise:
+                words.append(shared[rng.integers(SHARED_WORDS)])
+            elif rng.random() < overlap:
+                words.append(topic_words[(topic + 1) % N_TOPICS][j])
+            else:
+                words.append(topic_words[topic][j])
+        if rng.random() < domain_mentions:
+            words.append(f'topic{topic}.example.org')
+        papers.append({'title': ' '.join(words[:10]), 'abstract': ' '.join(words[10:]),
+                       'link': f'http://arxiv.org/abs/2201.{i:05d}', 'authors': [], 'published': '',
+                       'source': 'sintetico'})
+    return papers, topics
+
+
+def make_user_history(rng, path, topic_words, shared, n_visits=3000, n_interests=2, noise_visits=0.3):
+    # Histórico do Brave (tabela urls) com tópicos plantados: o primeiro é o principal,
+    # os demais secundários; uma fração das visitas é ruído de tópicos aleatórios
+    interests = rng.choice(N_TOPICS, n_interests, replace=False)
+    weights = np.array([2.0] + [1.0] * (n_interests - 1))
+    weights /= weights.sum()
+    now = int(datetime.now().timestamp() * 1000000)
+    rows = []
+    for i in range(n_visits):
+        topic = rng.integers(N_TOPICS) if rng.random() < noise_visits else rng.choice(interests, p=weights)
+        title = ' '.join([topic_words[topic][j] for j in rng.integers(0, WORDS_PER_TOPIC, 5)] +
+                         [shared[j] for j in rng.integers(0, SHARED_WORDS, 3)])
+        rows.append((f'https://topic{topic}.example.org/{i}', title, int(rng.integers(1, 20)), now))
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE urls (url TEXT, title TEXT, visit_count INTEGER, last_visit_time INTEGER)')
+    conn.executemany('INSERT INTO urls VALUES (?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+    return interests
+
+
+def relevance_labels(user_interests, paper_topics):
+    # (usuários, artigos): 2 para o tópico principal, 1 para os secundários, 0 para o resto
+    labels = np.zeros((len(user_interests), len(paper_topics)))
+    for u, interests in enumerate(user_interests):
+        for rank, topic in enumerate(interests):
+            labels[u, paper_topics == topic] = 2 if rank == 0 else 1
+    return labels
+
+
+def ranking_metrics(scores, labels, k=10):
+    # NDCG@k, MAP e recall@k de todos os usuários de uma vez; scores e labels: (usuários, artigos).
+    # Com menos de k artigos, as métricas são calculadas sobre a lista inteira
+    name = k
+    k = min(k, labels.shape[1])
+    order = np.argsort(-scores, axis=1, kind='stable')
+    ranked = np.take_along_axis(labels, order, axis=1)
+    relevant = ranked > 0
+    n_relevant = relevant.sum(axis=1)
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = ((2 ** ranked[:, :k] - 1) * discounts).sum(axis=1)
+    ideal = -np.sort(-labels, axis=1)[:, :k]
+    idcg = ((2 ** ideal - 1) * discounts[:ideal.shape[1]]).sum(axis=1)
+    ndcg = np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0)
+
+    hits = np.cumsum(relevant, axis=1)
+    precision = hits / np.arange(1, labels.shape[1] + 1)
+    average_precision = np.divide((precision * relevant).sum(axis=1), n_relevant,
+                                  out=np.zeros(len(labels)), where=n_relevant > 0)
+    recall = np.divide(hits[:, k - 1], n_relevant, out=np.zeros(len(labels)), where=n_relevant > 0)
+    return {f'NDCG@{name}': ndcg.mean(), 'MAP': average_precision.mean(), f'recall@{name}': recall.mean()}
+
+
+def evaluate(n_users=50, n_papers=2000, n_visits=3000, k=10, lsa_components=None, weights=None,
+             seed=0, tmpdir=None):
+    rng = np.random.default_rng(seed)
+    topic_words, shared = make_vocabulary()
+    papers, paper_topics = make_corpus(rng, topic_words, shared, n_papers)
+    tmpdir = tmpdir or tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmpdir)  # a análise do histórico cria uma cópia temporária no diretório atual
+    try:
+        user_interests, scores, profile_times, score_times = [], [], [], []
+        for u in range(n_users):
+            path = os.path.join(tmpdir, f'History_{u}')
+            if os.path.exists(path):
+                os.remove(path)
+            user_interests.append(make_user_history(rng, path, topic_words, shared, n_visits))
+            classifier = BraveHistoryClassifier(lsa_components=lsa_components)
+            if weights is not None:
+                classifier.interest_weight, classifier.domain_weight = weights
+            classifier.brave_history_path = path
+
+            start = time.perf_counter()
+            classifier.analyze_history_streaming(days_back=1)
+            profile_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            scores.append(classifier.score_papers(papers))
+            score_times.append(time.perf_counter() - start)
+    finally:
+        os.chdir(cwd)
+
+    metrics = ranking_metrics(np.vstack(scores), relevance_labels(user_interests, paper_topics), k)
+    for name, times in (('perfil', profile_times), ('pontuação', score_times)):
+        p50, p95, p99 = np.percentile(np.array(times) * 1000, [50, 95, 99])
+        metrics[f'latência {name} p50/p95/p99 (ms)'] = f'{p50:.1f} / {p95:.1f} / {p99:.1f}'
+    return metrics
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Avaliação offline do ranking com usuários sintéticos")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--papers', type=int, default=2000)
+    parser.add_argument('--visits', type=int, default=3000, help="visitas por histórico sintético")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--lsa', type=int, default=None, metavar='DIM', help="avalia o perfil comprimido por LSA")
+    parser.add_argument('--weights', type=float, nargs=2, default=None, metavar=('INTERESSES', 'DOMINIO'),
+                        help="pesos do score (padrão: os de BraveHistoryClassifier, 0.7 e 0.3)")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics = evaluate(args.users, args.papers, args.visits, args.k, args.lsa, args.weights, args.seed)
+    for name, value in metrics.items():
+        print(f"{name:>40}: {value:.4f}" if isinstance(value, float) else f"{name:>40}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import numpy as np
+
+from paper_batch import PaperBatch, parse_timestamp
+
+# Limites usados pelo arXiv quando só um dos lados do intervalo de datas é dado
+ARXIV_MIN_DATE = '190001010000'
+ARXIV_MAX_DATE = '299912312359'
+
+
+def author_surname(name):
+    # Sobrenome normalizado, como no `au:` do arXiv: 'Geoffrey E. Hinton' -> 'hinton'
+    parts = (name or '').lower().replace(',', ' ').split()
+    return parts[-1] if parts else ''
+
+
+class PaperFilter:
+    # Filtros de data de publicação (AAAA-MM-DD, inclusivos), categorias do arXiv (exatas,
+    # ex.: cs.LG) e autores (por sobrenome). São traduzidos para a sintaxe de busca do arXiv
+    # e para predicados indexados do corpus local, para que os artigos excluídos não sejam
+    # baixados nem pontuados; `mask` cobre as fontes que não aceitam os filtros na consulta
+    def __init__(self, date_from=None, date_to=None, categories=(), authors=()):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.categories = sorted(set(categories or ()))
+        self.authors = sorted({author_surname(author) for author in authors or ()} - {''})
+
+    def __bool__(self):
+        return bool(self.date_from or self.date_to or self.categories or self.authors)
+
+    def __str__(self):
+        # Forma canônica, usada na chave do cache de resultados
+        return (f"from={self.date_from or ''};until={self.date_to or ''};"
+                f"cat={','.join(self.categories)};au={','.join(self.authors)}")
+
+    @property
+    def min_timestamp(self):
+        return parse_timestamp(self.date_from) if self.date_from else None
+
+    @property
+    def max_timestamp(self):
+        # Fim do dia de `date_to`
+        if not self.date_to:
+            return None
+        return parse_timestamp(self.date_to) + 86399
+
+    def arxiv_query(self, query):
+        # 'grafos' -> '(all:grafos) AND (cat:cs.LG OR cat:stat.ML) AND (submittedDate:[... TO ...])'
+        clauses = [f'all:{query}']
+        if self.categories:
+            clauses.append(' OR '.join(f'cat:{category}' for category in self.categories))
+        if self.date_from or self.date_to:
+            low = self.date_from.replace('-', '') + '0000' if self.date_from else ARXIV_MIN_DATE
+            high = self.date_to.replace('-', '') + '2359' if self.date_to else ARXIV_MAX_DATE
+            clauses.append(f'submittedDate:[{low} TO {high}]')
+        if self.authors:
+            clauses.append(' OR '.join(f'au:{author}' for author in self.authors))
+        if len(clauses) == 1:
+            return clauses[0]
+        return ' AND '.join(f'({clause})' for clause in clauses)
+
+    def sql(self, alias='p'):
+        # (cláusulas, parâmetros) para o WHERE do corpus; todas usam índices. Os mesmos artigos
+        # que `mask` aceita: os sem data conhecida (published = 0) também são mantidos
+        clauses, params = [], []
+        if self.min_timestamp is not None:
+            clauses.append(f'({alias}.published = 0 OR {alias}.published >= ?)')
+            params.append(self.min_timestamp)
+        if self.max_timestamp is not None:
+            clauses.append(f'({alias}.published = 0 OR {alias}.published <= ?)')
+            params.append(self.max_timestamp)
+        if self.categories:
+            clauses.append(f"{alias}.id IN (SELECT id FROM paper_categories WHERE category IN "
+                           f"({','.join('?' * len(self.categories))}))")
+            params.extend(self.categories)
+        if self.authors:
+            clauses.append(f"{alias}.id IN (SELECT id FROM paper_authors WHERE surname IN "
+                           f"({','.join('?' * len(self.authors))}))")
+            params.extend(self.authors)
+        return clauses, params
+
+    def mask(self, papers):
+        # Array booleano dos artigos aceitos por data, categorias e autores. Artigos sem data
+        # conhecida são mantidos; com filtro de categorias, os sem categoria conhecida saem
+        if isinstance(papers, PaperBatch):
+            published = papers.published_array
+            categories = papers.categories
+            authors = (papers.authors(i) for i in range(len(papers)))
+        else:
+            published = np.array([parse_timestamp(paper.get('published', '')) for paper in papers], dtype=np.int64)
+            categories = [paper.get('categories', ()) for paper in papers]
+            authors = (paper.get('authors', []) for paper in papers)
+        keep = np.ones(len(published), dtype=bool)
+        unknown = published == 0
+        if self.min_timestamp is not None:
+            keep &= unknown | (published >= self.min_timestamp)
+        if self.max_timestamp is not None:
+            keep &= unknown | (published <= self.max_timestamp)
+        if self.categories:
+            wanted = set(self.categories)
+            keep &= np.fromiter((not wanted.isdisjoint(names or ()) for names in categories),
+                                dtype=bool, count=len(keep))
+        if self.authors:
+            wanted = set(self.authors)
+            keep &= np.fromiter((any(author_surname(name) in wanted for name in names) for names in authors),
+                                dtype=bool, count=len(keep))
+        return keep
+
@@ -0,0 +1,231 @@
+import re
+import time
+from functools import lru_cache
+
+# Acima deste número de variáveis a tabela-verdade (2**n linhas) fica cara e usamos SAT
+MAX_TABLE_VARS = 16
+
+TOKEN_RE = re.compile(r'\s*(<->|<=>|->|=>|[()~!¬&∧|∨→↔]|\w+)')
+OPERATORS = {
+    '~': 'not', '!': 'not', '¬': 'not',
+    '&': 'and', '∧': 'and',
+    '|': 'or', '∨': 'or',
+    '->': 'implies', '=>': 'implies', '→': 'implies',
+    '<->': 'iff', '<=>': 'iff', '↔': 'iff',
+}
+
+
+def _tokenize(text):
+    tokens, position = [], 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if not match:
+            raise ValueError(f"Símbolo inválido na posição {position}: {text!r}")
+        token = match.group(1)
+        tokens.append(OPERATORS.get(token, token))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    # Descida recursiva; precedência: não > e > ou > implica (à direita) > equivale
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("Fórmula incompleta")
+        self.position += 1
+        return token
+
+    def parse(self):
+        formula = self.iff()
+        if self.peek() is not None:
+            raise ValueError(f"Símbolo inesperado: {self.peek()!r}")
+        return formula
+
+    def iff(self):
+        formula = self.implies()
+        while self.peek() == 'iff':
+            self.take()
+            formula = ('iff', formula, self.implies())
+        return formula
+
+    def implies(self):
+        formula = self.disjunction()
+        if self.peek() == 'implies':
+            self.take()
+            return ('implies', formula, self.implies())
+        return formula
+
+    def disjunction(self):
+        formula = self.conjunction()
+        while self.peek() == 'or':
+            self.take()
+            formula = ('or', formula, self.conjunction())
+        return formula
+
+    def conjunction(self):
+        formula = self.negation()
+        while self.peek() == 'and':
+            self.take()
+            formula = ('and', formula, self.negation())
+        return formula
+
+    def negation(self):
+        token = self.take()
+        if token == 'not':
+            return ('not', self.negation())
+        if token == '(':
+            formula = self.iff()
+            if self.take() != ')':
+                raise ValueError("Parêntese não fechado")
+            return formula
+        if token in OPERATORS.values() or token == ')':
+            raise ValueError(f"Símbolo inesperado: {token!r}")
+        return ('var', token)
+
+
+@lru_cache(maxsize=65536)
+def parse(text):
+    # 'Homem -> Mortal' -> ('implies', ('var', 'Homem'), ('var', 'Mortal')); memoizado por texto
+    return _Parser(_tokenize(text)).parse()
+
+
+def variables(formula):
+    if formula[0] == 'var':
+        return {formula[1]}
+    return set().union(*(variables(child) for child in formula[1:]))
+
+
+def _evaluate(formula, columns, mask):
+    # Avalia a fórmula em todas as linhas da tabela de uma vez: cada coluna é um
+    # inteiro usado como bitset (bit k = valor na linha k)
+    kind = formula[0]
+    if kind == 'var':
+        return columns[formula[1]]
+    if kind == 'not':
+        return mask ^ _evaluate(formula[1], columns, mask)
+    a = _evaluate(formula[1], columns, mask)
+    b = _evaluate(formula[2], columns, mask)
+    if kind == 'and':
+        return a & b
+    if kind == 'or':
+        return a | b
+    if kind == 'implies':
+        return (mask ^ a) | b
+    return mask ^ (a ^ b)
+
+
+@lru_cache(maxsize=MAX_TABLE_VARS + 1)
+def _columns(n):
+    # Coluna da variável i: bit k ligado quando o bit i de k é 1
+    rows = 1 << n
+    columns = []
+    for i in range(n):
+        block = 1 << i
+        pattern = ((1 << block) - 1) << block
+        period = 2 * block
+        while period < rows:
+            pattern |= pattern << period
+            period *= 2
+        columns.append(pattern)
+    return tuple(columns), (1 << rows) - 1
+
+
+def _to_sympy(formula):
+    import sympy as sp
+    kind = formula[0]
+    if kind == 'var':
+        return sp.Symbol(formula[1])
+    children = [_to_sympy(child) for child in formula[1:]]
+    return {'not': sp.Not, 'and': sp.And, 'or': sp.Or,
+            'implies': sp.Implies, 'iff': sp.Equivalent}[kind](*children)
+
+
+def _entails_sat(premises, conclusion):
+    from sympy import And, Not
+    from sympy.logic.inference import satisfiable
+    return not satisfiable(And(*(_to_sympy(f) for f in premises), Not(_to_sympy(conclusion))))
+
+
+@lru_cache(maxsize=65536)
+def _entails_parsed(premises, conclusion):
+    names = tuple(sorted(set(variables(conclusion)).union(*(variables(f) for f in premises))))
+    if len(names) > MAX_TABLE_VARS:
+        return _entails_sat(premises, conclusion)
+    table, mask = _columns(len(names))
+    columns = dict(zip(names, table))
+    # Válido sse premissas ∧ ¬conclusão é insatisfatível: nenhuma linha da tabela sobra
+    rows = mask ^ _evaluate(conclusion, columns, mask)
+    for formula in premises:
+        if not rows:
+            break
+        rows &= _evaluate(formula, columns, mask)
+    return rows == 0
+
+
+def entails(premises, conclusion):
+    # True se a conclusão é consequência lógica das premissas (strings ou fórmulas já analisadas)
+    premises = tuple(parse(p) if isinstance(p, str) else p for p in premises)
+    conclusion = parse(conclusion) if isinstance(conclusion, str) else conclusion
+    return _entails_parsed(premises, conclusion)
+
+
+def entails_many(problems):
+    # Lote de pares (premissas, conclusão) -> lista de bool
+    return [entails(premises, conclusion) for premises, conclusion in problems]
+
+
+def clear_caches():
+    for cached in (parse, _entails_parsed):
+        cached.cache_clear()
+
+
+def benchmark(n_problems=5000, n_vars=5, seed=0):
+    # Conjuntos de premissas aleatórios: motor com tabela-verdade em bitset x sympy simplify_logic
+    import random
+    rng = random.Random(seed)
+    names = [f'P{i}' for i in range(n_vars)]
+
+    def literal():
+        return ('~' if rng.random() < 0.3 else '') + rng.choice(names)
+
+    problems = [([f'{literal()} -> {literal()}' for _ in range(3)] + [literal()], literal())
+                for _ in range(n_problems)]
+
+    clear_caches()
+    start = time.perf_counter()
+    results = entails_many(problems)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    entails_many(problems)
+    warm = time.perf_counter() - start
+    print(f"entails_many: {n_problems / cold:.0f} conjuntos/s (frio), {n_problems / warm:.0f} conjuntos/s (memoizado); "
+          f"{sum(results)} de {n_problems} válidos")
+
+    try:
+        from sympy.logic.boolalg import simplify_logic
+    except ImportError:
+        return
+    sample = problems[:100]
+    start = time.perf_counter()
+    sat = [_entails_sat(tuple(parse(p) for p in premises), parse(conclusion)) for premises, conclusion in sample]
+    elapsed = time.perf_counter() - start
+    print(f"sympy satisfiable: {len(sample) / elapsed:.0f} conjuntos/s; "
+          f"concorda com a tabela-verdade: {sat == results[:len(sample)]}")
+    start = time.perf_counter()
+    for premises, conclusion in sample:
+        simplify_logic(_to_sympy(('and',) + tuple(parse(p) for p in premises[:2])))
+    elapsed = time.perf_counter() - start
+    print(f"simplify_logic (abordagem antiga): {len(sample) / elapsed:.0f} conjuntos/s")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,163 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+
+class LSAProfile:
+    # Perfil de interesses comprimido: projeção LSA (TruncatedSVD) do espaço TF-IDF
+    # em poucas dimensões densas, armazenado em float32. Não muda depois de ajustado: os
+    # embeddings dos artigos ficam em um EmbeddingCache do classificador
+    def __init__(self, n_components=256, random_state=42):
+        self.n_components = n_components
+        self.random_state = random_state
+        self.components = None  # (k, vocabulário), float32
+        self.interest_vector = None  # (k,), float32, norma unitária
+        self.version = None  # impressão digital da projeção
+
+    def fit(self, tfidf_matrix, user_interests):
+        # O SVD exige menos componentes do que termos e documentos
+        n_components = min(self.n_components, tfidf_matrix.shape[1] - 1, tfidf_matrix.shape[0])
+        svd = TruncatedSVD(n_components=max(n_components, 1), random_state=self.random_state)
+        svd.fit(tfidf_matrix)
+
+        self.components = np.ascontiguousarray(svd.components_, dtype=np.float32)
+        self.interest_vector = self._normalize(self.project(np.asarray(user_interests).reshape(1, -1)))[0]
+        self.version = self._fingerprint(self.components)
+        return self
+
+    @staticmethod
+    def _fingerprint(components):
+        return hashlib.sha256(np.ascontiguousarray(components).tobytes()).hexdigest()
+
+    def project(self, X):
+        # X (n, vocabulário) -> (n, k); funciona para matrizes esparsas e densas
+        return np.asarray(X @ self.components.T, dtype=np.float32)
+
+    @staticmethod
+    def _normalize(E):
+        norms = np.linalg.norm(E, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return E / norms
+
+    def embed(self, X):
+        # Embeddings normalizados (float32) dos artigos
+        return self._normalize(self.project(X))
+
+    def similarity(self, embeddings):
+        # Similaridade de cosseno no espaço LSA: um único produto matriz-vetor denso
+        return embeddings @ self.interest_vector
+
+    @property
+    def profile_nbytes(self):
+        return self.interest_vector.nbytes
+
+    @property
+    def nbytes(self):
+        return self.components.nbytes + self.interest_vector.nbytes
+
+    def save(self, path):
+        np.savez(path, components=self.components, interest_vector=self.interest_vector)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        profile = cls(n_components=data['components'].shape[0])
+        profile.components = data['components']
+        profile.interest_vector = data['interest_vector']
+        profile.version = cls._fingerprint(profile.components)
+        return profile
+
+
+class EmbeddingCache:
+    # Embeddings LSA dos artigos, guardados pelo classificador e não no perfil publicado:
+    # valem para uma projeção (LSAProfile.version) de cada vez, e uma projeção nova descarta
+    # os anteriores. Limitado a `max_items` artigos, descartando os usados há mais tempo
+    # (~1 KiB cada com 256 dimensões). Leituras e escritas concorrentes passam pela trava
+    def __init__(self, max_items=50000):
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self.version = None
+        self._embeddings = OrderedDict()
+
+    def __len__(self):
+        return len(self._embeddings)
+
+    def embeddings(self, lsa, keys, rows):
+        # Matriz (len(keys), k) dos embeddings de `keys` na projeção `lsa`; `rows(posições)`
+        # devolve as linhas TF-IDF das faltas, as únicas tokenizadas e projetadas
+        with self._lock:
+            if self.version != lsa.version:
+                self.version, self._embeddings = lsa.version, OrderedDict()
+            found = [self._embeddings.get(key) for key in keys]
+            for key, row in zip(keys, found):
+                if row is not None:
+                    self._embeddings.move_to_end(key)
+        missing = [i for i, row in enumerate(found) if row is None]
+        if missing:
+            computed = lsa.embed(rows(missing))
+            with self._lock:
+                if self.version == lsa.version:
+                    for i, row in zip(missing, computed):
+                        self._embeddings[keys[i]] = row
+                    while len(self._embeddings) > self.max_items:
+                        self._embeddings.popitem(last=False)
+            for i, row in zip(missing, computed):
+                found[i] = row
+        if not found:
+            return np.empty((0, len(lsa.interest_vector)), dtype=np.float32)
+        return np.vstack(found)
+
+
+def _synthetic_corpus(n_docs, vocabulary, rng, words_per_doc=12):
+    # Documentos com distribuição de termos tipo Zipf
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    return [' '.join(rng.choice(vocabulary, size=words_per_doc, p=weights)) for _ in range(n_docs)]
+
+
+def benchmark(n_history=5000, n_papers=2000, n_components=256, vocab_size=20000, top_k=10, seed=0):
+    # Compara o caminho esparso exato com o modo LSA: tamanho, tempo e concordância do ranking
+    from scipy.stats import spearmanr
+    from main import BraveHistoryClassifier
+
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f'term{i}' for i in range(vocab_size)])
+    titles = _synthetic_corpus(n_history, vocabulary, rng)
+    history_data = [(f'https://site{i % 50}.com/{i}', title, int(rng.integers(1, 20)), 0)
+                    for i, title in enumerate(titles)]
+    papers = [{'title': title, 'abstract': abstract, 'link': f'paper{i}'}
+              for i, (title, abstract) in enumerate(zip(_synthetic_corpus(n_papers, vocabulary, rng, 8),
+                                                         _synthetic_corpus(n_papers, vocabulary, rng, 120)))]
+
+    exact = BraveHistoryClassifier()
+    exact.analyze_user_interests(history_data)
+    compressed = BraveHistoryClassifier(lsa_components=n_components)
+    compressed.analyze_user_interests(history_data)
+
+    start = time.perf_counter()
+    exact_scores = exact.score_papers(papers)
+    exact_time = time.perf_counter() - start
+
+    compressed.score_papers(papers)  # aquece o cache de embeddings
+    start = time.perf_counter()
+    lsa_scores = compressed.score_papers(papers)
+    lsa_time = time.perf_counter() - start
+
+    rho = spearmanr(exact_scores, lsa_scores).statistic
+    exact_top = set(np.argsort(exact_scores)[::-1][:top_k])
+    lsa_top = set(np.argsort(lsa_scores)[::-1][:top_k])
+
+    print(f"Perfil esparso: {exact.user_interests.nbytes / 1024:.1f} KiB "
+          f"| perfil LSA: {compressed.lsa.profile_nbytes / 1024:.1f} KiB "
+          f"(projeção: {compressed.lsa.nbytes / 1024:.1f} KiB)")
+    print(f"Score por artigo: esparso {exact_time / n_papers * 1e6:.1f} us "
+          f"| LSA {lsa_time / n_papers * 1e6:.1f} us")
+    print(f"Concordância do ranking: Spearman {rho:.3f} | top-{top_k} em comum: {len(exact_top & lsa_top)}/{top_k}")
+
+
+if __name__ == '__main__':
+    benchmark()
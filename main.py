@@ -3,20 +3,112 @@ import os
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
-import pandas as pd
 from collections import Counter
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import shutil
+import threading
+import random
+import argparse
+import time
+from lsa_profile import EmbeddingCache, LSAProfile
+from sources import ArxivSource, CorpusSource, default_sources
+from corpus import CorpusStore
+from paper_batch import paper_links, paper_texts
+from result_cache import RankedResultCache, normalize_query
+from pipeline import run_pipeline
+from seen_filter import SeenStore, apply_seen
+from filters import PaperFilter
+from vector_cache import VectorCache
+from profile_snapshot import ProfileSnapshot
+from cascade import CascadeRanker, load_arxiv_classifier
+from affinity import AffinityIndex, count_arxiv_visits
+from content_fetcher import fetch_history_pages, top_visited
+
+# Com pelo menos este número de artigos no corpus local para um tópico que a pré-busca
+# atualizou dentro do seu intervalo, a consulta é servida sem acessar a rede
+WARM_MIN_RESULTS = 20
 
 class BraveHistoryClassifier:
-    def __init__(self):
+    # Pesos da similaridade de interesses e da relevância de domínio no score final
+    interest_weight = 0.7
+    domain_weight = 0.3
+    # Peso do reforço por afinidade de categoria/autor (artigos do arXiv visitados)
+    affinity_weight = 0.2
+
+    def __init__(self, lsa_components=None):
         self.brave_history_path = self.get_brave_history_path()
-        self.tfidf = TfidfVectorizer(stop_words='english')
-        self.user_interests = None
-        self.visit_frequency = None
-        
+        # Modo opcional: perfil comprimido por LSA com `lsa_components` dimensões
+        self.lsa_components = lsa_components
+        # ProfileSnapshot publicado; cada reconstrução monta outro e troca a referência
+        self.snapshot = None
+        # Serializa as reconstruções; quem pontua não trava
+        self._rebuild_lock = threading.Lock()
+        # Embeddings LSA dos artigos já pontuados; fora do snapshot, que não muda depois de publicado
+        self.embedding_cache = EmbeddingCache()
+        # VectorCache opcional com as linhas TF-IDF de cada artigo, persistidas no corpus
+        self.vector_cache = None
+        # CorpusStore opcional em que os artigos do arXiv visitados são resolvidos (afinidades)
+        self.paper_store = None
+        # Texto das `history_pages` páginas mais visitadas entra no perfil, com o peso das
+        # visitas (0: só os títulos); `page_fetcher`: PageFetcher opcional (cache e pool por host)
+        self.history_pages = 0
+        self.page_fetcher = None
+
+    @staticmethod
+    def new_vectorizer():
+        return TfidfVectorizer(stop_words='english')
+
+    # Leitura do perfil publicado; para vários campos de uma vez, leia `snapshot` uma única vez
+    @property
+    def tfidf(self):
+        return self.snapshot.tfidf if self.snapshot else None
+
+    @property
+    def user_interests(self):
+        return self.snapshot.user_interests if self.snapshot else None
+
+    @property
+    def visit_frequency(self):
+        return self.snapshot.visit_frequency if self.snapshot else None
+
+    @property
+    def lsa(self):
+        return self.snapshot.lsa if self.snapshot else None
+
+    @property
+    def affinity(self):
+        return self.snapshot.affinity if self.snapshot else None
+
+    @property
+    def vectorizer_version(self):
+        # Impressões digitais do vetorizador e do perfil ajustados; mudam quando o perfil é reconstruído
+        return self.snapshot.vectorizer_version if self.snapshot else None
+
+    @property
+    def profile_version(self):
+        return self.snapshot.profile_version if self.snapshot else None
+
+    def publish(self, tfidf, user_interests, visit_frequency, lsa=None, affinity=None):
+        # Monta o snapshot à parte e o publica com uma única atribuição
+        self.snapshot = ProfileSnapshot(tfidf, user_interests, visit_frequency, lsa,
+                                        self.interest_weight, self.domain_weight,
+                                        affinity=affinity, affinity_weight=self.affinity_weight)
+        return self.snapshot
+
+    def fetch_pages(self, history_data):
+        # [(texto, visitas)] das páginas mais visitadas entre as linhas de `history_data`
+        if not self.history_pages:
+            return []
+        pages = fetch_history_pages(history_data, self.history_pages, self.page_fetcher)
+        return [(page['text'], page['visit_count']) for page in pages]
+
+    def build_affinity(self, arxiv_visits):
+        # Afinidades por categoria e autor dos artigos do arXiv visitados, resolvidos em lote no corpus
+        if self.paper_store is None or not arxiv_visits:
+            return None
+        return AffinityIndex.build(arxiv_visits, self.paper_store)
+
     def get_brave_history_path(self):
         # Caminho para o histórico do Brave em diferentes sistemas operacionais
         if os.name == 'nt':  # Windows
@@ -55,7 +147,12 @@ class BraveHistoryClassifier:
         return history
 
     def analyze_user_interests(self, history_data):
-        # Processa títulos e URLs para extrair temas de interesse
+        # Processa títulos e URLs para extrair temas de interesse; como a leitura em blocos,
+        # serializada com as demais reconstruções
+        with self._rebuild_lock:
+            self._analyze_user_interests(history_data)
+
+    def _analyze_user_interests(self, history_data):
         texts = []
         visit_counts = []
         
@@ -63,20 +160,124 @@ class BraveHistoryClassifier:
             if title:  # Alguns registros podem não ter título
                 texts.append(title)
                 visit_counts.append(visit_count)
+        # Texto das páginas mais visitadas (opcional), como documentos a mais
+        for text, visit_count in self.fetch_pages(history_data):
+            texts.append(text)
+            visit_counts.append(visit_count)
         
         # Calcula TF-IDF dos títulos
-        tfidf_matrix = self.tfidf.fit_transform(texts)
+        tfidf = self.new_vectorizer()
+        tfidf_matrix = tfidf.fit_transform(texts)
         
         # Calcula média ponderada dos vetores TF-IDF usando visit_counts
         weighted_vectors = []
         for i, vector in enumerate(tfidf_matrix):
             weighted_vectors.append(vector.toarray()[0] * visit_counts[i])
         
-        self.user_interests = np.mean(weighted_vectors, axis=0)
+        user_interests = np.mean(weighted_vectors, axis=0)
+        
+        # Projeção LSA do perfil (modo opcional)
+        lsa = LSAProfile(self.lsa_components).fit(tfidf_matrix, user_interests) if self.lsa_components else None
         
         # Calcula frequência de visitas por domínio
         domains = [self.extract_domain(url) for url, _, _, _ in history_data]
-        self.visit_frequency = Counter(domains)
+        # Artigos do arXiv abertos (abs/pdf): afinidades por categoria e autor
+        affinity = self.build_affinity(count_arxiv_visits(history_data))
+        self.publish(tfidf, user_interests, Counter(domains), lsa, affinity)
+
+    def _iter_history_chunks(self, conn, cutoff_date, chunk_size):
+        # Percorre o cursor em blocos de `chunk_size` linhas, sem materializar o histórico
+        cursor = conn.execute("""
+        SELECT url, title, visit_count, last_visit_time
+        FROM urls
+        WHERE last_visit_time > ?
+        """, (cutoff_date,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+    def analyze_history_streaming(self, days_back=30, chunk_size=10000, lsa_sample=50000):
+        # Mesma análise de analyze_user_interests, mas lendo o histórico em blocos:
+        # a memória depende do tamanho do bloco e do vocabulário, não do número de visitas.
+        # O perfil novo é montado à parte e publicado no fim; devolve o número de registros analisados.
+        with self._rebuild_lock:
+            return self._analyze_history_streaming(days_back, chunk_size, lsa_sample)
+
+    def _analyze_history_streaming(self, days_back, chunk_size, lsa_sample):
+        temp_path = 'temp_history'
+        shutil.copy2(self.brave_history_path, temp_path)
+        conn = sqlite3.connect(temp_path)
+        tfidf = self.new_vectorizer()
+        try:
+            cutoff_date = int((datetime.now() - timedelta(days=days_back)).timestamp() * 1000000)
+            analyzer = tfidf.build_analyzer()
+
+            # 1ª passada: frequência de documento dos termos, visitas por domínio e artigos do arXiv abertos
+            document_frequency = Counter()
+            domains = Counter()
+            arxiv_visits = Counter()
+            most_visited = []
+            n_records = n_docs = 0
+            for rows in self._iter_history_chunks(conn, cutoff_date, chunk_size):
+                n_records += len(rows)
+                domains.update(self.extract_domain(url) for url, _, _, _ in rows)
+                count_arxiv_visits(rows, arxiv_visits)
+                if self.history_pages:
+                    most_visited = top_visited(rows, self.history_pages, most_visited)
+                for _, title, _, _ in rows:
+                    if title:
+                        document_frequency.update(set(analyzer(title)))
+                        n_docs += 1
+            # Texto das páginas mais visitadas (opcional): documentos a mais no vocabulário e no perfil
+            pages = self.fetch_pages(most_visited)
+            for text, _ in pages:
+                document_frequency.update(set(analyzer(text)))
+                n_docs += 1
+            if not document_frequency:
+                raise ValueError("Nenhum título com termos válidos no histórico")
+
+            # Vocabulário e IDF fixos, iguais aos que fit_transform produziria
+            terms = sorted(document_frequency)
+            tfidf.vocabulary_ = {term: i for i, term in enumerate(terms)}
+            df = np.fromiter((document_frequency[term] for term in terms), dtype=np.float64, count=len(terms))
+            del document_frequency
+            tfidf.idf_ = np.log((1 + n_docs) / (1 + df)) + 1
+
+            # 2ª passada: soma dos vetores TF-IDF ponderados por visitas, bloco a bloco;
+            # uma amostra (reservoir) limitada dos títulos alimenta o LSA opcional
+            weighted_sum = np.zeros(len(terms))
+            if pages:
+                weighted_sum += tfidf.transform([text for text, _ in pages]).T @ np.array(
+                    [visit_count for _, visit_count in pages], dtype=np.float64)
+            sample, rng, seen = [], random.Random(0), 0
+            for rows in self._iter_history_chunks(conn, cutoff_date, chunk_size):
+                titled = [(title, visit_count) for _, title, visit_count, _ in rows if title]
+                if not titled:
+                    continue
+                titles = [title for title, _ in titled]
+                visit_counts = np.array([visit_count for _, visit_count in titled], dtype=np.float64)
+                weighted_sum += tfidf.transform(titles).T @ visit_counts
+                if self.lsa_components:
+                    for title in titles:
+                        seen += 1
+                        if len(sample) < lsa_sample:
+                            sample.append(title)
+                        else:
+                            j = rng.randrange(seen)
+                            if j < lsa_sample:
+                                sample[j] = title
+        finally:
+            conn.close()
+            os.remove(temp_path)
+
+        user_interests = weighted_sum / n_docs
+        lsa = None
+        if self.lsa_components:
+            lsa = LSAProfile(self.lsa_components).fit(tfidf.transform(sample), user_interests)
+        self.publish(tfidf, user_interests, domains, lsa, self.build_affinity(arxiv_visits))
+        return n_records
 
     def extract_domain(self, url):
         # Extrai domínio da URL
@@ -88,77 +289,57 @@ class BraveHistoryClassifier:
 
     def calculate_relevance_score(self, paper):
         # Calcula score de relevância baseado nos interesses do usuário
-        paper_text = f"{paper['title']} {paper['abstract']}"
-        paper_vector = self.tfidf.transform([paper_text])
-        
-        # Similaridade com interesses do usuário
-        interest_similarity = cosine_similarity(
-            paper_vector.toarray(), 
-            self.user_interests.reshape(1, -1)
-        )[0][0]
+        return self.score_papers([paper])[0]
+
+    def tfidf_rows(self, links, texts, snapshot=None, digests=None):
+        # Linhas TF-IDF dos artigos; com vector_cache, só os artigos sem vetor guardado são tokenizados.
+        # `texts`: lista ou função das posições que precisam ser tokenizadas, com `digests`
+        # (ver VectorCache.rows)
+        snapshot = snapshot or self.snapshot
+        if self.vector_cache is not None:
+            return self.vector_cache.rows(snapshot.tfidf, snapshot.vectorizer_version, links, texts, digests)
+        return snapshot.tfidf.transform(texts(range(len(links))) if callable(texts) else texts)
+
+    def _interest_similarity(self, snapshot, papers, texts):
+        if snapshot.lsa is None:
+            # Caminho exato: as linhas do TF-IDF já têm norma unitária
+            return np.asarray(self.tfidf_rows(paper_links(papers), texts, snapshot)
+                              @ snapshot.interest_direction).ravel()
+
+        # Modo LSA: só os artigos sem embedding em cache são tokenizados
+        links = paper_links(papers)
+        keys = [link or text for link, text in zip(links, texts)]
+        embeddings = self.embedding_cache.embeddings(
+            snapshot.lsa, keys,
+            lambda missing: self.tfidf_rows([links[i] for i in missing], [texts[i] for i in missing], snapshot))
+        return snapshot.lsa.similarity(embeddings)
+
+    def score_papers(self, papers):
+        # Calcula os scores de relevância de um lote de artigos de uma só vez. O snapshot é lido
+        # uma única vez: vocabulário, interesses e domínios vêm sempre do mesmo perfil, mesmo
+        # que outro seja publicado durante a pontuação
+        snapshot = self.snapshot
+        texts = paper_texts(papers)
+        interest_similarity = self._interest_similarity(snapshot, papers, texts)
         
         # Verifica se há referências a domínios frequentemente visitados
-        domain_relevance = 0
-        for domain, freq in self.visit_frequency.most_common(10):
-            if domain.lower() in paper_text.lower():
-                domain_relevance += freq / sum(self.visit_frequency.values())
+        domain_relevance = snapshot.domain_relevance(texts)
         
         # Combina os scores
-        final_score = 0.7 * interest_similarity + 0.3 * domain_relevance
-        return final_score
+        scores = snapshot.interest_weight * interest_similarity + snapshot.domain_weight * domain_relevance
+        # Reforço O(1) por artigo: afinidade com suas categorias e autores
+        if snapshot.affinity is not None:
+            scores += snapshot.affinity_weight * snapshot.affinity.boosts(papers)
+        return scores
 
 
 
-import urllib.parse
-import urllib.request
-import xml.etree.ElementTree as ET
+# Fonte do arXiv compartilhada, para que o limite de requisições valha entre chamadas
+arxiv_source = ArxivSource()
 
 def fetch_arxiv_papers(query, max_results=100):
     try:
-        # Codifica a consulta para URL
-        encoded_query = urllib.parse.quote(query)
-        
-        # Monta a URL da API do arXiv
-        base_url = 'http://export.arxiv.org/api/query?'
-        query_params = {
-            'search_query': f'all:{encoded_query}',
-            'start': 0,
-            'max_results': max_results,
-            'sortBy': 'relevance',
-            'sortOrder': 'descending'
-        }
-        
-        url = base_url + urllib.parse.urlencode(query_params)
-        
-        # Faz a requisição
-        with urllib.request.urlopen(url) as response:
-            response_text = response.read()
-        
-        # Parse do XML
-        root = ET.fromstring(response_text)
-        
-        # Lista para armazenar os papers
-        papers = []
-        
-        # Namespace do XML do arXiv
-        namespace = {'atom': 'http://www.w3.org/2005/Atom'}
-        
-        # Extrai informações de cada entrada
-        for entry in root.findall('atom:entry', namespace):
-            try:
-                paper = {
-                    'title': entry.find('atom:title', namespace).text.strip(),
-                    'abstract': entry.find('atom:summary', namespace).text.strip(),
-                    'authors': [author.find('atom:name', namespace).text 
-                              for author in entry.findall('atom:author', namespace)],
-                    'link': entry.find('atom:id', namespace).text,
-                    'published': entry.find('atom:published', namespace).text
-                }
-                papers.append(paper)
-            except AttributeError as e:
-                print(f"Erro ao processar um artigo: {e}")
-                continue
-        
+        papers = arxiv_source.search(query, max_results)
         print(f"Encontrados {len(papers)} artigos sobre '{query}'")
         return papers
     
@@ -166,69 +347,130 @@ def fetch_arxiv_papers(query, max_results=100):
         print(f"Erro ao buscar artigos: {e}")
         return []
 
+def iso_date(value):
+    # Valida as datas dos filtros (AAAA-MM-DD)
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida: '{value}' (use AAAA-MM-DD)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recomendação de artigos do arXiv pelo histórico do Brave")
+    parser.add_argument('--days', type=int, default=30,
+                        help="janela do histórico em dias; lida em blocos, aceita vários anos (padrão: 30)")
+    parser.add_argument('--lsa', type=int, default=None, metavar='DIM',
+                        help="comprime o perfil de interesses com LSA em DIM dimensões (ex.: 256)")
+    parser.add_argument('--mmr', type=float, default=None, metavar='LAMBDA',
+                        help="diversifica o top 10 com MMR (0 = só diversidade, 1 = só relevância; ex.: 0.7)")
+    parser.add_argument('--seen', choices=['downrank', 'drop', 'off'], default='downrank',
+                        help="artigos já apresentados: vão para o fim da lista (padrão), são descartados ou não são filtrados")
+    parser.add_argument('--seen-fp', type=float, default=0.01, metavar='TAXA',
+                        help="taxa de falsos positivos do filtro de Bloom dos artigos já vistos (padrão: 0.01)")
+    parser.add_argument('--from', dest='date_from', type=iso_date, metavar='AAAA-MM-DD', help="só artigos publicados a partir desta data")
+    parser.add_argument('--until', dest='date_to', type=iso_date, metavar='AAAA-MM-DD', help="só artigos publicados até esta data")
+    parser.add_argument('--category', action='append', default=[], metavar='CAT',
+                        help="só artigos desta categoria do arXiv (ex.: cs.LG); pode ser repetido")
+    parser.add_argument('--author', action='append', default=[], metavar='NOME',
+                        help="só artigos deste autor (pelo sobrenome); pode ser repetido")
+    parser.add_argument('--pages', type=int, default=0, metavar='N',
+                        help="inclui no perfil o texto das N páginas mais visitadas (busca concorrente, com cache)")
+    parser.add_argument('--cascade', type=int, default=None, metavar='N',
+                        help="ranking em cascata: BM25 em todos os candidatos, score completo só nos N melhores")
+    parser.add_argument('--model', default=None, metavar='DIR',
+                        help="ArxivClassifier salvo (navegadores/chrome.py) aplicado aos promovidos da cascata")
+    parser.add_argument('--model-size', type=int, default=None, metavar='N',
+                        help="quantos dos promovidos passam pelo classificador (padrão: todos)")
+    return parser.parse_args(argv)
+
 # Atualização da função main()
-def main():
+def main(argv=None):
+    args = parse_args(argv)
     print("=== Sistema de Classificação baseado no Histórico do Brave ===")
     
     # Inicializa o classificador
-    classifier = BraveHistoryClassifier()
+    classifier = BraveHistoryClassifier(lsa_components=args.lsa)
+    classifier.history_pages = args.pages
     
-    # Carrega e analisa histórico do Brave
-    print("\nAnalisando seu histórico de navegação no Brave...")
-    try:
-        history_data = classifier.get_brave_history(days_back=30)
-        classifier.analyze_user_interests(history_data)
-        print(f"Analisados {len(history_data)} registros do histórico.")
-    except Exception as e:
-        print(f"Erro ao acessar histórico do Brave: {e}")
-        return
-
-    # Busca artigos
+    # A consulta vem primeiro: o histórico é analisado em paralelo com a busca
     query = input("\nDigite sua consulta: ")
-    papers = fetch_arxiv_papers(query)
-    
-    if not papers:
-        print("Nenhum artigo encontrado. Tente outra consulta.")
-        return
-    
-    print("\nClassificando artigos com base em seus interesses...")
-    
-    # Classifica artigos
-    scored_papers = []
-    for paper in papers:
-        try:
-            relevance_score = classifier.calculate_relevance_score(paper)
-            scored_papers.append((paper, relevance_score))
-        except Exception as e:
-            print(f"Erro ao classificar artigo: {e}")
-            continue
-    
-    if not scored_papers:
-        print("Não foi possível classificar os artigos.")
+    print("\nAnalisando seu histórico de navegação no Brave e buscando artigos...")
+
+    # Filtros aplicados na consulta às fontes e ao corpus: os excluídos nem são baixados
+    filters = PaperFilter(args.date_from, args.date_to, args.category, args.author)
+    cache = RankedResultCache()
+    # O modo do filtro de já vistos entra na chave: a lista guardada já saiu dele sem esses
+    # artigos (drop) ou com eles no fim (downrank), e apply_seen não os recoloca
+    options = f'mmr={args.mmr};seen={args.seen};{filters}'
+    if args.cascade:
+        options += f';cascade={args.cascade},{args.model},{args.model_size}'
+
+    def lookup():
+        # Resultados de perfis anteriores deixam de valer
+        cache.invalidate_except(classifier.profile_version)
+        ranked = cache.get(query, classifier.profile_version, options)
+        if ranked is not None:
+            # Os resumos das linhas exibidas vêm do corpus
+            ranked.papers.store = store
+            print("\nResultado encontrado no cache (mesma consulta e mesmo perfil).")
+        return ranked
+
+    # Consulta em paralelo todas as fontes configuradas (arXiv, Sempai, SerpAPI)
+    # Os artigos ficam em um lote colunar; os resumos vão para o corpus local depois de pontuados
+    store = CorpusStore()
+    sources = default_sources(filters)
+    n_local = store.count_matches(query, filters)
+    if n_local >= WARM_MIN_RESULTS and store.is_fresh(normalize_query(query), time.time()):
+        print("Consulta servida pelo corpus local (pré-busca recente).")
+        sources = [CorpusSource(store, filters=filters)]
+    elif n_local:
+        # Sem pré-busca recente: o corpus entra junto com a rede, para que as submissões novas apareçam
+        sources = [CorpusSource(store, filters=filters)] + sources
+    # Linhas TF-IDF guardadas (pela pré-busca ou por execuções anteriores) evitam tokenizar de novo
+    classifier.vector_cache = VectorCache(store)
+    # Artigos do arXiv visitados são resolvidos no corpus para as afinidades de categoria e autor
+    classifier.paper_store = store
+    # Artigos já apresentados em execuções anteriores não são pontuados de novo
+    seen = SeenStore(error_rate=args.seen_fp) if args.seen != 'off' else None
+    cascade = None
+    if args.cascade:
+        model = load_arxiv_classifier(args.model) if args.model else None
+        cascade = CascadeRanker(classifier, rerank_size=args.cascade, model_size=args.model_size, model=model)
+    result = run_pipeline(classifier, query, sources, days_back=args.days,
+                          store=store, lookup=lookup, mmr_lambda=args.mmr,
+                          seen=seen, seen_mode=args.seen, cascade=cascade)
+    stats = classifier.vector_cache.stats()
+    if stats['hits'] or stats['misses']:
+        print(f"Cache de vetores: {stats['hits']} acertos, {stats['misses']} faltas "
+              f"(taxa de acerto {stats['hit_rate']:.0%})")
+    affinity = classifier.affinity
+    if affinity is not None:
+        print(f"Afinidades: {affinity.n_resolved} de {affinity.n_visited} artigos do arXiv visitados "
+              f"encontrados no corpus ({len(affinity.categories)} categorias, {len(affinity.authors)} autores)")
+    if result is None:
+        cache.close()
         return
-    
-    # Ordena por relevância
-    scored_papers.sort(key=lambda x: x[1], reverse=True)
-    
-    # Mostra resultados
+    ranked, from_cache = result
+    if not from_cache:
+        cache.put(query, classifier.profile_version, ranked, options)
+    cache.close()
+    if seen is not None:
+        # Também vale para listas vindas do cache
+        ranked = apply_seen(ranked, seen, args.seen)
+        seen.mark_seen(ranked.links[:10])
+        seen.close()
+
+    # Mostra resultados; só as linhas exibidas viram registros e carregam o resumo
     print("\nArtigos mais relevantes baseados em seu histórico de navegação no Brave:")
-    for i, (paper, score) in enumerate(scored_papers[:10], 1):
-        print(f"\n{i}. Título: {paper['title']}")
-        print(f"Score de Relevância: {score:.2f}")
+    for rank, paper in enumerate(ranked.records(10), 1):
+        print(f"\n{rank}. Título: {paper['title']}")
+        print(f"Score de Relevância: {paper['score']:.2f}")
         print(f"Link: {paper['link']}")
         print("Abstract:", paper['abstract'][:200] + "...")
 
     # Salva resultados
     try:
-        results_df = pd.DataFrame([
-            {
-                'title': paper['title'],
-                'score': score,
-                'link': paper['link'],
-                'abstract': paper['abstract']
-            }
-            for paper, score in scored_papers
-        ])
+        # Montado direto das colunas do lote, na ordem final
+        results_df = ranked.to_frame()
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'brave_personalized_papers_{timestamp}.xlsx'
@@ -0,0 +1,161 @@
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from main import BraveHistoryClassifier
+from paper_batch import paper_texts
+
+
+class MultiUserScorer:
+    # Pontuação de um lote de artigos para vários usuários de uma vez: os vetores de interesse
+    # ficam em uma matriz (usuários x vocabulário) num espaço TF-IDF compartilhado e o lote
+    # é vetorizado uma única vez por consulta
+    def __init__(self, top_domains=10, dtype=np.float32):
+        self.top_domains = top_domains
+        self.dtype = dtype
+        self.tfidf = TfidfVectorizer(stop_words='english')
+        self.user_ids = []
+        self.interests = None  # (usuários, vocabulário), linhas de norma unitária
+        self.domains = []
+        self._domain_index = {}
+        self._domain_weights = None  # (usuários, domínios), esparsa
+        # Pesos da similaridade de interesses e da relevância de domínio de cada usuário
+        self.interest_weights = np.zeros(0, dtype=dtype)
+        self.domain_weights = np.zeros(0, dtype=dtype)
+
+    def fit(self, histories, classifiers=None):
+        # histories: {usuário: [(url, title, visit_count, last_visit_time), ...]};
+        # classifiers: {usuário: BraveHistoryClassifier} opcional, de onde vêm os pesos de cada um
+        titles = [title for rows in histories.values() for _, title, _, _ in rows if title]
+        self.tfidf.fit(titles)
+        self.user_ids, self.interests = [], None
+        self.domains, self._domain_index, self._domain_weights = [], {}, None
+        self.interest_weights = np.zeros(0, dtype=self.dtype)
+        self.domain_weights = np.zeros(0, dtype=self.dtype)
+        for user_id, rows in histories.items():
+            self.add_user(user_id, rows, (classifiers or {}).get(user_id))
+        return self
+
+    def add_user(self, user_id, rows, classifier=None):
+        # Projeta o histórico no vocabulário já ajustado, sem reajustar os demais usuários.
+        # Os pesos do score são os de `classifier` (sem ele, os padrão de BraveHistoryClassifier)
+        rows = list(rows)
+        titled = [(title, visit_count) for _, title, visit_count, _ in rows if title]
+        interests = np.zeros(len(self.tfidf.vocabulary_))
+        if titled:
+            visit_counts = np.array([visit_count for _, visit_count in titled], dtype=np.float64)
+            interests = self.tfidf.transform([title for title, _ in titled]).T @ visit_counts
+            norm = np.linalg.norm(interests)
+            if norm:
+                interests /= norm
+        interests = interests.astype(self.dtype).reshape(1, -1)
+        self.interests = interests if self.interests is None else np.vstack([self.interests, interests])
+
+        # Mesmo peso de domínio de BraveHistoryClassifier.score_papers: frequência / total de visitas
+        visits = Counter(urlparse(url).netloc for url, _, _, _ in rows)
+        total = sum(visits.values())
+        columns, weights = [], []
+        for domain, freq in visits.most_common(self.top_domains):
+            domain = domain.lower()
+            if not domain:
+                continue
+            if domain not in self._domain_index:
+                self._domain_index[domain] = len(self.domains)
+                self.domains.append(domain)
+            columns.append(self._domain_index[domain])
+            weights.append(freq / total)
+        row = sparse.csr_matrix((weights, ([0] * len(columns), columns)), shape=(1, len(self.domains)))
+        if self._domain_weights is None:
+            self._domain_weights = row
+        else:
+            self._domain_weights.resize((self._domain_weights.shape[0], len(self.domains)))
+            self._domain_weights = sparse.vstack([self._domain_weights, row], format='csr')
+        classifier = classifier or BraveHistoryClassifier
+        self.interest_weights = np.append(self.interest_weights, self.dtype(classifier.interest_weight))
+        self.domain_weights = np.append(self.domain_weights, self.dtype(classifier.domain_weight))
+        self.user_ids.append(user_id)
+
+    def _domain_matches(self, texts):
+        # (artigos, domínios) com 1 onde o texto menciona o domínio
+        lowered = [text.lower() for text in texts]
+        rows, columns = [], []
+        for j, domain in enumerate(self.domains):
+            for i, text in enumerate(lowered):
+                if domain in text:
+                    rows.append(i)
+                    columns.append(j)
+        return sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(len(texts), len(self.domains)))
+
+    def score(self, papers):
+        # (artigos, usuários): interest_weight * cosseno + domain_weight * relevância de domínio
+        # de cada usuário, como score_papers
+        texts = paper_texts(papers)
+        if not texts:
+            return np.zeros((0, len(self.user_ids)), dtype=self.dtype)
+        X = self.tfidf.transform(texts).astype(self.dtype)
+        similarity = np.asarray(X @ self.interests.T)
+        domain_relevance = (self._domain_matches(texts) @ self._domain_weights.T).toarray()
+        return self.interest_weights * similarity + self.domain_weights * domain_relevance
+
+    def top_k(self, papers, k=10, scores=None):
+        # {usuário: [(índice do artigo, score), ...]} em ordem decrescente de score
+        scores = self.score(papers) if scores is None else scores
+        k = min(k, scores.shape[0])
+        if k == 0:
+            return {user_id: [] for user_id in self.user_ids}
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        top_scores = np.take_along_axis(scores, top, axis=0)
+        order = np.argsort(-top_scores, axis=0, kind='stable')
+        top = np.take_along_axis(top, order, axis=0)
+        top_scores = np.take_along_axis(top_scores, order, axis=0)
+        return {user_id: list(zip(top[:, u].tolist(), top_scores[:, u].tolist()))
+                for u, user_id in enumerate(self.user_ids)}
+
+    @property
+    def nbytes(self):
+        return self.interests.nbytes
+
+
+def benchmark(n_users=50, n_papers=2000, history_size=2000, vocabulary_size=20000, seed=0):
+    # Um classificador por usuário (transform + score por usuário) x uma multiplicação para todos
+    rng = np.random.default_rng(seed)
+    words = np.array([f'term{i}' for i in range(vocabulary_size)])
+
+    def text(n_words):
+        return ' '.join(words[rng.zipf(1.3, n_words) % vocabulary_size])
+
+    histories = {
+        f'user{u}': [(f'https://site{rng.integers(200)}.org/{i}', text(8), int(rng.integers(1, 20)), 0)
+                     for i in range(history_size)]
+        for u in range(n_users)
+    }
+    papers = [{'title': text(10), 'abstract': text(150), 'link': f'http://arxiv.org/abs/2101.{i:05d}'}
+              for i in range(n_papers)]
+
+    classifiers = {}
+    for user_id, rows in histories.items():
+        classifier = BraveHistoryClassifier()
+        classifier.analyze_user_interests(rows)
+        classifiers[user_id] = classifier
+
+    scorer = MultiUserScorer().fit(histories, classifiers)
+    start = time.perf_counter()
+    top = scorer.top_k(papers, k=10)
+    shared = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for classifier in classifiers.values():
+        np.argsort(-classifier.score_papers(papers))[:10]
+    separate = time.perf_counter() - start
+
+    print(f"{n_users} usuários x {n_papers} artigos: um score_papers por usuário {separate:.2f}s, "
+          f"MultiUserScorer {shared:.2f}s ({separate / shared:.1f}x); "
+          f"matriz de interesses {scorer.nbytes / 2 ** 20:.1f} MiB; {len(top)} listas top-10")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -1,5 +1,6 @@
 import sqlite3
 import os
+import sys
 import shutil
 from datetime import datetime, timedelta
 import pandas as pd
@@ -7,7 +8,10 @@ from collections import Counter
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-import requests  # Para fazer requisições HTTP
+
+# Transporte HTTP compartilhado (pool de conexões, gzip, timeouts e novas tentativas)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from transport import get_transport
 
 class BraveHistoryClassifier:
     def __init__(self):
@@ -115,7 +119,7 @@ def fetch_arxiv_papers(query, max_results=100):
         url = base_url + search_query
         
         # Faz a requisição
-        response = requests.get(url)
+        response = get_transport().get(url)
         response.raise_for_status()  # Levanta um erro para códigos de status HTTP 4xx/5xx
         
         # Verifica o código de resposta
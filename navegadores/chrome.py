@@ -1,19 +1,25 @@
 import urllib.parse
-import urllib.request
 import xml.etree.ElementTree as ET
 import time
 import random
 import sqlite3
 import os
+import sys
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
 import pandas as pd
 from collections import Counter
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+import joblib
+
+# Transporte HTTP compartilhado (pool de conexões, gzip, timeouts e novas tentativas)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from transport import get_transport
 
 def fetch_arxiv_papers(query, max_results=100):
     base_url = 'http://export.arxiv.org/api/query?'
@@ -27,8 +33,9 @@ def fetch_arxiv_papers(query, max_results=100):
     
     url = base_url + urllib.parse.urlencode(query_params)
     
-    with urllib.request.urlopen(url) as response:
-        response_text = response.read()
+    response = get_transport().get(url)
+    response.raise_for_status()
+    response_text = response.content
     
     root = ET.fromstring(response_text)
     
@@ -51,10 +58,93 @@ def fetch_arxiv_papers(query, max_results=100):
     
     return papers
 
+class MappedForest:
+    # Floresta exportada como arrays planos (.npy) abertos com memory-map: vários
+    # processos que carregam o mesmo diretório compartilham as páginas do arquivo
+    ARRAYS = ('left', 'right', 'feature', 'threshold', 'value', 'roots')
+
+    def __init__(self, arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        left, right, feature, threshold, value, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            # Índices globais dos filhos; folhas continuam marcadas com -1
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            leaf_value = tree.value[:, 0, :]
+            value.append(leaf_value / leaf_value.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls({
+            'left': np.concatenate(left).astype(np.int32),
+            'right': np.concatenate(right).astype(np.int32),
+            'feature': np.concatenate(feature).astype(np.int32),
+            'threshold': np.concatenate(threshold),
+            'value': np.concatenate(value),
+            'roots': np.asarray(roots, dtype=np.int32),
+        })
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        # np.asarray mantém o mapeamento, mas evita o custo de indexar via np.memmap
+        return cls({name: np.asarray(np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode))
+                    for name in cls.ARRAYS})
+
+    def predict_proba(self, X, batch_size=1024):
+        # Percorre todas as árvores ao mesmo tempo, um nível de profundidade por
+        # iteração, mantendo apenas os pares (árvore, artigo) que ainda não chegaram à folha
+        n_trees = len(self.roots)
+        probas = []
+        for start in range(0, X.shape[0], batch_size):
+            # Mesma conversão para float32 feita pelo scikit-learn
+            Xb = np.asarray(X[start:start + batch_size].toarray(), dtype=np.float32)
+            n, n_features = Xb.shape
+            flat = Xb.ravel()
+            nodes = np.repeat(self.roots, n)
+            row_offsets = np.tile(np.arange(n) * n_features, n_trees)
+            walking = np.arange(nodes.size)
+            while walking.size:
+                current = nodes[walking]
+                left = self.left[current]
+                inner = left != -1
+                walking, current, left = walking[inner], current[inner], left[inner]
+                go_left = flat[row_offsets[walking] + self.feature[current]] <= self.threshold[current]
+                nodes[walking] = np.where(go_left, left, self.right[current])
+            probas.append(self.value[nodes].reshape(n_trees, n, -1).mean(axis=0))
+        return np.vstack(probas)
+
+
+# Modelos já carregados em cada processo de trabalho, indexados pelo diretório
+_LOADED_MODELS = {}
+
+def _predict_chunk(path, texts):
+    if path not in _LOADED_MODELS:
+        _LOADED_MODELS[path] = ArxivClassifier.load(path)
+    model = _LOADED_MODELS[path]
+    return model.forest.predict_proba(model.tfidf.transform(texts))[:, 1]
+
 class ArxivClassifier:
-    def __init__(self):
+    def __init__(self, n_jobs=None):
         self.tfidf = TfidfVectorizer(max_features=1000, stop_words='english')
-        self.clf = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.clf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+        self.n_jobs = n_jobs
+        # Preenchidos por load(): floresta em memory-map e diretório de origem
+        self.forest = None
+        self.path = None
 
     def prepare_features(self, papers):
         texts = [f"{p['title']} {p['abstract']}" for p in papers]
@@ -63,10 +153,70 @@ class ArxivClassifier:
     def train(self, papers, labels):
         X = self.prepare_features(papers)
         self.clf.fit(X, labels)
+        self.forest = None
+
+    def predict(self, papers, batch_size=2048):
+        texts = [f"{p['title']} {p['abstract']}" for p in papers]
+        if self.forest is None:
+            X = self.tfidf.transform(texts)
+            return self.clf.predict_proba(X)[:, 1]
+
+        n_jobs = self.n_jobs or 1
+        if n_jobs == 1 or len(texts) <= batch_size:
+            return self.forest.predict_proba(self.tfidf.transform(texts))[:, 1]
+
+        # Lotes grandes: cada processo abre o mesmo diretório em memory-map
+        chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = joblib.Parallel(n_jobs=n_jobs)(
+            joblib.delayed(_predict_chunk)(self.path, chunk) for chunk in chunks
+        )
+        return np.concatenate(results)
+
+    def save(self, path):
+        # Vetorizador (pequeno) via joblib e floresta como arrays .npy mapeáveis
+        os.makedirs(path, exist_ok=True)
+        joblib.dump(self.tfidf, os.path.join(path, 'tfidf.joblib'))
+        forest = self.forest if self.forest is not None else MappedForest.from_sklearn(self.clf)
+        forest.save(os.path.join(path, 'forest'))
+
+    @classmethod
+    def load(cls, path, n_jobs=None):
+        model = cls(n_jobs=n_jobs)
+        model.tfidf = joblib.load(os.path.join(path, 'tfidf.joblib'))
+        model.forest = MappedForest.load(os.path.join(path, 'forest'))
+        model.path = os.path.abspath(path)
+        return model
+
+class OnlineArxivClassifier:
+    # Variante incremental do ArxivClassifier: espaço de features fixo (hashing) e
+    # modelo linear atualizado com partial_fit, custo proporcional aos novos rótulos
+    def __init__(self, n_features=2 ** 18, alpha=1e-5):
+        self.vectorizer = HashingVectorizer(n_features=n_features, stop_words='english',
+                                            alternate_sign=False, norm='l2')
+        self.clf = SGDClassifier(loss='log_loss', alpha=alpha, random_state=42)
+        self.classes = np.array([0, 1])
+        self.n_labels_seen = 0
+
+    def prepare_features(self, papers):
+        # Sem fit: o mesmo artigo sempre gera o mesmo vetor
+        return self.vectorizer.transform([f"{p['title']} {p['abstract']}" for p in papers])
+
+    def train(self, papers, labels):
+        X = self.prepare_features(papers)
+        self.clf.partial_fit(X, labels, classes=self.classes)
+        self.n_labels_seen += len(labels)
+
+    def record_feedback(self, clicked=(), dismissed=()):
+        # Feedback do usuário: artigos clicados são positivos, descartados são negativos
+        clicked, dismissed = list(clicked), list(dismissed)
+        if clicked or dismissed:
+            self.train(clicked + dismissed, [1] * len(clicked) + [0] * len(dismissed))
 
     def predict(self, papers):
-        X = self.tfidf.transform([f"{p['title']} {p['abstract']}" for p in papers])
-        return self.clf.predict_proba(X)[:, 1]
+        if self.n_labels_seen == 0:
+            # Sem feedback ainda, todos os artigos são igualmente prováveis
+            return np.full(len(papers), 0.5)
+        return self.clf.predict_proba(self.prepare_features(papers))[:, 1]
 
 class ChromeHistoryClassifier:
     def __init__(self):
@@ -227,5 +377,37 @@ def main():
     results_df.to_excel(f'personalized_papers_{timestamp}.xlsx', index=False)
     print(f"\nResultados salvos em 'personalized_papers_{timestamp}.xlsx'")
 
+def benchmark_classifier(n_papers=20000, n_train=5000, n_jobs=4, path='arxiv_classifier_model'):
+    # Compara o tempo de partida a frio (re-treino x load) e as previsões por segundo
+    rng = np.random.default_rng(0)
+    vocabulary = np.array([f'term{i}' for i in range(5000)])
+    papers = [{'title': ' '.join(rng.choice(vocabulary, 8)), 'abstract': ' '.join(rng.choice(vocabulary, 120))}
+              for _ in range(n_papers)]
+    labels = rng.integers(0, 2, n_train)
+
+    start = time.perf_counter()
+    trained = ArxivClassifier()
+    trained.train(papers[:n_train], labels)
+    train_time = time.perf_counter() - start
+    trained.save(path)
+
+    start = time.perf_counter()
+    loaded = ArxivClassifier.load(path)
+    load_time = time.perf_counter() - start
+    print(f"Partida a frio: re-treino {train_time:.2f}s | load em memory-map {load_time * 1000:.1f}ms")
+
+    reference = trained.predict(papers)
+    for name, model in [('scikit-learn (1 thread)', trained),
+                        ('memory-map (1 processo)', loaded),
+                        (f'memory-map ({n_jobs} processos)', ArxivClassifier.load(path, n_jobs=n_jobs))]:
+        start = time.perf_counter()
+        predictions = model.predict(papers)
+        elapsed = time.perf_counter() - start
+        agree = np.allclose(predictions, reference)
+        print(f"{name}: {len(papers) / elapsed:,.0f} previsões/s (iguais ao original: {agree})")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if '--benchmark' in sys.argv:
+        benchmark_classifier()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,205 @@
+import argparse
+import time
+import xml.etree.ElementTree as ET
+
+from corpus import CorpusStore
+from paper_batch import parse_timestamp
+from sources import RateLimiter
+from transport import get_transport
+
+OAI_NS = '{http://www.openarchives.org/OAI/2.0/}'
+ARXIV_NS = '{http://arxiv.org/OAI/arXiv/}'
+
+
+class OAIError(Exception):
+    # Erro devolvido pelo repositório no corpo da resposta (ex.: badResumptionToken)
+    def __init__(self, code, message=''):
+        super().__init__(f'{code}: {message}')
+        self.code = code
+
+
+def _text(element, tag):
+    # Texto de um filho, com quebras de linha e espaços repetidos colapsados
+    return ' '.join((element.findtext(tag) or '').split())
+
+
+def parse_list_records(stream, records, source='arxiv'):
+    # Lê uma resposta ListRecords (metadataPrefix=arXiv) de forma incremental: cada registro é
+    # convertido para (link, title, abstract, authors, published, source, categories), anexado a `records`
+    # e descartado da árvore, então a memória não cresce com o tamanho da página.
+    # Devolve o token de retomada (None quando a lista terminou)
+    token = None
+    parent = None
+    for event, element in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if element.tag == OAI_NS + 'ListRecords':
+                parent = element
+            continue
+        if element.tag == OAI_NS + 'record':
+            header = element.find(OAI_NS + 'header')
+            metadata = element.find(f'{OAI_NS}metadata/{ARXIV_NS}arXiv')
+            if header.get('status') != 'deleted' and metadata is not None:
+                authors = [' '.join(filter(None, (_text(author, ARXIV_NS + 'forenames'),
+                                                  _text(author, ARXIV_NS + 'keyname'))))
+                           for author in metadata.iter(ARXIV_NS + 'author')]
+                records.append((f"http://arxiv.org/abs/{_text(metadata, ARXIV_NS + 'id')}",
+                                _text(metadata, ARXIV_NS + 'title'), _text(metadata, ARXIV_NS + 'abstract'),
+                                authors, parse_timestamp(_text(metadata, ARXIV_NS + 'created')), source,
+                                _text(metadata, ARXIV_NS + 'categories').split()))
+            if parent is not None:
+                parent.remove(element)
+        elif element.tag == OAI_NS + 'resumptionToken':
+            token = (element.text or '').strip() or None
+        elif element.tag == OAI_NS + 'error':
+            raise OAIError(element.get('code'), (element.text or '').strip())
+    return token
+
+
+class OAIHarvester:
+    # Coleta em massa dos metadados do arXiv via OAI-PMH (ListRecords), seguindo os tokens
+    # de retomada. Os registros são acumulados e gravados no corpus em transações grandes
+    # (`batch_size`), junto com o token da última página, então uma coleta interrompida
+    # continua do último lote confirmado
+    default_base_url = 'http://export.arxiv.org/oai2'
+    # O arXiv pede no máximo uma requisição a cada 3 segundos
+    default_min_interval = 3.0
+
+    def __init__(self, store, base_url=None, metadata_prefix='arXiv', batch_size=10000, timeout=60.0,
+                 min_interval=None, transport=None):
+        self.store = store
+        self.base_url = base_url or self.default_base_url
+        self.metadata_prefix = metadata_prefix
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(self.default_min_interval if min_interval is None else min_interval)
+        self.transport = transport or get_transport()
+        self.requests_made = 0
+
+    def progress_key(self, set_spec=None, from_date=None, until_date=None):
+        return '|'.join((self.base_url, self.metadata_prefix, set_spec or '', from_date or '', until_date or ''))
+
+    def _fetch_page(self, params, records):
+        self.rate_limiter.wait()
+        self.requests_made += 1
+        response = self.transport.get(self.base_url, params=params, timeout=self.timeout, stream=True)
+        try:
+            response.raise_for_status()
+            # Descompacta o gzip enquanto o parser lê o corpo
+            response.raw.decode_content = True
+            return parse_list_records(response.raw, records)
+        finally:
+            response.close()
+
+    def harvest(self, set_spec=None, from_date=None, until_date=None, max_pages=None):
+        # Coleta (ou retoma) a lista restrita ao conjunto e às datas (AAAA-MM-DD) dados;
+        # devolve o número de registros gravados nesta chamada. `max_pages` interrompe antes do fim
+        key = self.progress_key(set_spec, from_date, until_date)
+        token, total, complete = self.store.get_harvest_progress(key) or (None, 0, 0)
+        if complete:
+            return 0
+        initial = {'verb': 'ListRecords', 'metadataPrefix': self.metadata_prefix}
+        for name, value in (('set', set_spec), ('from', from_date), ('until', until_date)):
+            if value:
+                initial[name] = value
+
+        pending, ingested, pages = [], 0, 0
+        resuming = token is not None
+        while True:
+            params = {'verb': 'ListRecords', 'resumptionToken': token} if token else initial
+            try:
+                token = self._fetch_page(params, pending)
+            except OAIError as e:
+                if e.code == 'noRecordsMatch':
+                    token = None
+                elif e.code == 'badResumptionToken' and resuming:
+                    # Token guardado expirou: recomeça a lista; o upsert do corpus torna a repetição inofensiva
+                    print(f"Token de retomada recusado ({e}); recomeçando a lista.")
+                    token = None
+                    resuming = False
+                    continue
+                else:
+                    raise
+            resuming = False
+            pages += 1
+            done = token is None
+            stop = done or (max_pages is not None and pages >= max_pages)
+            if stop or len(pending) >= self.batch_size:
+                total += len(pending)
+                ingested += len(pending)
+                self.store.add_papers(pending, (key, token, total, int(done)))
+                pending.clear()
+            if stop:
+                return ingested
+
+
+def benchmark(n_records=20000, page_size=1000, tmpdir=None):
+    # Coleta completa contra o repositório local (registros/s com uma transação por página x
+    # transações grandes), retomada após interrupção, token expirado e restrição por conjunto e datas
+    import os
+    import tempfile
+    from Testes.stubs import StubOAIHandler, start_server
+
+    tmpdir = tmpdir or tempfile.mkdtemp()
+    StubOAIHandler.n_records = n_records
+    StubOAIHandler.page_size = page_size
+    server, base_url = start_server(StubOAIHandler, '/oai')
+
+    def harvester(name, **kwargs):
+        return OAIHarvester(CorpusStore(os.path.join(tmpdir, f'{name}.sqlite')), base_url=base_url,
+                            min_interval=0.0, **kwargs)
+
+    for name, batch_size in (('por página', 1), ('transações grandes', 10000)):
+        instance = harvester(f'full_{batch_size}', batch_size=batch_size)
+        start = time.perf_counter()
+        ingested = instance.harvest()
+        elapsed = time.perf_counter() - start
+        print(f"Coleta completa, {name}: {ingested} registros em {elapsed:.2f}s "
+              f"({ingested / elapsed:.0f} registros/s, {instance.requests_made} requisições)")
+
+    instance = harvester('resume', batch_size=page_size)
+    first = instance.harvest(max_pages=5)
+    second = instance.harvest()
+    print(f"Interrompida após 5 páginas ({first} registros) e retomada ({second} registros): "
+          f"{len(instance.store)} no corpus, {instance.requests_made} requisições")
+
+    instance = harvester('expired', batch_size=page_size)
+    instance.harvest(max_pages=3)
+    StubOAIHandler.expired_tokens.add(instance.store.get_harvest_progress(instance.progress_key())[0])
+    instance.harvest()
+    StubOAIHandler.expired_tokens.clear()
+    print(f"Token expirado na retomada: {len(instance.store)} no corpus, {instance.requests_made} requisições")
+
+    instance = harvester('restricted')
+    ingested = instance.harvest('cs', '2024-03-01', '2024-03-31')
+    print(f"Conjunto 'cs' em março de 2024: {ingested} registros, {instance.requests_made} requisição(ões)")
+    server.shutdown()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Coleta em massa dos metadados do arXiv via OAI-PMH")
+    parser.add_argument('--set', action='append', dest='sets', metavar='SET',
+                        help="conjunto OAI (ex.: cs, math, physics:hep-th); pode ser repetido")
+    parser.add_argument('--from', dest='from_date', metavar='AAAA-MM-DD', help="datestamp inicial")
+    parser.add_argument('--until', dest='until_date', metavar='AAAA-MM-DD', help="datestamp final")
+    parser.add_argument('--batch', type=int, default=10000, help="registros por transação (padrão: 10000)")
+    parser.add_argument('--corpus', default='corpus.sqlite', help="banco do corpus local")
+    parser.add_argument('--benchmark', action='store_true', help="roda contra um repositório OAI-PMH local simulado")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.benchmark:
+        benchmark()
+        return
+    harvester = OAIHarvester(CorpusStore(args.corpus), batch_size=args.batch)
+    for set_spec in args.sets or [None]:
+        start = time.perf_counter()
+        ingested = harvester.harvest(set_spec, args.from_date, args.until_date)
+        elapsed = time.perf_counter() - start
+        print(f"Conjunto {set_spec or '(todos)'}: {ingested} registros em {elapsed:.0f}s "
+              f"({ingested / max(elapsed, 1e-9):.0f} registros/s)")
+
+
+if __name__ == '__main__':
+    main()
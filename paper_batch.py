@@ -0,0 +1,343 @@
+import hashlib
+import sys
+import threading
+import time
+import tracemalloc
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+class AuthorTable:
+    # Nomes de autores internados: cada nome é guardado uma única vez e referenciado por código.
+    # Cada lote novo tem a sua (lotes derivados por take a compartilham); a trava cobre tabelas
+    # usadas por mais de uma thread
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+        self._lock = threading.Lock()
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self.codes.get(name)
+                if code is None:
+                    name = sys.intern(name)
+                    code = len(self.names)
+                    self.names.append(name)
+                    self.codes[name] = code
+        return code
+
+    def __getstate__(self):
+        return self.names
+
+    def __setstate__(self, names):
+        self.names = names
+        self.codes = {name: code for code, name in enumerate(names)}
+        self._lock = threading.Lock()
+
+
+def content_digest(text):
+    # Impressão digital (int64) do texto vetorizado de um artigo (título e resumo)
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little', signed=True)
+
+
+def parse_timestamp(value):
+    # '2021-01-01T00:00:00Z' ou '2021' -> segundos desde a época (0 se desconhecido)
+    if not value:
+        return 0
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+    except ValueError:
+        pass
+    if value[:4].isdigit():
+        return int(datetime(int(value[:4]), 1, 1, tzinfo=timezone.utc).timestamp())
+    return 0
+
+
+class PaperBatch:
+    # Lote colunar de artigos: strings em listas, datas e autores em arrays compactos,
+    # autores internados e resumos que podem ser descarregados para o corpus local
+    __slots__ = ('titles', 'links', 'sources', 'published', 'author_offsets', 'author_codes',
+                 'author_table', 'categories', 'digests', 'store', '_abstracts')
+
+    def __init__(self, author_table=None, store=None):
+        self.titles = []
+        self.links = []
+        self.sources = []
+        self.published = array('q')  # segundos desde a época
+        self.author_offsets = array('q', [0])
+        self.author_codes = array('i')
+        self.author_table = author_table or AuthorTable()
+        self.categories = []  # tuplas de categorias do arXiv (vazias quando a fonte não informa)
+        # content_digest do título e do resumo, calculado na chegada: permite conferir contagens
+        # guardadas (VectorCache) mesmo depois que os resumos foram para o corpus
+        self.digests = array('q')
+        self.store = store
+        self._abstracts = []
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __getstate__(self):
+        # Sem o corpus (conexão SQLite): quem carrega o lote o associa de novo
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'store'}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.store = None
+
+    def append(self, title, abstract, authors, link, published, source, categories=()):
+        if self._abstracts is None:
+            raise ValueError("Os resumos deste lote já foram descarregados para o corpus")
+        self.titles.append(title)
+        self.links.append(link)
+        self.sources.append(sys.intern(source))
+        self.published.append(parse_timestamp(published) if isinstance(published, str) else int(published or 0))
+        self.author_codes.extend(self.author_table.code(author) for author in authors)
+        self.author_offsets.append(len(self.author_codes))
+        self.categories.append(tuple(sys.intern(category) for category in categories))
+        self.digests.append(content_digest(f"{title} {abstract}"))
+        self._abstracts.append(abstract)
+
+    def extend(self, papers):
+        # Acrescenta artigos no formato de dicionário (ex.: respostas JSON)
+        for paper in papers:
+            self.append(paper['title'], paper['abstract'], paper.get('authors', []), paper.get('link', ''),
+                        paper.get('published', ''), paper.get('source', ''), paper.get('categories', ()))
+        return self
+
+    @property
+    def published_array(self):
+        return np.frombuffer(self.published, dtype=np.int64)
+
+    def authors(self, i):
+        codes = self.author_codes[self.author_offsets[i]:self.author_offsets[i + 1]]
+        return [self.author_table.names[code] for code in codes]
+
+    def abstracts(self, indices=None):
+        indices = range(len(self)) if indices is None else indices
+        if self._abstracts is not None:
+            return [self._abstracts[i] for i in indices]
+        # Carregamento preguiçoso: só os resumos pedidos são lidos do corpus
+        links = [self.links[i] for i in indices]
+        stored = self.store.get_abstracts(links)
+        return [stored.get(link, '') for link in links]
+
+    def abstract(self, i):
+        return self.abstracts([i])[0]
+
+    def texts(self, indices=None):
+        indices = range(len(self)) if indices is None else indices
+        return [f"{self.titles[i]} {abstract}" for i, abstract in zip(indices, self.abstracts(indices))]
+
+    def offload_abstracts(self):
+        # Grava os artigos no corpus e libera os resumos da memória
+        if self._abstracts is None:
+            return
+        self.store.add_papers(
+            (self.links[i], self.titles[i], self._abstracts[i], self.authors(i),
+             self.published[i], self.sources[i], self.categories[i])
+            for i in range(len(self))
+        )
+        self._abstracts = None
+
+    def take(self, indices):
+        # Novo lote com os artigos de `indices`, na ordem dada
+        batch = PaperBatch(self.author_table, self.store)
+        abstracts = self.abstracts(indices) if self._abstracts is not None else None
+        for i in indices:
+            batch.titles.append(self.titles[i])
+            batch.links.append(self.links[i])
+            batch.sources.append(self.sources[i])
+            batch.published.append(self.published[i])
+            batch.author_codes.extend(self.author_codes[self.author_offsets[i]:self.author_offsets[i + 1]])
+            batch.author_offsets.append(len(batch.author_codes))
+            batch.categories.append(self.categories[i])
+            batch.digests.append(self.digests[i])
+        batch._abstracts = abstracts
+        return batch
+
+    @classmethod
+    def concat(cls, batches):
+        # Lotes com tabelas de autores diferentes (ex.: de fontes diferentes) têm os códigos
+        # traduzidos para uma tabela nova. Se algum lote já descarregou os resumos, os demais
+        # também vão para o corpus, e o lote resultante os lê de lá sob demanda
+        batches = list(batches)
+        tables = {id(batch.author_table): batch.author_table for batch in batches}
+        shared = next(iter(tables.values())) if len(tables) == 1 else None
+        merged = cls(shared, batches[0].store if batches else None)
+        offloaded = any(batch._abstracts is None for batch in batches)
+        if offloaded:
+            for batch in batches:
+                batch.offload_abstracts()
+            merged._abstracts = None
+        for batch in batches:
+            shift = len(merged.author_codes)
+            merged.titles.extend(batch.titles)
+            merged.links.extend(batch.links)
+            merged.sources.extend(batch.sources)
+            merged.published.extend(batch.published)
+            if shared is not None:
+                merged.author_codes.extend(batch.author_codes)
+            else:
+                remap = [merged.author_table.code(name) for name in batch.author_table.names]
+                merged.author_codes.extend(remap[code] for code in batch.author_codes)
+            merged.author_offsets.extend(offset + shift for offset in batch.author_offsets[1:])
+            merged.categories.extend(batch.categories)
+            merged.digests.extend(batch.digests)
+            if not offloaded:
+                merged._abstracts.extend(batch.abstracts())
+        return merged
+
+    def to_frame(self, scores=None, order=None):
+        # DataFrame de exportação montado direto das colunas
+        import pandas as pd
+        order = np.arange(len(self)) if order is None else np.asarray(order)
+        frame = {'title': [self.titles[i] for i in order]}
+        if scores is not None:
+            frame['score'] = np.asarray(scores)[order]
+        frame['link'] = [self.links[i] for i in order]
+        frame['abstract'] = self.abstracts(order.tolist())
+        return pd.DataFrame(frame)
+
+    def to_arrow(self):
+        # Tabela Arrow com autores como lista de dicionário (requer pyarrow)
+        import pyarrow as pa
+        authors = pa.ListArray.from_arrays(
+            pa.array(np.frombuffer(self.author_offsets, dtype=np.int64).astype(np.int32)),
+            pa.DictionaryArray.from_arrays(pa.array(np.frombuffer(self.author_codes, dtype=np.int32)),
+                                           pa.array(self.author_table.names)),
+        )
+        return pa.table({
+            'title': self.titles,
+            'link': self.links,
+            'source': pa.array(self.sources).dictionary_encode(),
+            'published': pa.array(self.published_array, type=pa.timestamp('s', tz='UTC')),
+            'authors': authors,
+        })
+
+
+class RankedPapers:
+    # Lista final ordenada, ainda colunar: o lote, os scores de cada artigo do lote e a ordem
+    # (posições no lote). Exibição e exportação montam só as linhas que usam, e os resumos
+    # dessas linhas são lidos do corpus sob demanda
+    __slots__ = ('papers', 'scores', 'order')
+
+    def __init__(self, papers, scores, order=None):
+        self.papers = papers
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.order = np.arange(len(papers)) if order is None else np.asarray(order, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getstate__(self):
+        return self.papers, self.scores, self.order
+
+    def __setstate__(self, state):
+        self.papers, self.scores, self.order = state
+
+    @property
+    def links(self):
+        return [self.papers.links[i] for i in self.order]
+
+    def take(self, positions):
+        # Subconjunto (ou reordenação) pelas posições na lista, sem copiar o lote
+        return RankedPapers(self.papers, self.scores, self.order[np.asarray(positions, dtype=np.int64)])
+
+    def records(self, n=None):
+        # Registros (title, score, link, abstract) das n primeiras linhas
+        order = self.order[:n].tolist()
+        return [{'title': self.papers.titles[i], 'score': float(self.scores[i]),
+                 'link': self.papers.links[i], 'abstract': abstract}
+                for i, abstract in zip(order, self.papers.abstracts(order))]
+
+    def to_frame(self, n=None):
+        return self.papers.to_frame(self.scores, self.order[:n])
+
+    @classmethod
+    def concat(cls, parts):
+        # Listas em sequência (ex.: os já vistos no fim), num lote só
+        parts = list(parts)
+        offsets = np.cumsum([0] + [len(part.papers) for part in parts[:-1]])
+        return cls(PaperBatch.concat(part.papers for part in parts),
+                   np.concatenate([part.scores for part in parts]) if parts else np.zeros(0),
+                   np.concatenate([part.order + offset for part, offset in zip(parts, offsets)])
+                   if parts else None)
+
+
+def paper_texts(papers):
+    # Texto usado na vetorização, tanto para lotes colunares quanto para listas de dicionários
+    if isinstance(papers, PaperBatch):
+        return papers.texts()
+    return [f"{paper['title']} {paper['abstract']}" for paper in papers]
+
+
+def paper_digests(papers):
+    # content_digest de cada artigo; o lote colunar já os tem, sem carregar resumos
+    if isinstance(papers, PaperBatch):
+        return papers.digests.tolist()
+    return [content_digest(text) for text in paper_texts(papers)]
+
+
+def paper_links(papers):
+    if isinstance(papers, PaperBatch):
+        return papers.links
+    return [paper.get('link', '') for paper in papers]
+
+
+def take_papers(papers, indices):
+    if isinstance(papers, PaperBatch):
+        return papers.take(indices)
+    return [papers[i] for i in indices]
+
+
+def benchmark_memory(n_papers=100000, path=':memory:'):
+    # Memória alocada (tracemalloc) por 100 mil artigos: lista de dicionários x lote colunar
+    from corpus import CorpusStore
+
+    rng = np.random.default_rng(0)
+    vocabulary = [f'term{i}' for i in range(20000)]
+    author_pool = [f'Author {i}' for i in range(20000)]
+
+    def synthetic():
+        for i in range(n_papers):
+            words = rng.choice(len(vocabulary), 130)
+            yield (' '.join(vocabulary[w] for w in words[:10]), ' '.join(vocabulary[w] for w in words[10:]),
+                   [author_pool[a] for a in rng.choice(len(author_pool), 4)],
+                   f'http://arxiv.org/abs/{2000 + i // 100000}.{i % 100000:05d}v1', '2021-06-01T12:00:00Z', 'arxiv')
+
+    tracemalloc.start()
+    papers = [{'title': t, 'abstract': a, 'authors': au, 'link': l, 'published': p, 'source': s}
+              for t, a, au, l, p, s in synthetic()]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    del papers
+    tracemalloc.stop()
+
+    store = CorpusStore(path)
+    tracemalloc.start()
+    start = time.perf_counter()
+    batch = PaperBatch(AuthorTable(), store)
+    for record in synthetic():
+        batch.append(*record)
+    batch_bytes = tracemalloc.get_traced_memory()[0]
+    batch.offload_abstracts()
+    offloaded_bytes = tracemalloc.get_traced_memory()[0]
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    scale = 100000 / n_papers
+    print(f"Lista de dicionários: {dict_bytes * scale / 2 ** 20:.1f} MiB por 100 mil artigos")
+    print(f"PaperBatch: {batch_bytes * scale / 2 ** 20:.1f} MiB com resumos, "
+          f"{offloaded_bytes * scale / 2 ** 20:.1f} MiB com resumos no corpus ({elapsed:.1f}s)")
+
+
+if __name__ == '__main__':
+    benchmark_memory()
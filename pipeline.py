@@ -0,0 +1,203 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dedup import StreamingDeduplicator
+from diversify import diversify_order
+from paper_batch import PaperBatch, RankedPapers
+from sources import iter_source_results
+
+
+def rank_papers(classifier, papers, scores, mmr_lambda=None, shortlist_size=1000):
+    # Ordena por score (com MMR opcional) e devolve a lista final (RankedPapers), ainda colunar;
+    # as duplicatas já saíram em run_pipeline, antes da pontuação
+    order = np.argsort(-scores, kind='stable')
+    # Diversificação opcional do topo por MMR, sobre os vetores TF-IDF da lista curta
+    if mmr_lambda is not None:
+        shortlist = order[:shortlist_size].tolist()
+        # Do cache de vetores quando houver; só as faltas carregam o resumo e são tokenizadas
+        vectors = classifier.tfidf_rows([papers.links[i] for i in shortlist],
+                                        lambda missing: papers.texts([shortlist[i] for i in missing]),
+                                        digests=[papers.digests[i] for i in shortlist])
+        order = diversify_order(order, scores, vectors, k=10, lambda_=mmr_lambda)
+    papers.offload_abstracts()
+    return RankedPapers(papers, scores, order)
+
+
+def run_pipeline(classifier, query, sources, days_back=30, max_results=100, store=None,
+                 lookup=None, mmr_lambda=None, seen=None, seen_mode='downrank', cascade=None):
+    # Etapas concorrentes: o perfil é construído em uma thread enquanto as fontes são
+    # consultadas; cada página é pontuada assim que chega, se o perfil já estiver pronto.
+    # `lookup()`: consultado quando o perfil fica pronto; se devolver uma lista (ex.: cache),
+    # a busca é abandonada. Com `seen` (SeenStore), artigos já apresentados não são pontuados:
+    # são descartados (seen_mode='drop') ou vão para o fim da lista ('downrank').
+    # Com `cascade` (CascadeRanker), os artigos são pontuados todos juntos no fim, em etapas.
+    # Devolve (RankedPapers, veio_do_lookup) ou None.
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=1)
+    profile = executor.submit(classifier.analyze_history_streaming, days_back=days_back)
+    profile_checked = False
+    pages, scores, pending, already_seen = [], [], [], []
+    n_seen = n_duplicates = 0
+    seen_links = set()
+    # Ids normalizados e baldes LSH de todas as páginas já recebidas
+    deduplicator = StreamingDeduplicator()
+    fetch_time = None
+
+    def profile_ready():
+        # Consulta o lookup uma única vez, logo que o perfil termina
+        nonlocal profile_checked
+        n_records = profile.result()
+        if not profile_checked:
+            profile_checked = True
+            print(f"Analisados {n_records} registros do histórico "
+                  f"({time.perf_counter() - start:.1f}s).")
+            if lookup is not None:
+                return lookup()
+        return None
+
+    try:
+        results = iter_source_results(query, sources, max_results, columnar=True)
+        for name, page in results:
+            new = [i for i, link in enumerate(page.links) if not link or link not in seen_links]
+            seen_links.update(page.links[i] for i in new if page.links[i])
+            page = page.take(new)
+            print(f"Encontrados {len(new)} artigos sobre '{query}' em '{name}'")
+            # Versões repetidas e quase-duplicatas (também entre fontes) saem antes de pontuar
+            unique = deduplicator.filter(page)
+            n_duplicates += len(page) - len(unique)
+            page = page.take(unique)
+            if seen is not None:
+                # Filtro antes da vetorização: artigos já mostrados não são pontuados
+                mask = seen.seen_mask(page.links)
+                if mask.any():
+                    n_seen += int(mask.sum())
+                    if seen_mode == 'downrank':
+                        already_seen.append(page.take(np.flatnonzero(mask).tolist()))
+                    page = page.take(np.flatnonzero(~mask).tolist())
+            pages.append(page)
+            pending.append(page)
+            if profile.done() and cascade is None:
+                cached = profile_ready()
+                if cached is not None:
+                    results.close()
+                    return cached, True
+                # Pontuação por página, sobreposta ao restante da busca
+                scores.extend(classifier.score_papers(p) for p in pending if len(p))
+                pending.clear()
+        fetch_time = time.perf_counter() - start
+
+        cached = profile_ready()
+        if cached is not None:
+            return cached, True
+    except Exception as e:
+        if profile.done() and profile.exception() is not None:
+            print(f"Erro ao acessar histórico do Brave: {profile.exception()}")
+        else:
+            print(f"Erro na busca de artigos: {e}")
+        return None
+    finally:
+        executor.shutdown(wait=False)
+
+    papers = PaperBatch.concat(pages) if pages else PaperBatch()
+    papers.store = store
+    seen_papers = PaperBatch.concat(already_seen) if already_seen else PaperBatch()
+    seen_papers.store = store
+    if n_duplicates:
+        print(f"Removidas {n_duplicates} duplicatas.")
+    if n_seen:
+        print(f"{n_seen} artigos já apresentados " +
+              ("foram descartados." if seen_mode == 'drop' else "vão para o fim da lista, sem pontuação."))
+    if not len(papers) and not len(seen_papers):
+        print("Nenhum artigo novo encontrado. Tente outra consulta.")
+        return None
+
+    print("\nClassificando artigos com base em seus interesses...")
+    try:
+        if cascade is not None and len(papers):
+            scores = cascade.score(query, papers)
+            print("Cascata: " + ", ".join(f"{name} {elapsed * 1000:.0f} ms"
+                                          for name, elapsed in cascade.timings.items()))
+        else:
+            scores.extend(classifier.score_papers(p) for p in pending if len(p))
+            scores = np.concatenate(scores) if scores else np.zeros(0)
+    except Exception as e:
+        print(f"Erro ao classificar artigos: {e}")
+        print("Não foi possível classificar os artigos.")
+        return None
+
+    parts = [rank_papers(classifier, papers, scores, mmr_lambda)] if len(papers) else []
+    if len(seen_papers):
+        # Já vistos no fim, sem score e sem carregar os resumos de volta
+        seen_papers.offload_abstracts()
+        parts.append(RankedPapers(seen_papers, np.zeros(len(seen_papers))))
+    ranked = parts[0] if len(parts) == 1 else RankedPapers.concat(parts)
+    print(f"Busca {fetch_time:.1f}s, total {time.perf_counter() - start:.1f}s")
+    return ranked, False
+
+
+def benchmark(page_delay=0.5, n_pages=4, history_rows=60000, tmpdir=None):
+    # Execução sequencial (perfil, depois busca, depois pontuação) x pipeline concorrente,
+    # com um histórico sintético e uma fonte local que simula a latência de rede por página
+    import os
+    import random
+    import sqlite3
+    import tempfile
+    from datetime import datetime
+    from corpus import CorpusStore
+    from main import BraveHistoryClassifier
+    from sources import PaperSource, make_paper
+
+    tmpdir = tmpdir or tempfile.mkdtemp()
+    os.chdir(tmpdir)
+    rng = random.Random(0)
+    words = [f'term{i}' for i in range(20000)]
+    history_path = os.path.join(tmpdir, 'History')
+    conn = sqlite3.connect(history_path)
+    conn.execute('CREATE TABLE urls (url TEXT, title TEXT, visit_count INTEGER, last_visit_time INTEGER)')
+    now = int(datetime.now().timestamp() * 1000000)
+    conn.executemany('INSERT INTO urls VALUES (?, ?, ?, ?)', (
+        (f'https://site{rng.randrange(300)}.org/{i}', ' '.join(rng.choices(words, k=8)), rng.randrange(1, 20), now)
+        for i in range(history_rows)))
+    conn.commit()
+    conn.close()
+
+    class SlowSource(PaperSource):
+        name = 'simulada'
+        default_base_url = 'local'
+
+        def search_pages(self, query, max_results=100, columnar=False):
+            for page in range(n_pages):
+                time.sleep(page_delay)
+                yield PaperBatch().extend(
+                    make_paper(' '.join(rng.choices(words, k=10)), ' '.join(rng.choices(words, k=150)), [],
+                               f'http://arxiv.org/abs/2101.{page * 100 + i:05d}', '', self.name)
+                    for i in range(100))
+
+    def classifier():
+        instance = BraveHistoryClassifier()
+        instance.brave_history_path = history_path
+        return instance
+
+    source = SlowSource(timeout=30)
+    start = time.perf_counter()
+    sequential = classifier()
+    sequential.analyze_history_streaming(days_back=1)
+    profile_time = time.perf_counter() - start
+    start = time.perf_counter()
+    papers = PaperBatch.concat(page for _, page in iter_source_results('q', [source], columnar=True))
+    fetch_time = time.perf_counter() - start
+    sequential.score_papers(papers)
+    sequential_time = profile_time + (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    run_pipeline(classifier(), 'q', [source], days_back=1,
+                 store=CorpusStore(os.path.join(tmpdir, 'corpus.sqlite')))
+    pipeline_time = time.perf_counter() - start
+    print(f"\nPerfil {profile_time:.2f}s, busca {fetch_time:.2f}s; "
+          f"sequencial {sequential_time:.2f}s, pipeline {pipeline_time:.2f}s")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,210 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from corpus import CorpusStore
+from paper_batch import PaperBatch
+from result_cache import normalize_query
+from sources import ArxivSource, CorpusSource
+from vector_cache import VectorCache
+
+# Partes de domínio que não dizem nada sobre o assunto
+GENERIC_LABELS = {'www', 'm', 'en', 'com', 'org', 'net', 'edu', 'gov', 'io', 'co', 'br', 'ac', 'uk',
+                  'arxiv', 'localhost'}
+
+
+def domain_label(domain):
+    # 'www.pytorch.org' -> 'pytorch'; 'scholar.google.com' -> 'google'
+    labels = [label for label in domain.lower().split(':')[0].split('.')
+              if label and label not in GENERIC_LABELS and not label.isdigit()]
+    return labels[-1] if labels else None
+
+
+def interest_topics(classifier, n_terms=10, n_domains=5):
+    # Termos de maior peso em user_interests e rótulos dos domínios mais visitados,
+    # todos do mesmo snapshot do perfil
+    snapshot = classifier.snapshot
+    terms = snapshot.tfidf.get_feature_names_out()
+    interests = snapshot.user_interests
+    top = np.argsort(-interests, kind='stable')[:n_terms]
+    topics = [terms[i] for i in top if interests[i] > 0]
+    for domain, _ in snapshot.visit_frequency.most_common(n_domains):
+        label = domain_label(domain)
+        if label:
+            topics.append(label)
+    return list(dict.fromkeys(topics))
+
+
+class PrefetchScheduler:
+    # Busca periodicamente, em segundo plano, as submissões recentes do arXiv para os
+    # tópicos do usuário, respeitando um orçamento de requisições por rodada; os artigos
+    # vão para o corpus local já tokenizados, e o instante de cada busca fica registrado no
+    # corpus, para que consultas por tópicos frescos sejam servidas sem rede. `clock`: relógio
+    # de parede (segundos desde a época), comparável entre processos
+    def __init__(self, classifier, store, source=None, budget=10, interval=3600.0, max_results=50,
+                 n_terms=10, n_domains=5, refresh_profile=None, clock=time.time):
+        self.classifier = classifier
+        self.store = store
+        self.source = source or ArxivSource(sort_by='submittedDate')
+        self.budget = budget
+        self.interval = interval
+        self.max_results = max_results
+        self.n_terms = n_terms
+        self.n_domains = n_domains
+        self.refresh_profile = refresh_profile
+        self.clock = clock
+        self.last_fetched = store.prefetch_times()  # tópico -> instante da última busca
+        # Contagens de termos dos artigos buscados, que valem para qualquer perfil
+        self.vector_cache = VectorCache(store)
+        self.requests_made = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def due_topics(self):
+        # Tópicos sem busca dentro do intervalo: nunca buscados primeiro, depois os mais antigos
+        now = self.clock()
+        topics = [normalize_query(topic) for topic in interest_topics(self.classifier, self.n_terms, self.n_domains)]
+        topics = [topic for topic in dict.fromkeys(topics)
+                  if now - self.last_fetched.get(topic, -np.inf) >= self.interval]
+        topics.sort(key=lambda topic: self.last_fetched.get(topic, -np.inf))
+        return topics[:self.budget]
+
+    def run_once(self):
+        # Uma rodada; devolve o número de artigos guardados
+        if self.refresh_profile is not None:
+            self.refresh_profile()
+        stored = 0
+        vectorizer = self.classifier.new_vectorizer()
+        for topic in self.due_topics():
+            self.requests_made += 1
+            try:
+                batch = self.source.search(topic, self.max_results, PaperBatch(store=self.store))
+            except Exception as e:
+                print(f"Erro na pré-busca de '{topic}': {e}")
+                continue
+            self.last_fetched[topic] = self.clock()
+            self.store.mark_prefetched(topic, self.last_fetched[topic], self.interval)
+            if not len(batch):
+                continue
+            self.vector_cache.add(vectorizer, batch.links, batch.texts())
+            batch.offload_abstracts()
+            stored += len(batch)
+        return stored
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Erro na pré-busca: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def benchmark(delay=0.5, tmpdir=None):
+    # Rodadas com relógio falso contra um feed local, e consulta fria (rede) x quente (corpus)
+    import os
+    import random
+    import sqlite3
+    import tempfile
+    from datetime import datetime
+    from main import BraveHistoryClassifier
+    from Testes.stubs import StubArxivHandler, start_server
+
+    tmpdir = tmpdir or tempfile.mkdtemp()
+    os.chdir(tmpdir)
+    rng = random.Random(0)
+    topics = ['graph neural networks', 'quantum error correction', 'protein folding', 'reinforcement learning']
+    history_path = os.path.join(tmpdir, 'History')
+    conn = sqlite3.connect(history_path)
+    conn.execute('CREATE TABLE urls (url TEXT, title TEXT, visit_count INTEGER, last_visit_time INTEGER)')
+    now = int(datetime.now().timestamp() * 1000000)
+    conn.executemany('INSERT INTO urls VALUES (?, ?, ?, ?)', (
+        (f'https://{rng.choice(["pytorch.org", "www.nature.com", "github.com"])}/{i}',
+         rng.choice(topics), rng.randrange(1, 20), now)
+        for i in range(2000)))
+    conn.commit()
+    conn.close()
+
+    # API do arXiv simulada dos testes, com `delay` de latência por requisição
+    StubArxivHandler.delay = delay
+    server, base_url = start_server(StubArxivHandler, '/api/query')
+
+    classifier = BraveHistoryClassifier()
+    classifier.brave_history_path = history_path
+    classifier.analyze_history_streaming(days_back=1)
+    store = CorpusStore(os.path.join(tmpdir, 'corpus.sqlite'))
+    clock = FakeClock()
+    scheduler = PrefetchScheduler(classifier, store, ArxivSource(base_url=base_url, min_interval=0.0),
+                                  budget=5, interval=3600, max_results=20, clock=clock)
+
+    for advance in (0, 600, 3000):
+        clock.advance(advance)
+        before = StubArxivHandler.requests
+        stored = scheduler.run_once()
+        print(f"t={clock.now:>5.0f}s: {StubArxivHandler.requests - before} requisições, "
+              f"{stored} artigos guardados, tópicos buscados: {sorted(scheduler.last_fetched)}")
+
+    query = interest_topics(classifier)[0]
+    classifier.vector_cache = VectorCache(store)
+    for name, source in (('fria (rede)', ArxivSource(base_url=base_url, min_interval=0.0)),
+                         ('quente (corpus)', CorpusSource(store))):
+        start = time.perf_counter()
+        papers = source.search(query, 20, PaperBatch(store=store))
+        classifier.score_papers(papers)
+        print(f"Consulta {name} '{query}': {len(papers)} artigos em {(time.perf_counter() - start) * 1000:.0f} ms")
+    server.shutdown()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pré-busca periódica de submissões recentes do arXiv")
+    parser.add_argument('--budget', type=int, default=10, help="requisições por rodada (padrão: 10)")
+    parser.add_argument('--interval', type=float, default=3600, help="segundos entre rodadas (padrão: 3600)")
+    parser.add_argument('--days', type=int, default=30, help="janela do histórico em dias (padrão: 30)")
+    parser.add_argument('--once', action='store_true', help="executa uma única rodada")
+    parser.add_argument('--benchmark', action='store_true', help="roda contra um feed local simulado")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.benchmark:
+        benchmark()
+        return
+    from main import BraveHistoryClassifier
+
+    classifier = BraveHistoryClassifier()
+    store = CorpusStore()
+    scheduler = PrefetchScheduler(classifier, store, budget=args.budget, interval=args.interval,
+                                  refresh_profile=lambda: classifier.analyze_history_streaming(days_back=args.days))
+    if args.once:
+        print(f"{scheduler.run_once()} artigos guardados no corpus.")
+        return
+    scheduler.run()
+
+
+if __name__ == '__main__':
+    main()
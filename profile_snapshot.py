@@ -0,0 +1,130 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+
+def vectorizer_fingerprint(tfidf):
+    # Hash do vocabulário e do IDF: identifica os vetores TF-IDF produzidos pelo vetorizador
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sorted(tfidf.vocabulary_.items())).encode())
+    digest.update(np.ascontiguousarray(tfidf.idf_, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def _read_only(array):
+    array = np.array(array, dtype=np.float64)
+    array.setflags(write=False)
+    return array
+
+
+class ProfileSnapshot:
+    # Perfil ajustado e imutável: vetorizador, vetor de interesses, pesos dos domínios, LSA e
+    # afinidades (AffinityIndex) opcionais, sempre consistentes entre si. Uma reconstrução monta outro snapshot à parte e o
+    # publica trocando a referência (atribuição atômica), então quem pontua lê sem travas.
+    # O vetorizador e o Counter de domínios não devem ser alterados depois de publicados
+    __slots__ = ('tfidf', 'user_interests', 'interest_direction', 'visit_frequency', 'top_domains',
+                 'lsa', 'interest_weight', 'domain_weight', 'affinity', 'affinity_weight',
+                 'vectorizer_version', 'profile_version')
+
+    def __init__(self, tfidf, user_interests, visit_frequency, lsa=None, interest_weight=0.7,
+                 domain_weight=0.3, n_domains=10, affinity=None, affinity_weight=0.2):
+        user_interests = _read_only(user_interests)
+        norm = np.linalg.norm(user_interests)
+        visit_frequency = Counter(visit_frequency)
+        total_visits = sum(visit_frequency.values())
+        # Domínios mais visitados com o peso de cada um, prontos para o score
+        top_domains = tuple((domain.lower(), freq / total_visits)
+                            for domain, freq in visit_frequency.most_common(n_domains))
+        version = vectorizer_fingerprint(tfidf)
+
+        digest = hashlib.sha256()
+        digest.update(version.encode())
+        digest.update(np.ascontiguousarray(user_interests).tobytes())
+        digest.update(json.dumps(visit_frequency.most_common(n_domains)).encode())
+        digest.update(f'{lsa.n_components if lsa else None},{interest_weight},{domain_weight}'.encode())
+        digest.update(f'{affinity.version if affinity else None},{affinity_weight}'.encode())
+
+        for name, value in (('tfidf', tfidf), ('user_interests', user_interests),
+                            ('interest_direction', _read_only(user_interests / norm if norm else user_interests)),
+                            ('visit_frequency', visit_frequency), ('top_domains', top_domains), ('lsa', lsa),
+                            ('interest_weight', interest_weight), ('domain_weight', domain_weight),
+                            ('affinity', affinity or None), ('affinity_weight', affinity_weight),
+                            ('vectorizer_version', version), ('profile_version', digest.hexdigest())):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ProfileSnapshot é imutável; construa outro e publique-o")
+
+    def domain_relevance(self, texts):
+        # Soma dos pesos dos domínios mencionados em cada texto
+        relevance = np.zeros(len(texts))
+        for i, text in enumerate(texts):
+            text = text.lower()
+            relevance[i] = sum(weight for domain, weight in self.top_domains if domain in text)
+        return relevance
+
+
+def benchmark(n_readers=4, duration=5.0, n_papers=200, tmpdir=None):
+    # Leitores pontuando o mesmo lote sem parar enquanto o perfil é reconstruído em segundo plano,
+    # alternando entre dois históricos com vocabulários diferentes; cada resultado precisa
+    # coincidir com o score de um dos dois perfis, nunca com uma mistura deles
+    import os
+    import tempfile
+    from evaluation import make_corpus, make_user_history, make_vocabulary
+    from main import BraveHistoryClassifier
+
+    tmpdir = tmpdir or tempfile.mkdtemp()
+    os.chdir(tmpdir)  # a análise do histórico cria uma cópia temporária no diretório atual
+    rng = np.random.default_rng(0)
+    topic_words, shared = make_vocabulary()
+    papers, _ = make_corpus(rng, topic_words, shared, n_papers)
+    histories = []
+    for name in ('History_a', 'History_b'):
+        path = os.path.join(tmpdir, name)
+        if os.path.exists(path):
+            os.remove(path)
+        make_user_history(rng, path, topic_words, shared, n_visits=5000)
+        histories.append(path)
+
+    classifier = BraveHistoryClassifier()
+    expected = []
+    for path in histories:
+        classifier.brave_history_path = path
+        classifier.analyze_history_streaming(days_back=1)
+        expected.append(classifier.score_papers(papers))
+
+    def read(stop, latencies, results):
+        while not stop.is_set():
+            start = time.perf_counter()
+            scores = classifier.score_papers(papers)
+            latencies.append(time.perf_counter() - start)
+            results.append(any(np.allclose(scores, reference) for reference in expected))
+
+    def rebuild(stop, counter):
+        while not stop.is_set():
+            classifier.brave_history_path = histories[counter[0] % 2]
+            classifier.analyze_history_streaming(days_back=1)
+            counter[0] += 1
+
+    for name, writer in (('sem reconstrução', False), ('com reconstrução contínua', True)):
+        stop, latencies, results, rebuilds = threading.Event(), [], [], [0]
+        threads = [threading.Thread(target=read, args=(stop, latencies, results)) for _ in range(n_readers)]
+        if writer:
+            threads.append(threading.Thread(target=rebuild, args=(stop, rebuilds)))
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+        print(f"{name}: {len(results)} pontuações ({n_readers} leitores), {rebuilds[0]} reconstruções, "
+              f"p50 {p50:.1f} ms, p99 {p99:.1f} ms, inconsistentes: {results.count(False)}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,87 @@
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+
+
+def normalize_query(query):
+    # Consultas que diferem só em caixa ou espaços usam a mesma entrada
+    return ' '.join(query.lower().split())
+
+
+class RankedResultCache:
+    # Cache em disco (SQLite) da lista final ordenada, indexada pela consulta normalizada
+    # e pela impressão digital do perfil; descarta as entradas menos usadas acima de `max_bytes`.
+    # Guarda RankedPapers sem os resumos (ficam no corpus); `format_version` separa as entradas
+    # de formatos anteriores
+    format_version = 2
+
+    def __init__(self, path='result_cache.sqlite', max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def make_key(cls, query, fingerprint, options=''):
+        # `options`: configurações que mudam a ordenação (ex.: diversificação)
+        return hashlib.sha256(f'{cls.format_version}\x00{fingerprint}\x00{options}\x00'
+                              f'{normalize_query(query)}'.encode()).hexdigest()
+
+    def get(self, query, fingerprint, options=''):
+        key = self.make_key(query, fingerprint, options)
+        with self._lock, self._conn:
+            row = self._conn.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE results SET last_access = ? WHERE key = ?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def put(self, query, fingerprint, ranked, options=''):
+        value = pickle.dumps(ranked, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(value) > self.max_bytes:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                (self.make_key(query, fingerprint, options), fingerprint, value, len(value), time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        # Remove as entradas acessadas há mais tempo até caber no limite
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+                'SELECT key, size FROM results ORDER BY last_access').fetchall():
+            self._conn.execute('DELETE FROM results WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def invalidate_except(self, fingerprint):
+        # Descarta os resultados calculados com perfis anteriores
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM results WHERE fingerprint != ?', (fingerprint,))
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,166 @@
+import math
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from corpus import MAX_SQL_PARAMS, paper_id
+from paper_batch import RankedPapers
+
+
+class BloomFilter:
+    # Filtro de Bloom em um array de bits numpy; `capacity` e `error_rate` definem
+    # o tamanho (m bits) e o número de funções de hash (k), com hashing duplo
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.n_bits = max(int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.n_hashes = max(int(round(self.n_bits / self.capacity * math.log(2))), 1)
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, keys):
+        # hash() de 64 bits (SipHash) basta: o filtro só vive em memória e é recriado a partir
+        # do SQLite a cada execução. O segundo hash sai de uma mistura (splitmix64) do primeiro
+        first = np.fromiter((hash(key) for key in keys), dtype=np.int64, count=len(keys)).view(np.uint64)
+        second = first * np.uint64(0x9E3779B97F4A7C15)
+        second ^= second >> np.uint64(31)
+        second *= np.uint64(0xBF58476D1CE4E5B9)
+        second ^= second >> np.uint64(29)
+        steps = np.arange(self.n_hashes, dtype=np.uint64)
+        return (first[:, None] + steps * (second[:, None] | np.uint64(1))) % np.uint64(self.n_bits)
+
+    def add_many(self, keys):
+        if not keys:
+            return
+        positions = self._positions(keys).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+        self.count += len(keys)
+
+    def contains_many(self, keys):
+        if not keys:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(keys)
+        hits = self.bits[positions >> np.uint64(3)] & (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+        return hits.all(axis=1)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+
+class SeenStore:
+    # Conjunto persistente de artigos já apresentados (ids normalizados do arXiv): o
+    # filtro de Bloom em memória descarta rápido os artigos novos e o SQLite confirma
+    # os positivos, então não há falsos positivos no resultado final
+    def __init__(self, path='seen.sqlite', capacity=100000, error_rate=0.01):
+        self.path = path
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (
+                id TEXT PRIMARY KEY,
+                first_seen REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+        count = self._conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+        self._load_bloom(max(capacity, 2 * count))
+
+    def _load_bloom(self, capacity):
+        self.bloom = BloomFilter(capacity, self.error_rate)
+        cursor = self._conn.execute('SELECT id FROM seen')
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            self.bloom.add_many([key for key, in rows])
+
+    def seen_mask(self, links):
+        # Array booleano: True para os artigos já apresentados
+        return self.seen_mask_ids([paper_id(link) if link else '' for link in links])
+
+    def seen_mask_ids(self, keys):
+        mask = np.zeros(len(keys), dtype=bool)
+        candidates = [i for i in np.flatnonzero(self.bloom.contains_many(keys)) if keys[i]]
+        if not candidates:
+            return mask
+        # Só os positivos do filtro de Bloom vão ao SQLite
+        wanted = {}
+        for i in candidates:
+            wanted.setdefault(keys[i], []).append(i)
+        unique = list(wanted)
+        with self._lock:
+            for start in range(0, len(unique), MAX_SQL_PARAMS):
+                chunk = unique[start:start + MAX_SQL_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                for key, in self._conn.execute(f'SELECT id FROM seen WHERE id IN ({placeholders})', chunk):
+                    mask[wanted[key]] = True
+        return mask
+
+    def mark_seen(self, links):
+        keys = list(dict.fromkeys(paper_id(link) for link in links if link))
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR IGNORE INTO seen VALUES (?, ?)', ((key, now) for key in keys))
+        self.bloom.add_many(keys)
+        # Acima da capacidade a taxa de falsos positivos sobe: recria o filtro com o dobro
+        if self.bloom.count > self.bloom.capacity:
+            with self._lock:
+                self._load_bloom(2 * self.bloom.capacity)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def apply_seen(ranked, seen, mode='downrank'):
+    # Aplica o filtro a uma lista ordenada (ex.: vinda do cache de resultados): RankedPapers,
+    # reordenado sem montar registros, ou lista de registros
+    if isinstance(ranked, RankedPapers):
+        mask = seen.seen_mask(ranked.links)
+        positions = np.flatnonzero(~mask)
+        if mode != 'drop':
+            positions = np.concatenate([positions, np.flatnonzero(mask)])
+        return ranked.take(positions)
+    mask = seen.seen_mask([paper['link'] for paper in ranked])
+    fresh = [paper for paper, was_seen in zip(ranked, mask) if not was_seen]
+    if mode == 'drop':
+        return fresh
+    return fresh + [paper for paper, was_seen in zip(ranked, mask) if was_seen]
+
+
+def benchmark(n_seen=200000, n_queries=100000, error_rate=0.01, path=':memory:'):
+    # Taxa de falsos positivos e memória do filtro, e custo da verificação de artigos novos
+    # com o filtro de Bloom na frente do SQLite x só o SQLite
+    store = SeenStore(path, capacity=n_seen, error_rate=error_rate)
+    store.mark_seen([f'http://arxiv.org/abs/{2101 + i // 100000}.{i % 100000:05d}' for i in range(n_seen)])
+    keys = [paper_id(f'http://arxiv.org/abs/2301.{i:05d}') for i in range(n_queries)]
+
+    false_positives = store.bloom.contains_many(keys).mean()
+    start = time.perf_counter()
+    mask = store.seen_mask_ids(keys)
+    filtered_time = time.perf_counter() - start
+    start = time.perf_counter()
+    exact = 0
+    with store._lock:
+        for begin in range(0, len(keys), MAX_SQL_PARAMS):
+            chunk = keys[begin:begin + MAX_SQL_PARAMS]
+            exact += store._conn.execute(
+                f'SELECT COUNT(*) FROM seen WHERE id IN ({",".join("?" * len(chunk))})', chunk).fetchone()[0]
+    exact_time = time.perf_counter() - start
+    print(f"Filtro de Bloom: {store.bloom.nbytes / 1024:.0f} KiB, k={store.bloom.n_hashes}, "
+          f"falsos positivos {false_positives:.4f} (alvo {error_rate})")
+    print(f"{n_queries} artigos novos: Bloom + SQLite {filtered_time * 1000:.0f} ms, "
+          f"só SQLite {exact_time * 1000:.0f} ms; marcados por engano: {int(mask.sum()) + exact}")
+
+
+if __name__ == '__main__':
+    benchmark()
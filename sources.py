@@ -0,0 +1,338 @@
+import os
+import queue
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from paper_batch import PaperBatch, paper_links, take_papers
+from transport import get_transport
+
+# Namespaces do feed Atom do arXiv
+ARXIV_NAMESPACES = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'arxiv': 'http://arxiv.org/schemas/atom',
+}
+
+
+def make_paper(title, abstract, authors, link, published, source, categories=()):
+    # Esquema único de artigo usado por todas as fontes
+    return {
+        'title': ' '.join((title or '').split()),
+        'abstract': ' '.join((abstract or '').split()),
+        'authors': list(authors or []),
+        'link': link or '',
+        'published': published or '',
+        'source': source,
+        'categories': list(categories),
+    }
+
+
+def _collect(papers, batch):
+    # Devolve os artigos como lista de dicionários ou acrescentados ao lote colunar
+    return papers if batch is None else batch.extend(papers)
+
+
+def parse_arxiv_feed(response_text, source='arxiv', batch=None):
+    # Converte a resposta Atom da API do arXiv em artigos; com `batch`, os campos
+    # vão direto para o lote colunar, sem passar por dicionários
+    root = ET.fromstring(response_text)
+    papers = []
+    for entry in root.findall('atom:entry', ARXIV_NAMESPACES):
+        try:
+            fields = (
+                ' '.join(entry.find('atom:title', ARXIV_NAMESPACES).text.split()),
+                ' '.join(entry.find('atom:summary', ARXIV_NAMESPACES).text.split()),
+                [author.find('atom:name', ARXIV_NAMESPACES).text
+                 for author in entry.findall('atom:author', ARXIV_NAMESPACES)],
+                entry.find('atom:id', ARXIV_NAMESPACES).text,
+                entry.find('atom:published', ARXIV_NAMESPACES).text,
+                source,
+                [category.get('term') for category in entry.findall('atom:category', ARXIV_NAMESPACES)],
+            )
+        except AttributeError as e:
+            print(f"Erro ao processar um artigo: {e}")
+            continue
+        if batch is None:
+            papers.append(make_paper(*fields))
+        else:
+            batch.append(*fields)
+    return papers if batch is None else batch
+
+
+class RateLimiter:
+    # Garante um intervalo mínimo entre requisições consecutivas de uma fonte
+    def __init__(self, min_interval, clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = min_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._next_slot = None
+
+    def wait(self):
+        with self._lock:
+            now = self.clock()
+            slot = now if self._next_slot is None else max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+class PaperSource:
+    # Fonte de artigos: subclasses implementam `fetch` e devolvem registros no esquema comum
+    name = None
+    default_base_url = None
+    default_min_interval = 0.0
+    # Fontes que aplicam todos os filtros (PaperFilter) na própria consulta
+    pushes_filters = False
+    # Fontes cujos resultados trazem as categorias do arXiv (sem elas, o filtro de categorias
+    # descartaria tudo)
+    has_categories = False
+
+    def __init__(self, base_url=None, timeout=10.0, min_interval=None, transport=None, filters=None):
+        self.base_url = base_url or self.default_base_url
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(self.default_min_interval if min_interval is None else min_interval)
+        self.transport = transport or get_transport()
+        self.filters = filters
+
+    def search(self, query, max_results=100, batch=None):
+        # `timeout` vale para a página inteira, novas tentativas incluídas: é o prazo com que
+        # iter_source_results abandona a fonte
+        deadline = time.monotonic() + self.timeout
+        self.rate_limiter.wait()
+        papers = self.fetch(query, max_results, batch, deadline=deadline)
+        if self.filters and not self.pushes_filters:
+            # Os excluídos saem aqui, antes de qualquer vetorização ou pontuação
+            papers = take_papers(papers, [i for i, keep in enumerate(self.filters.mask(papers)) if keep])
+        return papers
+
+    def search_pages(self, query, max_results=100, columnar=False):
+        # Resultados página a página; fontes sem paginação entregam uma página só
+        yield self.search(query, max_results, PaperBatch() if columnar else None)
+
+    def fetch(self, query, max_results, batch=None, deadline=None):
+        # `deadline`: instante (time.monotonic) depois do qual a transferência não insiste mais
+        raise NotImplementedError
+
+
+class ArxivSource(PaperSource):
+    name = 'arxiv'
+    default_base_url = 'http://export.arxiv.org/api/query'
+    # O arXiv pede no máximo uma requisição a cada 3 segundos
+    default_min_interval = 3.0
+    # Resultados por requisição quando a busca é paginada
+    page_size = 100
+    pushes_filters = True
+    has_categories = True
+
+    def __init__(self, sort_by='relevance', **kwargs):
+        # sort_by: 'relevance', 'submittedDate' (mais recentes) ou 'lastUpdatedDate'
+        super().__init__(**kwargs)
+        self.sort_by = sort_by
+
+    def search_pages(self, query, max_results=100, columnar=False):
+        for start in range(0, max_results, self.page_size):
+            deadline = time.monotonic() + self.timeout
+            self.rate_limiter.wait()
+            size = min(self.page_size, max_results - start)
+            page = self.fetch(query, size, PaperBatch() if columnar else None, start=start, deadline=deadline)
+            yield page
+            if len(page) < size:
+                break
+
+    def fetch(self, query, max_results, batch=None, start=0, deadline=None):
+        params = {
+            'search_query': self.filters.arxiv_query(query) if self.filters else f'all:{query}',
+            'start': start,
+            'max_results': max_results,
+            'sortBy': self.sort_by,
+            'sortOrder': 'descending',
+        }
+        response = self.transport.get(self.base_url, params=params, timeout=self.timeout, deadline=deadline)
+        response.raise_for_status()
+        return parse_arxiv_feed(response.content, self.name, batch)
+
+
+class SempaiSource(PaperSource):
+    name = 'sempai'
+    default_base_url = 'https://api.sempai.com/v1/papers'
+
+    def __init__(self, api_key, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+
+    def fetch(self, query, max_results, batch=None, deadline=None):
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json',
+        }
+        params = {'query': query, 'max_results': max_results}
+        response = self.transport.get(self.base_url, headers=headers, params=params, timeout=self.timeout,
+                                      deadline=deadline)
+        response.raise_for_status()
+
+        papers = []
+        for item in response.json().get('papers', []):
+            authors = [author.get('name', '') if isinstance(author, dict) else author
+                       for author in item.get('authors', [])]
+            papers.append(make_paper(
+                item.get('title'),
+                item.get('abstract'),
+                authors,
+                item.get('link') or item.get('url'),
+                item.get('published') or str(item.get('year') or ''),
+                self.name,
+            ))
+        return _collect(papers, batch)
+
+
+class SerpApiSource(PaperSource):
+    name = 'serpapi'
+    default_base_url = 'https://serpapi.com/search.json'
+
+    def __init__(self, api_key, engine='google_scholar', **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.engine = engine
+
+    def fetch(self, query, max_results, batch=None, deadline=None):
+        # Mesma chamada do cliente GoogleSearch, feita direto no endpoint HTTP
+        params = {
+            'q': query,
+            'engine': self.engine,
+            'num': min(max_results, 20),
+            'api_key': self.api_key,
+        }
+        # Intervalo de anos aplicado pelo Google Scholar; o dia exato é conferido depois, em `search`
+        if self.filters and self.filters.date_from:
+            params['as_ylo'] = self.filters.date_from[:4]
+        if self.filters and self.filters.date_to:
+            params['as_yhi'] = self.filters.date_to[:4]
+        response = self.transport.get(self.base_url, params=params, timeout=self.timeout, deadline=deadline)
+        response.raise_for_status()
+
+        papers = []
+        for item in response.json().get('organic_results', [])[:max_results]:
+            publication = item.get('publication_info', {})
+            authors = [author.get('name', '') for author in publication.get('authors', [])]
+            papers.append(make_paper(
+                item.get('title'),
+                item.get('snippet'),
+                authors,
+                item.get('link'),
+                publication.get('summary', ''),
+                self.name,
+            ))
+        return _collect(papers, batch)
+
+
+class CorpusSource(PaperSource):
+    # Artigos já guardados no corpus local (ex.: pela pré-busca); responde sem acessar a rede
+    name = 'corpus'
+    default_base_url = 'local'
+    pushes_filters = True
+    has_categories = True
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def fetch(self, query, max_results, batch=None, deadline=None):
+        records = self.store.search(query, max_results, self.filters)
+        if batch is not None:
+            for link, title, abstract, authors, published, source, categories in records:
+                batch.append(title, abstract, authors, link, published, source, categories)
+            return batch
+        return [make_paper(title, abstract, authors, link,
+                           datetime.fromtimestamp(published, timezone.utc).isoformat() if published else '',
+                           source, categories)
+                for link, title, abstract, authors, published, source, categories in records]
+
+
+def default_sources(filters=None):
+    # arXiv sempre; Sempai e SerpAPI apenas quando suas chaves estão configuradas. Com filtro
+    # de categorias, ficam de fora as fontes que não informam categorias
+    sources = [ArxivSource(filters=filters)]
+    if os.getenv('SEMPAI_API_KEY'):
+        sources.append(SempaiSource(os.getenv('SEMPAI_API_KEY'), filters=filters))
+    if os.getenv('SERPAPI_API_KEY'):
+        sources.append(SerpApiSource(os.getenv('SERPAPI_API_KEY'), filters=filters))
+    if filters and filters.categories:
+        skipped = [source.name for source in sources if not source.has_categories]
+        if skipped:
+            print(f"Filtro de categorias: fontes sem categorias ignoradas ({', '.join(skipped)})")
+        sources = [source for source in sources if source.has_categories]
+    return sources
+
+
+def iter_source_results(query, sources, max_results=100, columnar=False):
+    # Consulta todas as fontes em paralelo e devolve (fonte, artigos) página a página, conforme
+    # chegam; fontes que passam do próprio timeout sem entregar uma página são abandonadas
+    pages = queue.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def run(source):
+        try:
+            for page in source.search_pages(query, max_results, columnar):
+                if stop.is_set():
+                    return
+                pages.put((source, page))
+        except Exception as e:
+            pages.put((source, e))
+        finally:
+            pages.put((source, done))
+
+    executor = ThreadPoolExecutor(max_workers=len(sources))
+    deadlines = {}
+    for source in sources:
+        deadlines[source] = time.monotonic() + source.timeout
+        executor.submit(run, source)
+    try:
+        while deadlines:
+            now = time.monotonic()
+            for source, deadline in list(deadlines.items()):
+                if now >= deadline:
+                    print(f"Tempo esgotado para a fonte '{source.name}'")
+                    del deadlines[source]
+            if not deadlines:
+                break
+
+            try:
+                source, item = pages.get(timeout=max(min(deadlines.values()) - now, 0))
+            except queue.Empty:
+                continue
+            if source not in deadlines:
+                continue
+            if item is done:
+                del deadlines[source]
+            elif isinstance(item, Exception):
+                print(f"Erro ao buscar artigos em '{source.name}': {item}")
+            else:
+                deadlines[source] = time.monotonic() + source.timeout
+                yield source.name, item
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_all_papers(query, sources=None, max_results=100, columnar=False, store=None):
+    # Junta os resultados de todas as fontes à medida que chegam, sem repetir links;
+    # com `columnar`, devolve um PaperBatch em vez de uma lista de dicionários
+    sources = default_sources() if sources is None else sources
+    parts = []
+    seen_links = set()
+    for name, results in iter_source_results(query, sources, max_results, columnar):
+        links = paper_links(results)
+        new = [i for i, link in enumerate(links) if not link or link not in seen_links]
+        seen_links.update(links[i] for i in new if links[i])
+        parts.append(take_papers(results, new))
+        print(f"Encontrados {len(links)} artigos sobre '{query}' em '{name}'")
+
+    if not columnar:
+        return [paper for part in parts for paper in part]
+    merged = PaperBatch.concat(parts) if parts else PaperBatch()
+    merged.store = store
+    return merged
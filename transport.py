@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+import urllib.request
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Respostas que indicam sobrecarga temporária e valem nova tentativa
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    # Retry-After em segundos ou como data HTTP; None se ausente ou inválido
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def cap_timeout(timeout, remaining):
+    # Timeout (número ou par conexão/leitura) limitado ao tempo que resta até o prazo
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(remaining if value is None else min(value, remaining) for value in timeout)
+    return min(timeout, remaining)
+
+
+class HttpTransport:
+    # Transporte HTTP compartilhado: pool de conexões keep-alive por host, gzip,
+    # timeouts e novas tentativas com backoff exponencial e jitter. Com `deadline` (instante de
+    # `clock`), as tentativas param quando a próxima espera passaria do prazo: a última resposta
+    # (ou erro) é devolvida, e nenhuma requisição dura além dele
+    def __init__(self, pool_connections=16, pool_maxsize=4, pool_block=True, timeout=(3.05, 30),
+                 max_retries=4, backoff_base=0.5, backoff_max=30.0, retry_after_max=120.0,
+                 sleep=time.sleep, rng=random.random, clock=time.monotonic):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.sleep = sleep
+        self.rng = rng
+        self.clock = clock
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              pool_block=pool_block, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': 'PaperRecommender/1.0',
+        })
+
+    def backoff_delay(self, attempt):
+        # "Full jitter": espera aleatória entre 0 e base * 2^tentativa
+        return self.rng() * min(self.backoff_max, self.backoff_base * 2 ** attempt)
+
+    def _past_deadline(self, deadline, delay=0.0):
+        return deadline is not None and self.clock() + delay >= deadline
+
+    def request(self, method, url, deadline=None, **kwargs):
+        timeout = kwargs.pop('timeout', self.timeout)
+        for attempt in range(self.max_retries + 1):
+            if self._past_deadline(deadline):
+                raise requests.exceptions.Timeout(f"Prazo esgotado antes da requisição a {url}")
+            if deadline is not None:
+                kwargs['timeout'] = cap_timeout(timeout, deadline - self.clock())
+            else:
+                kwargs['timeout'] = timeout
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                delay = self.backoff_delay(attempt)
+                if attempt == self.max_retries or self._past_deadline(deadline, delay):
+                    raise
+                self.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            delay = (min(retry_after, self.retry_after_max) if retry_after is not None
+                     else self.backoff_delay(attempt))
+            if self._past_deadline(deadline, delay):
+                return response
+            response.close()
+            self.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_shared_transport = None
+_shared_lock = threading.Lock()
+
+
+def get_transport():
+    # Transporte único do processo, usado por todos os buscadores
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = HttpTransport()
+        return _shared_transport
+
+
+def benchmark(n_requests=100, handshake_delay=0.03, bandwidth=2 * 1024 * 1024):
+    # Conexão nova por requisição (urllib) x transporte compartilhado, contra um servidor
+    # local com 30 ms de abertura de conexão e 2 MiB/s de banda simulados (o feed dos testes)
+    from Testes.stubs import StubFeedHandler, start_server
+
+    StubFeedHandler.handshake_delay = handshake_delay
+    StubFeedHandler.bandwidth = bandwidth
+    server, url = start_server(StubFeedHandler, '/api/query')
+
+    results = {}
+    for name in ('urllib (sem pool, sem gzip)', 'HttpTransport'):
+        StubFeedHandler.connections = StubFeedHandler.bytes_sent = 0
+        transport = HttpTransport() if name == 'HttpTransport' else None
+        start = time.perf_counter()
+        for _ in range(n_requests):
+            if transport is None:
+                with urllib.request.urlopen(url) as response:
+                    response.read()
+            else:
+                transport.get(url).content
+        results[name] = (time.perf_counter() - start, StubFeedHandler.connections, StubFeedHandler.bytes_sent)
+        if transport is not None:
+            transport.close()
+
+    server.shutdown()
+    for name, (elapsed, connections, sent) in results.items():
+        print(f"{name}: {elapsed / n_requests * 1000:.2f} ms/requisição, "
+              f"{connections} conexões TCP, {sent / n_requests / 1024:.1f} KiB/resposta")
+
+
+if __name__ == '__main__':
+    benchmark()
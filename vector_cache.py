@@ -0,0 +1,174 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from corpus import CorpusStore
+from paper_batch import content_digest
+
+# Parâmetros do vetorizador que mudam a tokenização; os demais só afetam o vocabulário e o
+# peso, aplicados na hora de montar as linhas
+ANALYZER_PARAMS = ('analyzer', 'lowercase', 'strip_accents', 'stop_words', 'token_pattern',
+                   'ngram_range', 'preprocessor', 'tokenizer')
+
+
+def analyzer_fingerprint(vectorizer):
+    # Impressão digital da tokenização: contagens guardadas valem para qualquer vocabulário
+    # ajustado com o mesmo analisador
+    params = vectorizer.get_params()
+    config = {name: params.get(name) for name in ANALYZER_PARAMS}
+    encoded = json.dumps(config, sort_keys=True,
+                         default=lambda value: sorted(value) if isinstance(value, (set, frozenset)) else repr(value))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def tfidf_from_counts(vectorizer, counts):
+    # Mesmo resultado de vectorizer.transform a partir da matriz de contagens (artigos x
+    # vocabulário): TF binário ou sublinear conforme o vetorizador, IDF e normalização
+    matrix = sparse.csr_matrix(counts, dtype=vectorizer.dtype, copy=True)
+    if vectorizer.binary:
+        matrix.data[:] = 1
+    if vectorizer.sublinear_tf:
+        np.log(matrix.data, out=matrix.data)
+        matrix.data += 1
+    if vectorizer.use_idf:
+        matrix.data *= vectorizer.idf_[matrix.indices]
+    if vectorizer.norm:
+        matrix = normalize(matrix, norm=vectorizer.norm, copy=False)
+    return matrix
+
+
+class VectorCache:
+    # Cache persistente, no corpus, das contagens de termos de cada artigo (tabela term_counts),
+    # indexadas pelo id normalizado do arXiv e pelo analisador, e não pelo vocabulário do perfil:
+    # reconstruir o perfil (ou a pré-busca, com outro perfil) não invalida nada. Cada contagem
+    # guarda a impressão digital (content_digest) do texto contado: um título ou resumo revisto
+    # (ex.: nova versão no arXiv) não bate e é contado de novo. As linhas TF-IDF
+    # são montadas das contagens com o vocabulário e o IDF atuais, sem tokenizar; só as faltas
+    # passam pelo analisador, e as contagens delas voltam para o cache. O tamanho é limitado a
+    # `max_rows` artigos, descartando os gravados há mais tempo
+    def __init__(self, store, max_rows=200000):
+        self.store = store
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._terms = ['']  # id de termo -> termo (o id 0 não é usado)
+        self._columns = {}  # impressão digital do vetorizador -> coluna de cada id de termo (-1: fora)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
+
+    def counts(self, vectorizer, links, texts, digests=None):
+        # [(ids de termo, contagens)] na ordem de `links`. `texts`: lista de textos ou função que
+        # recebe as posições das faltas e devolve só os textos delas, para que os resumos dos
+        # acertos nem precisem ser carregados; nesse caso, `digests` (content_digest de cada
+        # texto, ex.: paper_digests) é obrigatório
+        if digests is None:
+            digests = [content_digest(text) for text in texts]
+        analyzer = analyzer_fingerprint(vectorizer)
+        found, stored = self.store.get_term_counts(analyzer, links, digests)
+        rows = [None] * len(links)
+        for position, row in zip(found, stored):
+            rows[position] = row
+        missing = [i for i, row in enumerate(rows) if row is None]
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(missing)
+        if not missing:
+            return rows
+
+        missing_texts = texts(missing) if callable(texts) else [texts[i] for i in missing]
+        analyze = vectorizer.build_analyzer()
+        counters = [Counter(analyze(text)) for text in missing_texts]
+        term_ids = self.store.add_terms(set().union(*counters))
+        computed = [(np.fromiter((term_ids[term] for term in counter), dtype=np.int32, count=len(counter)),
+                     np.fromiter(counter.values(), dtype=np.int32, count=len(counter)))
+                    for counter in counters]
+        self.store.put_term_counts(analyzer, [links[i] for i in missing], [digests[i] for i in missing],
+                                   computed, self.max_rows)
+        for i, row in zip(missing, computed):
+            rows[i] = row
+        return rows
+
+    def add(self, vectorizer, links, texts, digests=None):
+        # Só grava as contagens (ex.: pré-busca); não precisa de vocabulário ajustado
+        self.counts(vectorizer, links, texts, digests)
+
+    def _column_map(self, vectorizer, fingerprint, max_term_id):
+        # Coluna do vocabulário atual para cada id de termo conhecido, estendida conforme
+        # novos termos aparecem no corpus
+        with self._lock:
+            if max_term_id >= len(self._terms):
+                for term_id, term in self.store.get_terms(len(self._terms) - 1):
+                    self._terms.extend([''] * (term_id - len(self._terms)))
+                    self._terms.append(term)
+            columns = self._columns.get(fingerprint, np.empty(0, dtype=np.int64))
+            if len(columns) < len(self._terms):
+                vocabulary = vectorizer.vocabulary_
+                extra = np.fromiter((vocabulary.get(term, -1) for term in self._terms[len(columns):]),
+                                    dtype=np.int64, count=len(self._terms) - len(columns))
+                columns = np.concatenate([columns, extra])
+                if fingerprint not in self._columns and len(self._columns) >= 4:
+                    self._columns.clear()
+                self._columns[fingerprint] = columns
+            return columns
+
+    def rows(self, vectorizer, fingerprint, links, texts, digests=None):
+        # Matriz CSR (len(links) x vocabulário) na ordem de `links`, igual a vectorizer.transform;
+        # `fingerprint`: impressão digital do vocabulário e do IDF de `vectorizer`
+        rows = self.counts(vectorizer, links, texts, digests)
+        lengths = np.fromiter((len(terms) for terms, _ in rows), dtype=np.int64, count=len(rows))
+        terms = np.concatenate([terms for terms, _ in rows]) if rows else np.empty(0, dtype=np.int32)
+        counts = np.concatenate([counts for _, counts in rows]) if rows else np.empty(0, dtype=np.int32)
+        columns = self._column_map(vectorizer, fingerprint, int(terms.max()) if len(terms) else 0)[terms]
+        known = columns >= 0
+        row_index = np.repeat(np.arange(len(rows)), lengths)
+        matrix = sparse.csr_matrix((counts[known], (row_index[known], columns[known])),
+                                   shape=(len(rows), len(vectorizer.vocabulary_)))
+        return tfidf_from_counts(vectorizer, matrix)
+
+
+def benchmark(n_papers=10000, words_per_paper=150, path=':memory:', seed=0):
+    # Vetorização de um lote já visto: tokenização a cada vez x linhas montadas do cache, também
+    # depois de o perfil ser reajustado com outro vocabulário e outro IDF
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    rng = np.random.default_rng(seed)
+    words = np.array([f'term{i}' for i in range(20000)])
+    texts = [' '.join(words[rng.integers(0, len(words), words_per_paper)]) for _ in range(n_papers)]
+    links = [f'http://arxiv.org/abs/2301.{i:05d}v1' for i in range(n_papers)]
+    digests = [content_digest(text) for text in texts]
+    cache = VectorCache(CorpusStore(path))
+
+    # O segundo perfil é ajustado em outra fatia do lote (com sobreposição), com vocabulário menor
+    first = TfidfVectorizer().fit(texts[:n_papers // 2])
+    second = TfidfVectorizer(max_features=8000).fit(texts[3 * n_papers // 10:9 * n_papers // 10])
+    for name, vectorizer in (('perfil 1', first), ('perfil 2 (reajustado)', second)):
+        fingerprint = name
+        start = time.perf_counter()
+        expected = vectorizer.transform(texts)
+        transform_time = time.perf_counter() - start
+        hits = cache.hits
+        start = time.perf_counter()
+        # Mesmos artigos, em outra ordem
+        rows = cache.rows(vectorizer, fingerprint, links[::-1], lambda missing: [texts[::-1][i] for i in missing],
+                          digests[::-1])
+        cache_time = time.perf_counter() - start
+        print(f"{name}: tokenização {transform_time * 1000:.0f} ms, cache {cache_time * 1000:.0f} ms "
+              f"({cache.hits - hits} acertos); maior diferença: {abs(rows[::-1] - expected).max():.1e}")
+    print(f"Taxa de acerto {cache.hit_rate:.2f} ({cache.hits} acertos, {cache.misses} faltas)")
+
+
+if __name__ == '__main__':
+    benchmark()